@@ -0,0 +1,300 @@
+# app/backfills.py
+"""
+Backfills de datos por lotes. Cada lote es una transacción corta, así que
+se pueden interrumpir y volver a lanzar: retoman donde quedaron.
+
+    python -m app.backfills venta-empresa [--batch-size 5000]
+    python -m app.backfills venta-detalle-fecha
+    python -m app.backfills venta-total-base [--todas]
+    python -m app.backfills rollups [--empresa 1]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import dispose_engine, get_engine
+from app.services import rollups
+
+logger = logging.getLogger(__name__)
+
+
+VENTA_EMPRESA_BATCH_SQL = text(
+    """
+    WITH lote AS (
+        SELECT v.id_venta
+        FROM venta v
+        WHERE v.empresas_id_empresa IS NULL
+          AND v.id_venta > :after
+        ORDER BY v.id_venta
+        LIMIT :batch_size
+    )
+    UPDATE venta v
+    SET empresas_id_empresa = c.empresas_id_empresa
+    FROM lote, clientes c
+    WHERE v.id_venta = lote.id_venta
+      AND c.id_cliente = v.clientes_id_cliente
+    RETURNING v.id_venta
+    """
+)
+
+VENTA_EMPRESA_NEXT_SQL = text(
+    """
+    SELECT max(id_venta)
+    FROM (
+        SELECT id_venta
+        FROM venta
+        WHERE empresas_id_empresa IS NULL
+          AND id_venta > :after
+        ORDER BY id_venta
+        LIMIT :batch_size
+    ) lote
+    """
+)
+
+# NOT VALID: se exige en INSERT/UPDATE sin revisar las filas existentes.
+# Con el código nuevo desplegado ningún INSERT deja la columna en NULL.
+VENTA_EMPRESA_CHECK_SQL = text(
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint WHERE conname = 'venta_empresa_not_null'
+        ) THEN
+            ALTER TABLE venta
+                ADD CONSTRAINT venta_empresa_not_null
+                CHECK (empresas_id_empresa IS NOT NULL) NOT VALID;
+        END IF;
+    END $$
+    """
+)
+
+
+VENTA_DETALLE_FECHA_BATCH_SQL = text(
+    """
+    WITH lote AS (
+        SELECT d.id_venta_detalle
+        FROM venta_detalle d
+        WHERE d.fecha_venta IS NULL
+          AND d.id_venta_detalle > :after
+        ORDER BY d.id_venta_detalle
+        LIMIT :batch_size
+    )
+    UPDATE venta_detalle d
+    SET fecha_venta = v.fecha_creacion
+    FROM lote, venta v
+    WHERE d.id_venta_detalle = lote.id_venta_detalle
+      AND v.id_venta = d.venta_id_venta
+    RETURNING d.id_venta_detalle
+    """
+)
+
+VENTA_DETALLE_FECHA_NEXT_SQL = text(
+    """
+    SELECT max(id_venta_detalle)
+    FROM (
+        SELECT id_venta_detalle
+        FROM venta_detalle
+        WHERE fecha_venta IS NULL
+          AND id_venta_detalle > :after
+        ORDER BY id_venta_detalle
+        LIMIT :batch_size
+    ) lote
+    """
+)
+
+
+# Tasa a la moneda base del día (zona de los reportes) de cada venta
+VENTA_TOTAL_BASE_BATCH_SQL = text(
+    """
+    WITH lote AS (
+        SELECT
+            v.id_venta,
+            tasa_cambio(
+                v.moneda_id_moneda, :base, (v.fecha_creacion AT TIME ZONE :tz)::date
+            ) AS tasa
+        FROM venta v
+        WHERE (CAST(:todas AS boolean) OR v.tasa_base IS NULL)
+          AND v.id_venta > :after
+        ORDER BY v.id_venta
+        LIMIT :batch_size
+    )
+    UPDATE venta v
+    SET tasa_base = lote.tasa,
+        total_base = v.total * lote.tasa
+    FROM lote
+    WHERE v.id_venta = lote.id_venta
+      AND v.tasa_base IS DISTINCT FROM lote.tasa
+    RETURNING v.id_venta
+    """
+)
+
+VENTA_TOTAL_BASE_NEXT_SQL = text(
+    """
+    SELECT max(id_venta)
+    FROM (
+        SELECT id_venta
+        FROM venta
+        WHERE (CAST(:todas AS boolean) OR tasa_base IS NULL)
+          AND id_venta > :after
+        ORDER BY id_venta
+        LIMIT :batch_size
+    ) lote
+    """
+)
+
+
+async def _run_batches(
+    label: str,
+    next_sql,
+    batch_sql,
+    batch_size: int,
+    extra: Optional[Dict[str, Any]] = None,
+) -> int:
+    """
+    Ejecuta `batch_sql` por lotes de ids crecientes hasta que `next_sql`
+    no devuelve más. El fin del lote se calcula antes del UPDATE: si una
+    fila no se puede completar, el cursor igual avanza.
+    """
+    engine = get_engine()
+    after = 0
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            params = {"after": after, "batch_size": batch_size, **(extra or {})}
+            last = (await conn.execute(next_sql, params)).scalar()
+            if last is None:
+                break
+            res = await conn.execute(batch_sql, params)
+            updated = len(res.fetchall())
+        total += updated
+        after = last
+        logger.info(f"{label}: {total} rows updated (up to id={after})")
+    return total
+
+
+async def backfill_venta_empresa(batch_size: int = 5000) -> int:
+    """
+    Copia clientes.empresas_id_empresa a venta.empresas_id_empresa en las
+    ventas antiguas que no lo tienen y agrega la restricción NOT NULL
+    (validada si no quedó ninguna). Se lanza después de desplegar el
+    código que escribe la columna. Devuelve cuántas filas actualizó.
+    """
+    total = await _run_batches(
+        "venta.empresas_id_empresa",
+        VENTA_EMPRESA_NEXT_SQL,
+        VENTA_EMPRESA_BATCH_SQL,
+        batch_size,
+    )
+
+    # Transacción aparte: el ALTER toma un lock exclusivo, pero no revisa filas
+    async with get_engine().begin() as conn:
+        await conn.execute(VENTA_EMPRESA_CHECK_SQL)
+
+    async with get_engine().begin() as conn:
+        pending = (
+            await conn.execute(text("SELECT count(*) FROM venta WHERE empresas_id_empresa IS NULL"))
+        ).scalar()
+        if pending:
+            logger.warning(
+                f"{pending} ventas still have no empresa (no matching cliente, or written by "
+                "the previous code); constraint left NOT VALID, re-run after fixing them"
+            )
+        else:
+            await conn.execute(text("ALTER TABLE venta VALIDATE CONSTRAINT venta_empresa_not_null"))
+            logger.info("Constraint venta_empresa_not_null validated")
+    return total
+
+
+async def backfill_venta_detalle_fecha(batch_size: int = 5000) -> int:
+    """Copia venta.fecha_creacion a venta_detalle.fecha_venta en los detalles antiguos."""
+    return await _run_batches(
+        "venta_detalle.fecha_venta",
+        VENTA_DETALLE_FECHA_NEXT_SQL,
+        VENTA_DETALLE_FECHA_BATCH_SQL,
+        batch_size,
+    )
+
+
+async def backfill_venta_total_base(batch_size: int = 5000, todas: bool = False) -> int:
+    """
+    Completa venta.tasa_base / total_base con la tasa del día de cada venta
+    (por defecto solo las que no la tienen; con `todas`, p. ej. tras cambiar
+    MONEDA_BASE_ID o corregir tasas, recalcula todas). Después hay que
+    reconstruir los agregados con el backfill rollups.
+    """
+    settings = get_settings()
+    if settings.moneda_base_id is None:
+        raise SystemExit("MONEDA_BASE_ID is not configured")
+    return await _run_batches(
+        "venta.total_base",
+        VENTA_TOTAL_BASE_NEXT_SQL,
+        VENTA_TOTAL_BASE_BATCH_SQL,
+        batch_size,
+        {"base": settings.moneda_base_id, "tz": settings.reportes_timezone, "todas": todas},
+    )
+
+
+async def rebuild_rollups(empresa_id: Optional[int] = None) -> int:
+    """
+    Reconstruye venta_rollup desde las ventas, una empresa por transacción.
+    Devuelve cuántas empresas procesó.
+    """
+    engine = get_engine()
+    if empresa_id is not None:
+        empresas = [empresa_id]
+    else:
+        async with engine.connect() as conn:
+            res = await conn.execute(
+                text(
+                    """
+                    SELECT DISTINCT empresas_id_empresa
+                    FROM venta
+                    WHERE empresas_id_empresa IS NOT NULL
+                    ORDER BY 1
+                    """
+                )
+            )
+            empresas = [r[0] for r in res.fetchall()]
+
+    for empresa in empresas:
+        async with engine.begin() as conn:
+            await rollups.rebuild(conn, empresa)
+        logger.info(f"venta_rollup rebuilt for empresa {empresa}")
+    return len(empresas)
+
+
+_BACKFILLS = {
+    "venta-empresa": lambda args: backfill_venta_empresa(args.batch_size),
+    "venta-detalle-fecha": lambda args: backfill_venta_detalle_fecha(args.batch_size),
+    "venta-total-base": lambda args: backfill_venta_total_base(args.batch_size, args.todas),
+    "rollups": lambda args: rebuild_rollups(args.empresa),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfills por lotes del sale-service")
+    parser.add_argument("name", choices=sorted(_BACKFILLS))
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--empresa", type=int, help="rollups: reconstruir solo esta empresa")
+    parser.add_argument(
+        "--todas", action="store_true", help="venta-total-base: recalcular también las que ya tienen tasa"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def _run() -> None:
+        try:
+            total = await _BACKFILLS[args.name](args)
+            print(f"{args.name}: {total} done")
+        finally:
+            await dispose_engine()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
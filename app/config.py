@@ -1,4 +1,6 @@
 # app/config.py
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -19,6 +21,96 @@ class Settings(BaseSettings):
     # PostgreSQL (Supabase)
     database_url: str
 
+    # Validación del token contra Supabase
+    auth_timeout_seconds: float = 3.0
+    # Fallos seguidos que abren el circuito y segundos hasta reintentar
+    auth_breaker_failures: int = 5
+    auth_breaker_reset_seconds: float = 30.0
+    # Con Supabase caído se aceptan tokens validados en los últimos N segundos
+    auth_grace_seconds: int = 300
+    auth_grace_max_entries: int = 10000
+
+    # Pool de conexiones
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # Conexiones que se abren en el arranque antes de reportar ready
+    db_pool_warmup: int = 2
+
+    # Tiempo máximo por request (segundos); también es el statement_timeout
+    # de sus consultas. 0 = sin límite.
+    request_deadline_seconds: float = 15.0
+    # Por prefijo de ruta (gana el más largo). JSON en la variable de entorno.
+    route_deadlines: Dict[str, float] = {
+        "/ventas/live": 0,
+        "/ventas/reportes": 30,
+        "/ventas/top": 30,
+        "/clientes/import": 300,
+    }
+
+    # Control de admisión por empresa
+    tenant_rate_per_second: float = 20.0
+    tenant_burst: int = 40
+    tenant_max_concurrency: int = 10
+    # Segundos que un request espera un slot de su empresa antes del 429
+    admission_queue_timeout: float = 0.5
+    # Si se configura, GET /metrics exige "Authorization: Bearer <token>"
+    metrics_token: str | None = None
+    # Load shedding (503) por espera de conexiones del pool
+    pool_max_waiters: int = 20
+    pool_wait_shed_threshold: float = 1.0
+
+    # Cache de datos de referencia (monedas), en segundos. Los cambios se
+    # invalidan en todos los workers por LISTEN/NOTIFY; el TTL es solo un respaldo.
+    monedas_cache_ttl: int = 3600
+
+    # Moneda en la que se normalizan los totales (venta.total_base). Sin
+    # configurar no se convierte nada. Cambiarla requiere recalcular con el
+    # backfill venta-total-base --todas y luego rollups.
+    moneda_base_id: int | None = None
+    # Cache de tasas por (moneda, día); los cambios se invalidan por NOTIFY
+    tipo_cambio_cache_ttl: int = 3600
+    tipo_cambio_cache_size: int = 10000
+
+    # Zona horaria que define el "día" en los reportes de ventas
+    reportes_timezone: str = "UTC"
+    # Cada cuánto se refresca el ranking venta_top (0 = no refrescar en este proceso)
+    top_refresh_seconds: int = 300
+
+    # GET /ventas: hasta cuántas filas X-Total-Count es exacto (más = estimación)
+    ventas_count_exact_limit: int = 1000
+
+    # Idempotency-Key en POST /ventas y POST /clientes
+    idempotency_cache_size: int = 10000
+    idempotency_ttl_hours: int = 24
+    # Cada cuánto se borran las claves vencidas (0 = no purgar desde este proceso)
+    idempotency_purge_interval: float = 3600.0
+
+    # Importación masiva de clientes: errores por fila que se detallan en la respuesta
+    clientes_import_max_errors: int = 1000
+
+    # Autocompletado de clientes: claves máximas en memoria (todas las empresas)
+    clientes_suggest_max_entries: int = 500000
+
+    # Outbox de eventos para otros servicios
+    # Sin URL los eventos solo se registran en el log
+    outbox_sink_url: str | None = None
+    outbox_sink_timeout: float = 5.0
+    # Cada cuánto se buscan pendientes (0 = no publicar desde este proceso)
+    outbox_publish_interval: float = 1.0
+    outbox_batch_size: int = 100
+    outbox_lease_seconds: int = 60
+    outbox_base_backoff: float = 2.0
+    outbox_max_backoff: float = 300.0
+    outbox_retention_days: int = 7
+    # Cada cuánto se borran los enviados vencidos (todos, en lotes)
+    outbox_purge_interval: float = 300.0
+
+    # Feed en vivo de ventas (SSE)
+    live_keepalive_seconds: int = 15
+    # Eventos pendientes por suscriptor; si se llena se le pide resincronizar
+    live_queue_size: int = 100
+    live_max_subscribers_per_empresa: int = 50
+
     class Config:
         env_file = ".env"
         case_sensitive = False
@@ -1,17 +1,17 @@
 # app/deps.py
+import hashlib
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from fastapi import Depends, HTTPException, status, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from uuid import UUID
 
-from app.database import get_db
+from app.database import get_sessionmaker, request_session
 from app.config import get_settings
-from app.services.supabase_service import get_supabase_auth_client
-
-settings = get_settings()
+from app.services import admission, auth_guard
+from app.services.singleflight import SingleFlight
 
 
 @dataclass
@@ -74,6 +74,69 @@ class CurrentUser:
         return False
 
 
+USER_SQL = text(
+    """
+    SELECT 
+        u.id_usuario,
+        u.auth_uid,
+        u.nombre,
+        u.apellido,
+        u.email,
+        u.es_dueno,
+        u.estado AS usuario_estado,
+        e.id_empresa,
+        e.nombre AS empresa_nombre,
+        e.razon_social,
+        e.nit,
+        e.estado AS empresa_estado
+    FROM usuarios u
+    JOIN empresas e
+        ON u.empresas_id_empresa = e.id_empresa
+    WHERE u.auth_uid = :auth_uid
+    LIMIT 1
+    """
+)
+
+
+ROLES_SQL = text(
+    """
+    SELECT 
+        r.id_rol,
+        r.nombre,
+        r.descripcion
+    FROM roles r
+    JOIN usuarios_roles ur
+        ON ur.roles_id_rol = r.id_rol
+    WHERE ur.usuarios_id_usuario = :id_usuario
+      AND r.empresas_id_empresa = :id_empresa
+    """
+)
+
+
+PERMISOS_SQL = text(
+    """
+    SELECT DISTINCT
+        p.id_permiso,
+        p.accion,
+        p.recurso
+    FROM permisos p
+    JOIN roles_permisos rp
+        ON rp.permisos_id_permiso = p.id_permiso
+    WHERE rp.roles_id_rol = ANY(:roles_ids)
+    """
+)
+
+
+# Un dashboard abre decenas de requests en paralelo con la misma cookie:
+# se valida el token una sola vez y todos comparten el resultado.
+_auth_flight = SingleFlight("auth")
+
+
+async def _resolve_user(access_token: str, db: AsyncSession) -> CurrentUser:
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    return await _auth_flight.do(key, lambda: _get_current_user_from_token(access_token, db))
+
+
 async def _get_current_user_from_token(
     access_token: str,
     db: AsyncSession,
@@ -86,45 +149,12 @@ async def _get_current_user_from_token(
     - roles, usuarios_roles
     - permisos, roles_permisos
     """
-    supabase = get_supabase_auth_client()
-
     try:
-        # 1) Validar token con Supabase
-        user_response = supabase.auth.get_user(access_token)
-
-        if not user_response or not user_response.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-            )
-
-        auth_uid = UUID(user_response.user.id)
+        # 1) Validar token con Supabase (timeout + circuit breaker + gracia)
+        auth_uid = await auth_guard.validate_token(access_token)
 
         # 2) Buscar usuario + empresa en la base de datos
-        user_sql = text(
-            """
-            SELECT 
-                u.id_usuario,
-                u.auth_uid,
-                u.nombre,
-                u.apellido,
-                u.email,
-                u.es_dueno,
-                u.estado AS usuario_estado,
-                e.id_empresa,
-                e.nombre AS empresa_nombre,
-                e.razon_social,
-                e.nit,
-                e.estado AS empresa_estado
-            FROM usuarios u
-            JOIN empresas e
-                ON u.empresas_id_empresa = e.id_empresa
-            WHERE u.auth_uid = :auth_uid
-            LIMIT 1
-            """
-        )
-
-        result = await db.execute(user_sql, {"auth_uid": str(auth_uid)})
+        result = await db.execute(USER_SQL, {"auth_uid": str(auth_uid)})
         row = result.fetchone()
 
         if not row:
@@ -165,22 +195,8 @@ async def _get_current_user_from_token(
         )
 
         # 3) Roles del usuario en esa empresa
-        roles_sql = text(
-            """
-            SELECT 
-                r.id_rol,
-                r.nombre,
-                r.descripcion
-            FROM roles r
-            JOIN usuarios_roles ur
-                ON ur.roles_id_rol = r.id_rol
-            WHERE ur.usuarios_id_usuario = :id_usuario
-              AND r.empresas_id_empresa = :id_empresa
-            """
-        )
-
         roles_result = await db.execute(
-            roles_sql,
+            ROLES_SQL,
             {
                 "id_usuario": usuario.id_usuario,
                 "id_empresa": empresa.id_empresa,
@@ -202,20 +218,8 @@ async def _get_current_user_from_token(
         if roles:
             roles_ids = [r.id_rol for r in roles]
             # Usamos ANY con array de ints (PostgreSQL)
-            permisos_sql = text(
-                """
-                SELECT DISTINCT
-                    p.id_permiso,
-                    p.accion,
-                    p.recurso
-                FROM permisos p
-                JOIN roles_permisos rp
-                    ON rp.permisos_id_permiso = p.id_permiso
-                WHERE rp.roles_id_rol = ANY(:roles_ids)
-                """
-            )
             permisos_result = await db.execute(
-                permisos_sql,
+                PERMISOS_SQL,
                 {"roles_ids": roles_ids},
             )
             permisos_rows = permisos_result.fetchall()
@@ -244,14 +248,13 @@ async def _get_current_user_from_token(
         )
 
 
-async def get_current_user(
-    request: Request,
-    db: AsyncSession = Depends(get_db),
-) -> CurrentUser:
+async def _user_from_cookie(request: Request) -> CurrentUser:
     """
-    Lee el access_token desde la cookie y devuelve CurrentUser.
+    Lee el access_token desde la cookie y arma el CurrentUser con una
+    sesión propia y corta: la conexión vuelve al pool antes del control de
+    admisión y de la sesión del request.
     """
-    cookie_name = settings.cookie_name
+    cookie_name = get_settings().cookie_name
     access_token = request.cookies.get(cookie_name)
 
     if not access_token:
@@ -260,7 +263,51 @@ async def get_current_user(
             detail="Not authenticated - missing cookie",
         )
 
-    return await _get_current_user_from_token(access_token, db)
+    async with get_sessionmaker()() as db:
+        return await _resolve_user(access_token, db)
+
+
+async def get_current_user(request: Request) -> CurrentUser:
+    return await _user_from_cookie(request)
+
+
+async def authenticate_stream(request: Request, action: str, resource: str) -> CurrentUser:
+    """
+    Autenticación para respuestas de larga duración (SSE): el stream no
+    ocupa una conexión del pool ni un slot de admisión de la empresa.
+    """
+    current_user = await _user_from_cookie(request)
+
+    if not current_user.has_permission(action, resource):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Permission denied: {action} on {resource}",
+        )
+    return current_user
+
+
+async def admit_tenant(
+    current_user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Control de admisión por empresa: rate limit + concurrencia máxima.
+    Ocupa un slot de la empresa hasta que termina el request.
+    """
+    async with admission.tenant_slot(current_user.empresa.id_empresa):
+        yield
+
+
+async def get_db(
+    request: Request,
+    _slot: None = Depends(admit_tenant),
+) -> AsyncIterator[AsyncSession]:
+    """
+    Sesión de BD del request. Depende de admit_tenant (que FastAPI resuelve
+    una sola vez por request), así la conexión se toma recién con la
+    empresa admitida, sin importar el orden de los parámetros del endpoint.
+    """
+    async with request_session(request) as session:
+        yield session
 
 
 def require_permission(action: str, resource: str):
@@ -272,6 +319,7 @@ def require_permission(action: str, resource: str):
 
     async def permission_checker(
         current_user: CurrentUser = Depends(get_current_user),
+        _slot: None = Depends(admit_tenant),
     ) -> CurrentUser:
         if not current_user.has_permission(action, resource):
             raise HTTPException(
@@ -0,0 +1,196 @@
+# app/explain_check.py
+"""
+Verifica con EXPLAIN que las consultas calientes de ventas.py,
+clientes.py y deps.py usan índices.
+
+    python -m app.explain_check [--allow tabla ...]
+
+Se ejecuta contra una BD local con el esquema y las migraciones
+aplicadas. Cada plan se pide con `enable_seqscan = off`: así el planner
+solo elige un Seq Scan cuando no existe ningún índice utilizable, y el
+resultado no depende de cuántas filas tenga la BD de prueba. Termina con
+código 1 si algún plan contiene un Seq Scan sobre una tabla no permitida.
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import select
+
+from app.database import dispose_engine, get_engine
+from app.deps import PERMISOS_SQL, ROLES_SQL, USER_SQL
+from app.models.cliente import Cliente
+from app.routers.ventas import (
+    PRODUCTOS_EMPRESA_SQL,
+    VENTA_HEADER_SQL,
+    VENTA_ITEMS_SQL,
+    VENTA_VERSION_SQL,
+    count_ventas_sql,
+    list_ventas_sql,
+)
+from app.services import outbox, rollups, sync_feed
+
+_EMPRESA = 1
+
+# Filtros de GET /ventas: (nombre, fragmentos, parámetros de ejemplo)
+_VENTAS_FILTROS = [
+    ("cliente", ("v.clientes_id_cliente = :cliente_id",), {"cliente_id": 1}),
+    ("moneda", ("v.moneda_id_moneda = :moneda_id",), {"moneda_id": 1}),
+    ("usuario", ("v.usuarios_id_usuario = :usuario_id",), {"usuario_id": 1}),
+    (
+        "nit",
+        ('(v.nit COLLATE "C") >= :nit_desde', '(v.nit COLLATE "C") < :nit_hasta'),
+        {"nit_desde": "123", "nit_hasta": "124"},
+    ),
+    ("total", ("v.total >= :total_min", "v.total <= :total_max"), {"total_min": 100, "total_max": 500}),
+]
+
+
+def hot_queries() -> List[Tuple[str, Any, Dict[str, Any]]]:
+    """(nombre, sentencia, parámetros de ejemplo) de cada consulta caliente."""
+    return [
+        ("deps.user", USER_SQL, {"auth_uid": "00000000-0000-0000-0000-000000000000"}),
+        ("deps.roles", ROLES_SQL, {"id_usuario": 1, "id_empresa": _EMPRESA}),
+        ("deps.permisos", PERMISOS_SQL, {"roles_ids": [1, 2, 3]}),
+        ("ventas.list", list_ventas_sql(), {"empresa_id": _EMPRESA, "limit": 50, "offset": 0}),
+        (
+            "ventas.list_rango",
+            list_ventas_sql(("v.fecha_creacion >= :desde", "v.fecha_creacion < :hasta")),
+            {
+                "empresa_id": _EMPRESA,
+                "limit": 50,
+                "offset": 0,
+                "desde": datetime(2025, 1, 1, tzinfo=timezone.utc),
+                "hasta": datetime(2025, 2, 1, tzinfo=timezone.utc),
+            },
+        ),
+        *[
+            (
+                f"ventas.list_{name}",
+                list_ventas_sql(filters),
+                {"empresa_id": _EMPRESA, "limit": 50, "offset": 0, **sample},
+            )
+            for name, filters, sample in _VENTAS_FILTROS
+        ],
+        *[
+            (
+                f"ventas.count_{name}",
+                count_ventas_sql(filters),
+                {"empresa_id": _EMPRESA, "count_limit": 1001, **sample},
+            )
+            for name, filters, sample in _VENTAS_FILTROS
+        ],
+        ("ventas.header", VENTA_HEADER_SQL, {"venta_id": 1, "empresa_id": _EMPRESA}),
+        (
+            "ventas.items",
+            VENTA_ITEMS_SQL,
+            {"venta_id": 1, "fecha_venta": datetime(2025, 1, 15, tzinfo=timezone.utc)},
+        ),
+        ("ventas.version", VENTA_VERSION_SQL, {"venta_id": 1, "empresa_id": _EMPRESA}),
+        ("ventas.productos", PRODUCTOS_EMPRESA_SQL, {"ids": [1, 2, 3], "empresa_id": _EMPRESA}),
+        (
+            "reportes.diario",
+            rollups.REPORTE_DIARIO_SQL,
+            {"empresa_id": _EMPRESA, "desde": date(2025, 1, 1), "hasta": date(2025, 2, 1)},
+        ),
+        (
+            "reportes.ingresos",
+            rollups.REPORTE_INGRESOS_SQL,
+            {"empresa_id": _EMPRESA, "desde": date(2025, 1, 1), "hasta": date(2025, 2, 1)},
+        ),
+        (
+            "reportes.dimension",
+            rollups.REPORTE_DIMENSION_SQL,
+            {
+                "empresa_id": _EMPRESA,
+                "dimension": "producto",
+                "desde": date(2025, 1, 1),
+                "hasta": date(2025, 2, 1),
+                "limit": 50,
+            },
+        ),
+        *[
+            # Reconstrucción de agregados por empresa (backfill rollups)
+            (f"rollups.rebuild_{i}", stmt, {"empresa_id": _EMPRESA, "tz": "UTC"})
+            for i, stmt in enumerate(rollups._REBUILD_SQL[1:], start=1)
+        ],
+        *[
+            (
+                f"sync.{name}",
+                stmt,
+                {"empresa_id": _EMPRESA, "version": 0, "id": 0, "horizon": 2**40, "limit": 500},
+            )
+            for name, stmt in (
+                ("ventas", sync_feed.VENTAS_CHANGES_SQL),
+                ("clientes", sync_feed.CLIENTES_CHANGES_SQL),
+                ("eliminados", sync_feed.TOMBSTONES_CHANGES_SQL),
+            )
+        ],
+        ("outbox.claim", outbox.CLAIM_SQL, {"batch_size": 100, "lease": 60}),
+        (
+            "clientes.list",
+            select(Cliente)
+            .where(Cliente.empresas_id_empresa == _EMPRESA)
+            .order_by(Cliente.id_cliente),
+            {},
+        ),
+        (
+            "clientes.get",
+            select(Cliente).where(
+                Cliente.id_cliente == 1,
+                Cliente.empresas_id_empresa == _EMPRESA,
+            ),
+            {},
+        ),
+    ]
+
+
+def _seq_scans(plan: Dict[str, Any]) -> Iterator[str]:
+    if plan.get("Node Type") == "Seq Scan":
+        yield plan.get("Relation Name", "?")
+    for child in plan.get("Plans", []):
+        yield from _seq_scans(child)
+
+
+async def check(allowed: set) -> List[Tuple[str, List[str]]]:
+    """Devuelve [(consulta, tablas con seq scan)] de las que fallan."""
+    failures: List[Tuple[str, List[str]]] = []
+    async with get_engine().connect() as conn:
+        trans = await conn.begin()
+        try:
+            await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for name, stmt, sample in hot_queries():
+                compiled = stmt.compile(dialect=conn.dialect)
+                params = {**compiled.params, **sample}
+                res = await conn.exec_driver_sql(
+                    "EXPLAIN (FORMAT JSON) " + str(compiled), params
+                )
+                plan = res.scalar()[0]["Plan"]
+                scans = sorted(set(_seq_scans(plan)) - allowed)
+                status = "SEQ SCAN on " + ", ".join(scans) if scans else "ok"
+                print(f"{name:<20} {status}")
+                if scans:
+                    failures.append((name, scans))
+        finally:
+            await trans.rollback()
+    await dispose_engine()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXPLAIN de las consultas calientes")
+    parser.add_argument(
+        "--allow",
+        nargs="*",
+        default=[],
+        help="tablas en las que se tolera un Seq Scan",
+    )
+    args = parser.parse_args()
+    failures = asyncio.run(check(set(args.allow)))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,84 @@
 # app/main.py
-from fastapi import FastAPI
+import asyncio
+import hmac
+import logging
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from app.config import get_settings
+from app.database import dispose_engine, get_engine, get_sessionmaker, libpq_url, warm_pool
 from app.routers import clientes, monedas, ventas
+from app.services import idempotency, metrics, monedas_cache, outbox, pg_listener, rollups
+from app.services.deadlines import DeadlineMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+async def _prepare(app: FastAPI) -> None:
+    """Calienta el pool y precarga las caches antes de marcar el servicio ready."""
+    settings = get_settings()
+    await warm_pool(min(settings.db_pool_warmup, settings.db_pool_size))
+    async with get_sessionmaker()() as session:
+        n_monedas = await monedas_cache.prime(session)
+    logger.info(f"Primed monedas cache with {n_monedas} entries")
+    app.state.ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    app.state.ready = False
+    try:
+        await _prepare(app)
+    except Exception as e:
+        # No se tumba el proceso: /ready reintenta y sigue en 503 mientras falle
+        logger.error(f"Startup preparation failed: {e}")
+
+    # Una sola conexión LISTEN por worker (feed en vivo, invalidación de caches)
+    tasks = [asyncio.create_task(pg_listener.run_listener(libpq_url()))]
+    if settings.top_refresh_seconds > 0:
+        tasks.append(
+            asyncio.create_task(
+                rollups.run_top_refresher(get_engine(), settings.top_refresh_seconds)
+            )
+        )
+    if settings.idempotency_purge_interval > 0:
+        tasks.append(
+            asyncio.create_task(
+                idempotency.run_purger(get_engine(), settings.idempotency_purge_interval)
+            )
+        )
+    if settings.outbox_publish_interval > 0:
+        tasks.append(
+            asyncio.create_task(
+                outbox.run_publisher(
+                    get_engine(), outbox.build_sink(), settings.outbox_publish_interval
+                )
+            )
+        )
+
+    yield
+
+    app.state.ready = False
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await dispose_engine()
 
-settings = get_settings()
 
 app = FastAPI(
     title="Sale Service",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Deadline por request (queda por dentro de CORS y GZip)
+app.add_middleware(DeadlineMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -19,12 +86,43 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count", "X-Total-Count-Exact"],
 )
 
+# Compresión de respuestas grandes (listados)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 @app.get("/health")
 async def health():
     return {"ok": True}
 
+
+@app.get("/ready")
+async def ready(response: Response):
+    """Readiness probe: solo responde 200 con el pool caliente y las caches cargadas."""
+    if not getattr(app.state, "ready", False):
+        try:
+            await _prepare(app)
+        except Exception as e:
+            logger.warning(f"Service not ready: {e}")
+            response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            return {"ready": False}
+    return {"ready": True}
+
+def _check_metrics_token(authorization: Optional[str] = Header(None)) -> None:
+    token = get_settings().metrics_token
+    if token and not hmac.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+        )
+
+
+@app.get("/metrics", dependencies=[Depends(_check_metrics_token)])
+async def get_metrics():
+    """Estado interno de este worker (admisión, pool, contadores), sin datos por empresa."""
+    return metrics.snapshot()
+
 # Routers
 app.include_router(clientes.router)
 app.include_router(monedas.router)
@@ -0,0 +1,284 @@
+# app/migrations.py
+"""
+Aplica en orden los scripts SQL de `migrations/` que todavía no se
+ejecutaron, registrándolos en la tabla `schema_migrations`.
+
+    python -m app.migrations           # aplica las pendientes
+    python -m app.migrations --list    # muestra el estado
+
+Cada sentencia corre en autocommit (para permitir CREATE INDEX
+CONCURRENTLY), así que los scripts deben ser idempotentes
+(IF NOT EXISTS, ON CONFLICT, ...). Un índice que quedó inválido por un
+CONCURRENTLY interrumpido se borra y se vuelve a construir al relanzar.
+
+Una tabla particionada (venta / venta_detalle tras `app.partitions
+convert`) no admite CREATE INDEX CONCURRENTLY: esas sentencias se
+reescriben para crear el índice ON ONLY en la tabla padre, construirlo
+CONCURRENTLY en cada partición y adjuntarlo (ATTACH PARTITION).
+"""
+import argparse
+import asyncio
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.database import dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def list_migrations() -> List[Tuple[str, Path]]:
+    """Devuelve [(version, path)] ordenado; la versión es el prefijo numérico."""
+    files = sorted(MIGRATIONS_DIR.glob("*.sql"))
+    return [(f.name.split("_", 1)[0], f) for f in files]
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Separa un script en sentencias por `;`, respetando comentarios `--`,
+    strings '...' y cuerpos $tag$...$tag$ (funciones / DO blocks).
+    """
+    statements: List[str] = []
+    buf: List[str] = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = n if end == -1 else end + 1
+            buf.append("\n")
+            continue
+        if ch == "'":
+            end = i + 1
+            while end < n:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                    continue
+                if sql[end] == "'":
+                    break
+                end += 1
+            buf.append(sql[i:end + 1])
+            i = end + 1
+            continue
+        if ch == "$":
+            close = sql.find("$", i + 1)
+            tag = sql[i:close + 1] if close != -1 else ""
+            if tag and (tag == "$$" or tag[1:-1].replace("_", "").isalnum()):
+                end = sql.find(tag, close + 1)
+                end = n if end == -1 else end + len(tag)
+                buf.append(sql[i:end])
+                i = end
+                continue
+        if ch == ";":
+            stmt = "".join(buf).strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+            i += 1
+            continue
+        buf.append(ch)
+        i += 1
+    stmt = "".join(buf).strip()
+    if stmt:
+        statements.append(stmt)
+    return statements
+
+
+_CONCURRENT_INDEX_RE = re.compile(
+    r"^CREATE\s+(?P<unique>UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+    r"(?P<name>\w+)\s+ON\s+(?:ONLY\s+)?(?P<table>\w+)\s*(?P<rest>.*)$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def concurrent_index_target(stmt: str) -> Optional[Tuple[str, str]]:
+    """(índice, tabla) de un CREATE INDEX CONCURRENTLY, o None si la sentencia es otra."""
+    m = _CONCURRENT_INDEX_RE.match(stmt)
+    return (m.group("name"), m.group("table")) if m else None
+
+
+def _partition_index_name(index: str, partition: str) -> str:
+    name = f"{partition}_{index}"
+    if len(name) <= 63:
+        return name
+    # Límite de identificadores de PostgreSQL
+    return f"{name[:54]}_{hashlib.md5(name.encode()).hexdigest()[:8]}"
+
+
+def partitioned_index_statements(stmt: str, partitions: List[str]) -> List[str]:
+    """
+    Reescribe un CREATE INDEX CONCURRENTLY sobre una tabla particionada:
+    índice ON ONLY en el padre (queda inválido), CONCURRENTLY en cada
+    partición y ATTACH. Con la última partición adjuntada el índice del
+    padre pasa a válido, y las particiones nuevas lo heredan.
+    """
+    m = _CONCURRENT_INDEX_RE.match(stmt)
+    if m is None:
+        raise ValueError(f"not a CREATE INDEX CONCURRENTLY statement: {stmt[:60]}")
+    unique = "UNIQUE " if m.group("unique") else ""
+    name, table, rest = m.group("name"), m.group("table"), m.group("rest")
+    statements = [f"CREATE {unique}INDEX IF NOT EXISTS {name} ON ONLY {table} {rest}"]
+    for partition in partitions:
+        part_index = _partition_index_name(name, partition)
+        statements.append(
+            f"CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {part_index} ON {partition} {rest}"
+        )
+        statements.append(f"ALTER INDEX {name} ATTACH PARTITION {part_index}")
+    return statements
+
+
+async def _partitions_of(conn, table: str) -> Optional[List[str]]:
+    """Particiones de `table`, o None si no es una tabla particionada."""
+    res = await conn.execute(
+        text(
+            """
+            SELECT c.relkind = 'p'
+            FROM pg_class c
+            WHERE c.relname = :table
+              AND c.relnamespace = 'public'::regnamespace
+            """
+        ),
+        {"table": table},
+    )
+    if not res.scalar():
+        return None
+    res = await conn.execute(
+        text(
+            """
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = CAST(:table AS regclass)
+            ORDER BY c.relname
+            """
+        ),
+        {"table": table},
+    )
+    return [r[0] for r in res.fetchall()]
+
+
+async def _pending_partitions(conn, index: str, partitions: List[str]) -> List[str]:
+    """
+    Particiones a las que aún les falta el índice `index`. Vacío si el
+    índice del padre ya es válido (p. ej. lo creó `app.partitions convert`);
+    si quedó a medias, las que ya tienen uno adjunto (o lo heredaron al
+    crearse) se saltan.
+    """
+    res = await conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index)"),
+        {"index": index},
+    )
+    if res.scalar():
+        return []
+    res = await conn.execute(
+        text(
+            """
+            SELECT x.indrelid::regclass::text
+            FROM pg_inherits i
+            JOIN pg_index x ON x.indexrelid = i.inhrelid
+            WHERE i.inhparent = to_regclass(:index)
+            """
+        ),
+        {"index": index},
+    )
+    attached = {r[0] for r in res.fetchall()}
+    return [p for p in partitions if p not in attached]
+
+
+async def _drop_if_invalid(conn, index: str) -> None:
+    """
+    Un CREATE INDEX CONCURRENTLY que falla o se interrumpe deja el índice
+    creado pero inválido, y IF NOT EXISTS lo saltaría al relanzar: se
+    borra para construirlo de nuevo.
+    """
+    res = await conn.execute(
+        text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:index)"),
+        {"index": index},
+    )
+    if res.scalar() is False:
+        logger.warning(f"Index {index} is invalid (interrupted build); rebuilding it")
+        await conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {index}")
+
+
+async def _execute(conn, stmt: str) -> None:
+    target = concurrent_index_target(stmt)
+    partitions = await _partitions_of(conn, target[1]) if target else None
+    if partitions is None:
+        if target:
+            await _drop_if_invalid(conn, target[0])
+        await conn.exec_driver_sql(stmt)
+        return
+    pending = await _pending_partitions(conn, target[0], partitions)
+    if not pending:
+        logger.info(f"Index {target[0]} already valid on partitioned {target[1]}")
+        return
+    # El índice ON ONLY del padre es inválido hasta adjuntar todas: ese no se toca
+    for partition in pending:
+        await _drop_if_invalid(conn, _partition_index_name(target[0], partition))
+    for part_stmt in partitioned_index_statements(stmt, pending):
+        await conn.exec_driver_sql(part_stmt)
+
+
+async def _applied_versions(conn) -> set:
+    await conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(20) PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+    res = await conn.execute(text("SELECT version FROM schema_migrations"))
+    return {r[0] for r in res.fetchall()}
+
+
+async def migrate(show_only: bool = False) -> int:
+    """Aplica las migraciones pendientes. Devuelve cuántas aplicó."""
+    applied_count = 0
+    async with get_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        applied = await _applied_versions(conn)
+
+        for version, path in list_migrations():
+            if version in applied:
+                if show_only:
+                    print(f"[x] {path.name}")
+                continue
+            if show_only:
+                print(f"[ ] {path.name}")
+                continue
+
+            logger.info(f"Applying migration {path.name}")
+            for stmt in split_statements(path.read_text(encoding="utf-8")):
+                await _execute(conn, stmt)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                {"version": version, "name": path.name},
+            )
+            applied_count += 1
+            print(f"applied {path.name}")
+
+    await dispose_engine()
+    return applied_count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aplica las migraciones SQL del sale-service")
+    parser.add_argument("--list", action="store_true", help="solo muestra el estado")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(migrate(show_only=args.list))
+
+
+if __name__ == "__main__":
+    main()
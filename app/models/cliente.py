@@ -1,5 +1,5 @@
 # app/models/cliente.py
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, ForeignKey, Index
 from app.database import Base
 
 
@@ -13,4 +13,10 @@ class Cliente(Base):
     email = Column(String(30), nullable=False)
     notas = Column(String(30), nullable=False)
     # 👇 Importante: SIN ForeignKey aquí
-    empresas_id_empresa = Column(Integer, nullable=False, index=True)
\ No newline at end of file
+    empresas_id_empresa = Column(Integer, nullable=False, index=True)
+    # Versión para el feed de cambios: la asigna un trigger (0007)
+    sync_version = Column(BigInteger, nullable=False, server_default="0")
+
+    __table_args__ = (
+        Index("ix_clientes_empresa_id_cliente", empresas_id_empresa, id_cliente),
+    )
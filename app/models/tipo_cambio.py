@@ -0,0 +1,15 @@
+# app/models/tipo_cambio.py
+from sqlalchemy import Column, Date, DateTime, Integer, Numeric
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class TipoCambio(Base):
+    __tablename__ = "tipo_cambio"
+
+    # 1 unidad de moneda_origen = tasa unidades de moneda_destino, desde vigente_desde
+    moneda_origen = Column(Integer, primary_key=True)
+    moneda_destino = Column(Integer, primary_key=True)
+    vigente_desde = Column(Date, primary_key=True)
+    tasa = Column(Numeric, nullable=False)
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
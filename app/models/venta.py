@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Numeric
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, Numeric, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -15,6 +15,27 @@ class Venta(Base):
     usuarios_id_usuario = Column(Integer, nullable=False)
 
     total = Column(Numeric, nullable=False)
+    # Tasa a MONEDA_BASE_ID y total convertido, fijados al crear la venta (0010)
+    tasa_base = Column(Numeric, nullable=True)
+    total_base = Column(Numeric, nullable=True)
 
     empresas_id_empresa = Column(Integer, nullable=False, index=True)
     fecha_creacion = Column(DateTime(timezone=True), server_default=func.now())
+    # Versión para el feed de cambios: la asigna un trigger (0007)
+    sync_version = Column(BigInteger, nullable=False, server_default="0")
+
+    # Trae fecha_creacion (server_default) en el flush: venta_detalle la
+    # necesita como clave de partición.
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        Index("ix_venta_empresa_id_venta", empresas_id_empresa, id_venta.desc()),
+        Index("ix_venta_cliente", clientes_id_cliente),
+        # Filtros de list_ventas (0009)
+        Index("ix_venta_empresa_fecha", empresas_id_empresa, fecha_creacion),
+        Index("ix_venta_empresa_cliente", empresas_id_empresa, clientes_id_cliente, id_venta.desc()),
+        Index("ix_venta_empresa_moneda", empresas_id_empresa, moneda_id_moneda, id_venta.desc()),
+        Index("ix_venta_empresa_usuario", empresas_id_empresa, usuarios_id_usuario, id_venta.desc()),
+        Index("ix_venta_empresa_nit", empresas_id_empresa, nit.collate("C")),
+        Index("ix_venta_empresa_total", empresas_id_empresa, total),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, ForeignKey, Numeric, Index, DateTime
 from app.database import Base
 
 class VentaDetalle(Base):
@@ -10,3 +10,9 @@ class VentaDetalle(Base):
     cantidad = Column(Integer, nullable=False)
     precio_unitario = Column(Numeric, nullable=False)
     descuento_item = Column(Integer, nullable=False)
+    # Copia de venta.fecha_creacion: clave de partición compartida con venta
+    fecha_venta = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_venta_detalle_venta", venta_id_venta, id_venta_detalle),
+    )
@@ -0,0 +1,347 @@
+# app/partitions.py
+"""
+Particionado mensual de venta / venta_detalle por fecha de la venta.
+
+venta se particiona por RANGE (fecha_creacion) y venta_detalle por
+RANGE (fecha_venta), con los mismos límites mensuales: los detalles de
+una venta siempre viven en la partición del mismo mes.
+
+    python -m app.partitions convert [--months-ahead 3]
+    python -m app.partitions create [--months-ahead 3]
+    python -m app.partitions archive --older-than 24 [--drop]
+    python -m app.partitions list
+
+`convert` es una operación única y bloqueante (ACCESS EXCLUSIVE mientras
+copia): renombra las tablas actuales a *_legacy y crea las particionadas
+en su lugar. Requiere haber corrido antes los backfills venta-empresa y
+venta-detalle-fecha. Las migraciones posteriores con CREATE INDEX
+CONCURRENTLY sobre estas tablas se aplican partición por partición (ver
+app/migrations.py). Revisar antes que
+no existan FKs o vistas de otros servicios apuntando a venta, porque
+seguirían apuntando a venta_legacy.
+
+`create` debería correr a diario (cron) para tener siempre particiones
+de los próximos meses; lo que caiga fuera va a la partición DEFAULT.
+"""
+import argparse
+import asyncio
+import logging
+import re
+from datetime import date
+from typing import List, Optional
+
+from app.database import dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_SCHEMA = "archive"
+
+# (tabla, columna de partición, índices a recrear en la tabla particionada)
+_TABLES = [
+    (
+        "venta",
+        "fecha_creacion",
+        [
+            "CREATE INDEX ix_venta_empresa_id_venta ON venta (empresas_id_empresa, id_venta DESC)",
+            "CREATE INDEX ix_venta_cliente ON venta (clientes_id_cliente)",
+            "CREATE INDEX ix_venta_empresa_sync ON venta (empresas_id_empresa, sync_version, id_venta)",
+            "CREATE INDEX ix_venta_empresa_fecha ON venta (empresas_id_empresa, fecha_creacion)",
+            "CREATE INDEX ix_venta_empresa_cliente ON venta (empresas_id_empresa, clientes_id_cliente, id_venta DESC)",
+            "CREATE INDEX ix_venta_empresa_moneda ON venta (empresas_id_empresa, moneda_id_moneda, id_venta DESC)",
+            "CREATE INDEX ix_venta_empresa_usuario ON venta (empresas_id_empresa, usuarios_id_usuario, id_venta DESC)",
+            'CREATE INDEX ix_venta_empresa_nit ON venta (empresas_id_empresa, (nit COLLATE "C"))',
+            "CREATE INDEX ix_venta_empresa_total ON venta (empresas_id_empresa, total)",
+        ],
+    ),
+    (
+        "venta_detalle",
+        "fecha_venta",
+        [
+            "CREATE INDEX ix_venta_detalle_venta ON venta_detalle (venta_id_venta, id_venta_detalle)",
+        ],
+    ),
+]
+
+_PARTITION_RE = re.compile(r"^(venta|venta_detalle)_p(\d{4})_(\d{2})$")
+
+
+def _add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+async def _is_partitioned(conn, table: str) -> bool:
+    res = await conn.exec_driver_sql(
+        """
+        SELECT EXISTS (
+            SELECT 1
+            FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            WHERE c.relname = %(table)s
+              AND c.relnamespace = 'public'::regnamespace
+        )
+        """,
+        {"table": table},
+    )
+    return bool(res.scalar())
+
+
+async def _list_partitions(conn, table: str) -> List[str]:
+    res = await conn.exec_driver_sql(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = %(table)s
+          AND p.relnamespace = 'public'::regnamespace
+        ORDER BY c.relname
+        """,
+        {"table": table},
+    )
+    return [r[0] for r in res.fetchall()]
+
+
+async def _create_month(conn, month: date) -> List[str]:
+    """Crea (si faltan) las particiones de venta y venta_detalle de un mes."""
+    created = []
+    upper = _add_months(month, 1)
+    for table, _column, _indexes in _TABLES:
+        name = partition_name(table, month)
+        await conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+            f"TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        created.append(name)
+    return created
+
+
+async def create_partitions(months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    """Asegura particiones desde el mes actual hasta `months_ahead` meses adelante."""
+    current = _month_start(today or date.today())
+    created: List[str] = []
+    async with get_engine().begin() as conn:
+        if not await _is_partitioned(conn, "venta"):
+            raise RuntimeError("venta is not partitioned yet; run `python -m app.partitions convert` first")
+        for i in range(months_ahead + 1):
+            created += await _create_month(conn, _add_months(current, i))
+    return created
+
+
+async def convert(months_ahead: int = 3) -> None:
+    """Convierte venta y venta_detalle en tablas particionadas por mes."""
+    async with get_engine().begin() as conn:
+        if await _is_partitioned(conn, "venta"):
+            logger.info("venta is already partitioned")
+            return
+
+        await conn.exec_driver_sql("LOCK TABLE venta, venta_detalle IN ACCESS EXCLUSIVE MODE")
+
+        # La clave de partición no puede ser NULL
+        await conn.exec_driver_sql(
+            "UPDATE venta SET fecha_creacion = now() WHERE fecha_creacion IS NULL"
+        )
+        await conn.exec_driver_sql(
+            """
+            UPDATE venta_detalle d
+            SET fecha_venta = v.fecha_creacion
+            FROM venta v
+            WHERE v.id_venta = d.venta_id_venta
+              AND d.fecha_venta IS DISTINCT FROM v.fecha_creacion
+            """
+        )
+
+        first = (await conn.exec_driver_sql("SELECT min(fecha_creacion) FROM venta")).scalar()
+
+        for table, column, indexes in _TABLES:
+            await conn.exec_driver_sql(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+            # Los nombres de índice son únicos por schema: se liberan para la tabla nueva
+            for ddl in indexes:
+                index_name = ddl.split()[2]
+                await conn.exec_driver_sql(
+                    f"ALTER INDEX IF EXISTS {index_name} RENAME TO {index_name}_legacy"
+                )
+            await conn.exec_driver_sql(
+                f"""
+                CREATE TABLE {table} (
+                    LIKE {table}_legacy
+                    INCLUDING DEFAULTS INCLUDING IDENTITY
+                    INCLUDING CONSTRAINTS INCLUDING GENERATED
+                ) PARTITION BY RANGE ({column})
+                """
+            )
+
+        await conn.exec_driver_sql("ALTER TABLE venta ADD PRIMARY KEY (id_venta, fecha_creacion)")
+        await conn.exec_driver_sql(
+            "ALTER TABLE venta_detalle ADD PRIMARY KEY (id_venta_detalle, fecha_venta)"
+        )
+        await conn.exec_driver_sql(
+            """
+            ALTER TABLE venta_detalle
+                ADD CONSTRAINT venta_detalle_venta_fkey
+                FOREIGN KEY (venta_id_venta, fecha_venta)
+                REFERENCES venta (id_venta, fecha_creacion)
+            """
+        )
+        for _table, _column, indexes in _TABLES:
+            for ddl in indexes:
+                await conn.exec_driver_sql(ddl)
+
+        # Particiones desde la venta más antigua hasta N meses adelante + DEFAULT
+        current = _month_start(date.today())
+        month = _month_start(first.date()) if first else current
+        last = _add_months(current, months_ahead)
+        while month <= last:
+            await _create_month(conn, month)
+            month = _add_months(month, 1)
+        for table, _column, _indexes in _TABLES:
+            await conn.exec_driver_sql(
+                f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+            )
+
+        for table, _column, _indexes in _TABLES:
+            await conn.exec_driver_sql(
+                f"INSERT INTO {table} OVERRIDING SYSTEM VALUE SELECT * FROM {table}_legacy"
+            )
+
+        # LIKE no copia triggers (sync_version, tombstones, ...). Se crean
+        # después de copiar para no reescribir sync_version de cada fila.
+        for table, _column, _indexes in _TABLES:
+            triggers = await conn.exec_driver_sql(
+                f"""
+                SELECT pg_get_triggerdef(oid)
+                FROM pg_trigger
+                WHERE tgrelid = '{table}_legacy'::regclass
+                  AND NOT tgisinternal
+                """
+            )
+            for (ddl,) in triggers.fetchall():
+                await conn.exec_driver_sql(
+                    ddl.replace(f" ON public.{table}_legacy ", f" ON public.{table} ")
+                    .replace(f" ON {table}_legacy ", f" ON {table} ")
+                )
+
+        # Secuencias de ids: serial (se reasigna el dueño) o identity (nueva)
+        for table, pk in (("venta", "id_venta"), ("venta_detalle", "id_venta_detalle")):
+            seq = (
+                await conn.exec_driver_sql(
+                    f"SELECT pg_get_serial_sequence('{table}', '{pk}')"
+                )
+            ).scalar()
+            if seq is None:
+                seq = (
+                    await conn.exec_driver_sql(
+                        f"SELECT pg_get_serial_sequence('{table}_legacy', '{pk}')"
+                    )
+                ).scalar()
+                await conn.exec_driver_sql(f"ALTER SEQUENCE {seq} OWNED BY {table}.{pk}")
+            await conn.exec_driver_sql(
+                f"SELECT setval('{seq}', COALESCE((SELECT max({pk}) FROM {table}), 0) + 1, false)"
+            )
+
+    async with get_engine().connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.exec_driver_sql("ANALYZE venta")
+        await conn.exec_driver_sql("ANALYZE venta_detalle")
+    logger.info("venta / venta_detalle converted; *_legacy tables can be dropped once verified")
+
+
+async def archive_partitions(older_than_months: int, drop: bool = False) -> List[str]:
+    """
+    Separa las particiones mensuales más antiguas que `older_than_months`.
+    Se mueven al schema `archive` (o se borran con drop=True), así dejan
+    de pesar en los índices, el vacuum y los planes de la tabla viva.
+    """
+    cutoff = _add_months(_month_start(date.today()), -older_than_months)
+    archived: List[str] = []
+
+    async with get_engine().connect() as conn:
+        candidates = []
+        for name in await _list_partitions(conn, "venta"):
+            m = _PARTITION_RE.match(name)
+            if m and date(int(m.group(2)), int(m.group(3)), 1) < cutoff:
+                candidates.append(date(int(m.group(2)), int(m.group(3)), 1))
+        await conn.rollback()
+
+    for month in candidates:
+        venta_part = partition_name("venta", month)
+        detalle_part = partition_name("venta_detalle", month)
+        async with get_engine().begin() as conn:
+            # Primero el detalle, y sin su FK: si no, venta no se puede separar
+            await conn.exec_driver_sql(f"ALTER TABLE venta_detalle DETACH PARTITION {detalle_part}")
+            fks = await conn.exec_driver_sql(
+                f"""
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = '{detalle_part}'::regclass AND contype = 'f'
+                """
+            )
+            for (conname,) in fks.fetchall():
+                await conn.exec_driver_sql(f'ALTER TABLE {detalle_part} DROP CONSTRAINT "{conname}"')
+            await conn.exec_driver_sql(f"ALTER TABLE venta DETACH PARTITION {venta_part}")
+
+            if drop:
+                await conn.exec_driver_sql(f"DROP TABLE {detalle_part}")
+                await conn.exec_driver_sql(f"DROP TABLE {venta_part}")
+            else:
+                await conn.exec_driver_sql(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+                await conn.exec_driver_sql(f"ALTER TABLE {detalle_part} SET SCHEMA {ARCHIVE_SCHEMA}")
+                await conn.exec_driver_sql(f"ALTER TABLE {venta_part} SET SCHEMA {ARCHIVE_SCHEMA}")
+        archived += [venta_part, detalle_part]
+        logger.info(f"{'Dropped' if drop else 'Archived'} partitions for {month:%Y-%m}")
+    return archived
+
+
+async def _print_partitions() -> None:
+    async with get_engine().connect() as conn:
+        for table, _column, _indexes in _TABLES:
+            if not await _is_partitioned(conn, table):
+                print(f"{table}: not partitioned")
+                continue
+            print(f"{table}:")
+            for name in await _list_partitions(conn, table):
+                print(f"  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Particiones mensuales de venta / venta_detalle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_convert = sub.add_parser("convert", help="convierte las tablas a particionadas (una vez)")
+    p_convert.add_argument("--months-ahead", type=int, default=3)
+    p_create = sub.add_parser("create", help="crea las particiones de los próximos meses")
+    p_create.add_argument("--months-ahead", type=int, default=3)
+    p_archive = sub.add_parser("archive", help="separa las particiones antiguas")
+    p_archive.add_argument("--older-than", type=int, required=True, help="meses a conservar")
+    p_archive.add_argument("--drop", action="store_true", help="borrar en vez de mover a archive")
+    sub.add_parser("list", help="muestra las particiones actuales")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def _run() -> None:
+        try:
+            if args.command == "convert":
+                await convert(args.months_ahead)
+            elif args.command == "create":
+                created = await create_partitions(args.months_ahead)
+                print("\n".join(created))
+            elif args.command == "archive":
+                archived = await archive_partitions(args.older_than, drop=args.drop)
+                print("\n".join(archived) or "nothing to archive")
+            else:
+                await _print_partitions()
+        finally:
+            await dispose_engine()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,79 @@
 # app/routers/clientes.py
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Integer, any_, bindparam, delete, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
-from app.database import get_db
-from app.deps import require_permission, CurrentUser
+from app.deps import get_db, require_permission, CurrentUser
 from app.models.cliente import Cliente
 from app.schemas.cliente import (
     ClienteCreate,
     ClienteUpdate,
     ClienteResponse,
+    ClienteBulkDelete,
+    ClienteBulkDeleteResult,
+    ClienteBulkUpdate,
+    ClienteBulkUpdateResult,
+    ClienteImportResult,
+    ClienteSuggestion,
 )
+from app.config import get_settings
+from app.services import clientes_import, clientes_suggest, columnar, etag, idempotency, invalidation
 
 router = APIRouter(prefix="/clientes", tags=["clientes"])
 
 
-@router.get("", response_model=List[ClienteResponse])
+_CLIENTE_COLUMNS = ("id_cliente", "nombre", "tipo", "telefono", "email", "notas")
+CLIENTES_COLUMNAR = columnar.columns_of(_CLIENTE_COLUMNS)
+
+
+@router.get("", response_model=List[ClienteResponse], responses=columnar.OPENAPI_RESPONSES)
 async def list_clientes(
+    request: Request,
     current_user: CurrentUser = Depends(require_permission("read", "clientes")),
     db: AsyncSession = Depends(get_db),
 ):
+    """Con `Accept: application/vnd.columnar+json` responde en formato columnar."""
     q = (
-        select(Cliente)
+        select(*(getattr(Cliente, c) for c in _CLIENTE_COLUMNS))
         .where(Cliente.empresas_id_empresa == current_user.empresa.id_empresa)
         .order_by(Cliente.id_cliente)
     )
     result = await db.execute(q)
-    rows = result.scalars().all()
-    return [ClienteResponse.model_validate(r) for r in rows]
+    rows = result.mappings().all()
+    if columnar.wants_columnar(request):
+        return etag.json_response(
+            request,
+            columnar.encode(rows, CLIENTES_COLUMNAR),
+            media_type=columnar.MEDIA_TYPE,
+            vary="Accept",
+        )
+    return etag.json_response(
+        request, [ClienteResponse.model_validate(dict(r)) for r in rows], vary="Accept"
+    )
+
+
+@router.get("/suggest", response_model=List[ClienteSuggestion])
+async def suggest_clientes(
+    q: str = Query(..., min_length=1, max_length=30),
+    k: int = Query(10, ge=1, le=50),
+    current_user: CurrentUser = Depends(require_permission("read", "clientes")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Autocompletado para el checkout: clientes cuyo nombre (o alguna de sus
+    palabras), teléfono o email empieza con `q`. Sin distinguir mayúsculas
+    ni acentos; se sirve desde un índice en memoria.
+    """
+    return await clientes_suggest.suggest(db, current_user.empresa.id_empresa, q, k)
 
 
 @router.get("/{cliente_id}", response_model=ClienteResponse)
 async def get_cliente(
     cliente_id: int,
+    request: Request,
     current_user: CurrentUser = Depends(require_permission("read", "clientes")),
     db: AsyncSession = Depends(get_db),
 ):
@@ -49,15 +88,27 @@ async def get_cliente(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found",
         )
-    return ClienteResponse.model_validate(cliente)
+    return etag.json_response(request, ClienteResponse.model_validate(cliente))
 
 
 @router.post("", response_model=ClienteResponse, status_code=status.HTTP_201_CREATED)
 async def create_cliente(
     cliente_create: ClienteCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: CurrentUser = Depends(require_permission("create", "clientes")),
     db: AsyncSession = Depends(get_db),
 ):
+    if idempotency_key:
+        req_hash = idempotency.request_hash(cliente_create)
+        stored = await idempotency.begin(
+            db, current_user.empresa.id_empresa, "clientes", idempotency_key, req_hash
+        )
+        if stored:
+            response.status_code = stored.status_code
+            response.headers["Idempotent-Replayed"] = "true"
+            return ClienteResponse.model_validate(stored.body)
+
     cliente = Cliente(
         nombre=cliente_create.nombre,
         tipo=cliente_create.tipo,
@@ -69,7 +120,126 @@ async def create_cliente(
     db.add(cliente)
     await db.flush()
     await db.refresh(cliente)
-    return ClienteResponse.model_validate(cliente)
+    cliente_response = ClienteResponse.model_validate(cliente)
+    await invalidation.publish(
+        db, "cliente", current_user.empresa.id_empresa, cliente.id_cliente
+    )
+
+    if idempotency_key:
+        await idempotency.complete(
+            db,
+            current_user.empresa.id_empresa,
+            "clientes",
+            idempotency_key,
+            req_hash,
+            status.HTTP_201_CREATED,
+            cliente_response.model_dump(mode="json"),
+        )
+
+    return cliente_response
+
+
+@router.post("/import", response_model=ClienteImportResult)
+async def import_clientes(
+    request: Request,
+    current_user: CurrentUser = Depends(require_permission("create", "clientes")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Alta masiva de clientes. Body `text/csv` (con encabezado
+    nombre,tipo,telefono,email,notas) o `application/x-ndjson` (un objeto
+    por línea). Se insertan las filas válidas y se reportan las inválidas.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = clientes_import.FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use text/csv or application/x-ndjson",
+        )
+
+    try:
+        return await clientes_import.import_clientes(
+            db,
+            current_user.empresa.id_empresa,
+            request.stream(),
+            fmt,
+            get_settings().clientes_import_max_errors,
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be UTF-8 encoded",
+        )
+
+
+def _ids_param(ids):
+    """`id_cliente = ANY(:ids)`: una sola sentencia sin importar cuántos ids."""
+    return Cliente.id_cliente == any_(bindparam("ids", sorted(set(ids)), type_=ARRAY(Integer)))
+
+
+@router.patch("", response_model=ClienteBulkUpdateResult)
+async def bulk_update_clientes(
+    payload: ClienteBulkUpdate,
+    current_user: CurrentUser = Depends(require_permission("update", "clientes")),
+    db: AsyncSession = Depends(get_db),
+):
+    """Aplica los mismos cambios a varios clientes en un solo UPDATE."""
+    data = payload.cambios.model_dump(exclude_unset=True)
+    if not data:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No changes to apply",
+        )
+
+    q = (
+        update(Cliente)
+        .where(
+            _ids_param(payload.ids),
+            Cliente.empresas_id_empresa == current_user.empresa.id_empresa,
+        )
+        .values(**data)
+        .returning(Cliente)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(q)
+    clientes = result.scalars().all()
+
+    found = {c.id_cliente for c in clientes}
+    if found:
+        await invalidation.publish(db, "cliente", current_user.empresa.id_empresa)
+    return ClienteBulkUpdateResult(
+        actualizados=[ClienteResponse.model_validate(c) for c in clientes],
+        no_encontrados=sorted(set(payload.ids) - found),
+    )
+
+
+@router.delete("", response_model=ClienteBulkDeleteResult)
+async def bulk_delete_clientes(
+    payload: ClienteBulkDelete,
+    current_user: CurrentUser = Depends(require_permission("delete", "clientes")),
+    db: AsyncSession = Depends(get_db),
+):
+    """Elimina varios clientes en un solo DELETE."""
+    q = (
+        delete(Cliente)
+        .where(
+            _ids_param(payload.ids),
+            Cliente.empresas_id_empresa == current_user.empresa.id_empresa,
+        )
+        .returning(Cliente.id_cliente)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(q)
+    deleted = set(result.scalars().all())
+
+    if deleted:
+        await invalidation.publish(db, "cliente", current_user.empresa.id_empresa)
+    return ClienteBulkDeleteResult(
+        eliminados=sorted(deleted),
+        no_encontrados=sorted(set(payload.ids) - deleted),
+    )
+
 
 @router.patch("/{cliente_id}", response_model=ClienteResponse)
 async def update_cliente(
@@ -78,10 +248,22 @@ async def update_cliente(
     current_user: CurrentUser = Depends(require_permission("update", "clientes")),
     db: AsyncSession = Depends(get_db),
 ):
-    q = select(Cliente).where(
+    where = (
         Cliente.id_cliente == cliente_id,
         Cliente.empresas_id_empresa == current_user.empresa.id_empresa,
     )
+    data = payload.model_dump(exclude_unset=True)
+    if data:
+        # UPDATE ... RETURNING: un solo viaje a la BD
+        q = (
+            update(Cliente)
+            .where(*where)
+            .values(**data)
+            .returning(Cliente)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        q = select(Cliente).where(*where)
     result = await db.execute(q)
     cliente = result.scalar_one_or_none()
     if not cliente:
@@ -90,12 +272,10 @@ async def update_cliente(
             detail="Client not found",
         )
 
-    data = payload.model_dump(exclude_unset=True)
-    for field, value in data.items():
-        setattr(cliente, field, value)
-
-    await db.flush()
-    await db.refresh(cliente)
+    if data:
+        await invalidation.publish(
+            db, "cliente", current_user.empresa.id_empresa, cliente.id_cliente
+        )
     return ClienteResponse.model_validate(cliente)
 
 
@@ -105,17 +285,21 @@ async def delete_cliente(
     current_user: CurrentUser = Depends(require_permission("delete", "clientes")),
     db: AsyncSession = Depends(get_db),
 ):
-    q = select(Cliente).where(
-        Cliente.id_cliente == cliente_id,
-        Cliente.empresas_id_empresa == current_user.empresa.id_empresa,
+    q = (
+        delete(Cliente)
+        .where(
+            Cliente.id_cliente == cliente_id,
+            Cliente.empresas_id_empresa == current_user.empresa.id_empresa,
+        )
+        .returning(Cliente.id_cliente)
+        .execution_options(synchronize_session=False)
     )
     result = await db.execute(q)
-    cliente = result.scalar_one_or_none()
-    if not cliente:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found",
         )
 
-    await db.delete(cliente)
+    await invalidation.publish(db, "cliente", current_user.empresa.id_empresa, cliente_id)
     return None
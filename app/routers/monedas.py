@@ -1,48 +1,113 @@
 # app/routers/monedas.py
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.database import get_db
-from app.deps import require_permission, CurrentUser
+from app.deps import get_db, require_permission, CurrentUser
 from app.models.moneda import Moneda
 from app.schemas.moneda import (
     MonedaCreate,
     MonedaUpdate,
     MonedaResponse,
+    TipoCambioResponse,
+    TipoCambioUpsert,
 )
+from app.services import etag, invalidation, monedas_cache, tipo_cambio
 
 router = APIRouter(prefix="/monedas", tags=["monedas"])
 
 
 @router.get("", response_model=List[MonedaResponse])
 async def list_monedas(
+    request: Request,
     current_user: CurrentUser = Depends(require_permission("read", "monedas")),
     db: AsyncSession = Depends(get_db),
 ):
-    q = select(Moneda).order_by(Moneda.id_moneda)
-    result = await db.execute(q)
-    rows = result.scalars().all()
-    return [MonedaResponse.model_validate(r) for r in rows]
+    return etag.json_response(request, await monedas_cache.list_monedas(db))
+
+
+@router.get("/tipos-cambio", response_model=List[TipoCambioResponse])
+async def list_tipos_cambio(
+    origen: int,
+    destino: int,
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: CurrentUser = Depends(require_permission("read", "monedas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """Historial de tasas de un par, de la más reciente a la más antigua."""
+    res = await db.execute(
+        tipo_cambio.LIST_SQL, {"origen": origen, "destino": destino, "limit": limit}
+    )
+    return [
+        TipoCambioResponse(
+            moneda_origen=r["moneda_origen"],
+            moneda_destino=r["moneda_destino"],
+            vigente_desde=r["vigente_desde"],
+            tasa=r["tasa"],
+            actualizado_en=r["actualizado_en"],
+        )
+        for r in res.mappings().all()
+    ]
+
+
+@router.put("/tipos-cambio", response_model=TipoCambioResponse)
+async def upsert_tipo_cambio(
+    payload: TipoCambioUpsert,
+    current_user: CurrentUser = Depends(require_permission("update", "monedas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Crea o corrige la tasa de un par desde una fecha. Las ventas ya creadas
+    conservan su tasa; para recalcularlas: backfill venta-total-base --todas.
+    """
+    if payload.moneda_origen == payload.moneda_destino:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Currencies must be different",
+        )
+    for moneda_id in (payload.moneda_origen, payload.moneda_destino):
+        if await monedas_cache.get_moneda(db, moneda_id) is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Currency {moneda_id} does not exist",
+            )
+
+    res = await db.execute(
+        tipo_cambio.UPSERT_SQL,
+        {
+            "origen": payload.moneda_origen,
+            "destino": payload.moneda_destino,
+            "vigente_desde": payload.vigente_desde,
+            "tasa": payload.tasa,
+        },
+    )
+    r = res.mappings().one()
+    await invalidation.publish(db, "tipo_cambio")
+    return TipoCambioResponse(
+        moneda_origen=r["moneda_origen"],
+        moneda_destino=r["moneda_destino"],
+        vigente_desde=r["vigente_desde"],
+        tasa=r["tasa"],
+        actualizado_en=r["actualizado_en"],
+    )
 
 
 @router.get("/{moneda_id}", response_model=MonedaResponse)
 async def get_moneda(
     moneda_id: int,
+    request: Request,
     current_user: CurrentUser = Depends(require_permission("read", "monedas")),
     db: AsyncSession = Depends(get_db),
 ):
-    q = select(Moneda).where(Moneda.id_moneda == moneda_id)
-    result = await db.execute(q)
-    moneda = result.scalar_one_or_none()
+    moneda = await monedas_cache.get_moneda(db, moneda_id)
     if not moneda:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Currency not found",
         )
-    return MonedaResponse.model_validate(moneda)
+    return etag.json_response(request, moneda)
 
 
 @router.post("", response_model=MonedaResponse, status_code=status.HTTP_201_CREATED)
@@ -55,6 +120,7 @@ async def create_moneda(
     db.add(moneda)
     await db.flush()
     await db.refresh(moneda)
+    await invalidation.publish(db, "moneda", id=moneda.id_moneda)
     return MonedaResponse.model_validate(moneda)
 
 
@@ -80,6 +146,7 @@ async def update_moneda(
 
     await db.flush()
     await db.refresh(moneda)
+    await invalidation.publish(db, "moneda", id=moneda.id_moneda)
     return MonedaResponse.model_validate(moneda)
 
 
@@ -99,4 +166,5 @@ async def delete_moneda(
         )
 
     await db.delete(moneda)
+    await invalidation.publish(db, "moneda", id=moneda_id)
     return None
@@ -1,15 +1,31 @@
 # app/routers/ventas.py
-from typing import List
-
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
+from sqlalchemy.sql.elements import TextClause
 
-from app.database import get_db
-from app.deps import require_permission, CurrentUser
+from app.config import get_settings
+from app.deps import authenticate_stream, get_db, require_permission, CurrentUser
 from app.models.venta import Venta
 from app.models.venta_detalle import VentaDetalle
 from app.models.cliente import Cliente
+from app.schemas.cliente import ClienteResponse
+from app.schemas.reporte import (
+    DimensionReporte,
+    DimensionTop,
+    ReporteDiarioItem,
+    ReporteDimensionItem,
+    ReporteIngresos,
+    ReporteIngresosDia,
+    TopItem,
+)
 from app.schemas.venta import (
     VentaCreate,
     VentaResponse,
@@ -21,44 +37,246 @@ from app.schemas.venta import (
     ProductoSummary,
     VentaDetalleResponse,
 )
+from app.schemas.sync import ChangesResponse, Tombstone
+from app.services import (
+    columnar,
+    etag,
+    idempotency,
+    live_feed,
+    monedas_cache,
+    outbox,
+    rollups,
+    sync_feed,
+    tipo_cambio,
+)
+from app.services.singleflight import SingleFlight
 
 router = APIRouter(prefix="/ventas", tags=["ventas"])
 
 
+VENTA_VERSION_SQL = text(
+    """
+    SELECT md5(
+        v.xmin::text || ':' || c.xmin::text || ':' || m.xmin::text || ':' || u.xmin::text || ':' ||
+        COALESCE((
+            SELECT string_agg(d.xmin::text || '.' || p.xmin::text, ',' ORDER BY d.id_venta_detalle)
+            FROM venta_detalle d
+            JOIN productos p ON p.id_producto = d.productos_id_producto
+            WHERE d.venta_id_venta = v.id_venta
+              AND (d.fecha_venta = v.fecha_creacion OR d.fecha_venta IS NULL)
+        ), '')
+    ) AS version
+    FROM venta v
+    JOIN clientes c ON c.id_cliente = v.clientes_id_cliente
+    JOIN moneda m ON m.id_moneda = v.moneda_id_moneda
+    JOIN usuarios u ON u.id_usuario = v.usuarios_id_usuario
+    WHERE v.id_venta = :venta_id
+      AND v.empresas_id_empresa = :empresa_id
+    LIMIT 1
+    """
+)
+
+
+VENTA_HEADER_SQL = text(
+    """
+    SELECT 
+        v.id_venta,
+        v.descuento,
+        v.razon_social,
+        v.nit,
+        v.total,
+        v.fecha_creacion,
+        c.id_cliente,
+        c.nombre AS cliente_nombre,
+        m.id_moneda,
+        m.nombre AS moneda_nombre,
+        u.id_usuario,
+        u.nombre AS usuario_nombre,
+        u.apellido AS usuario_apellido,
+        u.email AS usuario_email
+    FROM venta v
+    JOIN clientes c ON c.id_cliente = v.clientes_id_cliente
+    JOIN moneda m ON m.id_moneda = v.moneda_id_moneda
+    JOIN usuarios u ON u.id_usuario = v.usuarios_id_usuario
+    WHERE v.id_venta = :venta_id
+      AND v.empresas_id_empresa = :empresa_id
+    LIMIT 1
+    """
+)
+
+
+VENTA_ITEMS_SQL = text(
+    """
+    SELECT
+        d.id_venta_detalle,
+        d.cantidad,
+        d.precio_unitario,
+        d.descuento_item,
+        p.id_producto,
+        p.nombre AS producto_nombre,
+        p.codigo_sku,
+        p.codigo_barra
+    FROM venta_detalle d
+    JOIN productos p ON p.id_producto = d.productos_id_producto
+    WHERE d.venta_id_venta = :venta_id
+      -- fecha_venta es la clave de partición: limita la búsqueda a un mes.
+      -- IS NULL cubre detalles anteriores a la columna (solo sin particionar).
+      AND (d.fecha_venta = :fecha_venta OR d.fecha_venta IS NULL)
+    ORDER BY d.id_venta_detalle
+    """
+)
+
+
+_LIST_VENTAS_TEMPLATE = """
+    SELECT 
+        v.id_venta,
+        v.descuento,
+        v.razon_social,
+        v.nit,
+        v.total,
+        c.id_cliente,
+        c.nombre AS cliente_nombre,
+        m.id_moneda,
+        m.nombre AS moneda_nombre,
+        u.id_usuario,
+        u.nombre AS usuario_nombre,
+        u.apellido AS usuario_apellido,
+        u.email AS usuario_email
+    FROM venta v
+    JOIN clientes c ON c.id_cliente = v.clientes_id_cliente
+    JOIN moneda m ON m.id_moneda = v.moneda_id_moneda
+    JOIN usuarios u ON u.id_usuario = v.usuarios_id_usuario
+    WHERE v.empresas_id_empresa = :empresa_id{filters}
+    ORDER BY v.id_venta DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+# Conteo acotado: nunca recorre más de :count_limit filas
+_COUNT_VENTAS_TEMPLATE = """
+    SELECT count(*)
+    FROM (
+        SELECT 1
+        FROM venta v
+        WHERE v.empresas_id_empresa = :empresa_id{filters}
+        LIMIT :count_limit
+    ) s
+"""
+
+_ESTIMATE_VENTAS_TEMPLATE = """
+    EXPLAIN (FORMAT JSON)
+    SELECT 1
+    FROM venta v
+    WHERE v.empresas_id_empresa = :empresa_id{filters}
+"""
+
+
+_list_flight = SingleFlight("ventas.list")
+
+VENTAS_COLUMNAR = columnar.ColumnarSpec(
+    columns=(
+        "id_venta", "descuento", "razon_social", "nit", "total",
+        "id_cliente", "id_moneda", "id_usuario",
+    ),
+    lookups={
+        "clientes": ("id_cliente", {"nombre": "cliente_nombre"}),
+        "monedas": ("id_moneda", {"nombre": "moneda_nombre"}),
+        "usuarios": (
+            "id_usuario",
+            {"nombre": "usuario_nombre", "apellido": "usuario_apellido", "email": "usuario_email"},
+        ),
+    },
+)
+
+
+def _filters_sql(template: str, filters: Tuple[str, ...]) -> TextClause:
+    extra = "".join(f"\n      AND {f}" for f in filters)
+    return text(template.format(filters=extra))
+
+
+@lru_cache()
+def list_ventas_sql(filters: Tuple[str, ...] = ()) -> TextClause:
+    """
+    SQL de list_ventas con condiciones extra (fragmentos fijos del código,
+    nunca input del usuario). Una sentencia por combinación de filtros, para
+    que el planner vea predicados concretos y pueda podar particiones.
+    """
+    return _filters_sql(_LIST_VENTAS_TEMPLATE, filters)
+
+
+@lru_cache()
+def count_ventas_sql(filters: Tuple[str, ...] = ()) -> TextClause:
+    return _filters_sql(_COUNT_VENTAS_TEMPLATE, filters)
+
+
+@lru_cache()
+def estimate_ventas_sql(filters: Tuple[str, ...] = ()) -> TextClause:
+    return _filters_sql(_ESTIMATE_VENTAS_TEMPLATE, filters)
+
+
+PRODUCTOS_EMPRESA_SQL = text(
+    """
+    SELECT id_producto
+    FROM productos
+    WHERE id_producto = ANY(:ids)
+      AND empresas_id_empresa = :empresa_id
+    """
+)
+
+
+def _venta_list_item(r) -> VentaListItem:
+    """Arma un VentaListItem desde una fila con las columnas de list_ventas."""
+    cliente = ClienteSummary(
+        id_cliente=r["id_cliente"],
+        nombre=r["cliente_nombre"],
+    )
+    moneda = MonedaSummary(
+        id_moneda=r["id_moneda"],
+        nombre=r["moneda_nombre"],
+    )
+    usuario = UsuarioSummary(
+        id_usuario=r["id_usuario"],
+        nombre=r["usuario_nombre"],
+        apellido=r["usuario_apellido"],
+        email=r["usuario_email"],
+    )
+    return VentaListItem(
+        id_venta=r["id_venta"],
+        descuento=r["descuento"],
+        razon_social=r["razon_social"],
+        nit=r["nit"],
+        total=r["total"],
+        cliente=cliente,
+        moneda=moneda,
+        usuario=usuario,
+    )
+
+
+async def _venta_version(
+    venta_id: int,
+    current_user: CurrentUser,
+    db: AsyncSession,
+) -> Optional[str]:
+    """
+    Versión barata de una venta para el ETag: hash de los xmin de todas
+    las filas que aparecen en VentaResponse (venta, cliente, moneda,
+    usuario, detalles y productos). Cambia si cualquiera se actualiza.
+    """
+    res = await db.execute(
+        VENTA_VERSION_SQL,
+        {"venta_id": venta_id, "empresa_id": current_user.empresa.id_empresa},
+    )
+    return res.scalar_one_or_none()
+
+
 async def _build_venta_response(
     venta_id: int,
     current_user: CurrentUser,
     db: AsyncSession,
 ) -> VentaResponse:
     # Cabecera
-    sql_header = text(
-        """
-        SELECT 
-            v.id_venta,
-            v.descuento,
-            v.razon_social,
-            v.nit,
-            v.total,
-            c.id_cliente,
-            c.nombre AS cliente_nombre,
-            m.id_moneda,
-            m.nombre AS moneda_nombre,
-            u.id_usuario,
-            u.nombre AS usuario_nombre,
-            u.apellido AS usuario_apellido,
-            u.email AS usuario_email
-        FROM venta v
-        JOIN clientes c ON c.id_cliente = v.clientes_id_cliente
-        JOIN moneda m ON m.id_moneda = v.moneda_id_moneda
-        JOIN usuarios u ON u.id_usuario = v.usuarios_id_usuario
-        WHERE v.id_venta = :venta_id
-          AND c.empresas_id_empresa = :empresa_id
-        LIMIT 1
-        """
-    )
-
     res_header = await db.execute(
-        sql_header,
+        VENTA_HEADER_SQL,
         {"venta_id": venta_id, "empresa_id": current_user.empresa.id_empresa},
     )
     header = res_header.mappings().first()
@@ -69,25 +287,10 @@ async def _build_venta_response(
         )
 
     # Detalles
-    sql_items = text(
-        """
-        SELECT
-            d.id_venta_detalle,
-            d.cantidad,
-            d.precio_unitario,
-            d.descuento_item,
-            p.id_producto,
-            p.nombre AS producto_nombre,
-            p.codigo_sku,
-            p.codigo_barra
-        FROM venta_detalle d
-        JOIN productos p ON p.id_producto = d.productos_id_producto
-        WHERE d.venta_id_venta = :venta_id
-        ORDER BY d.id_venta_detalle
-        """
+    res_items = await db.execute(
+        VENTA_ITEMS_SQL,
+        {"venta_id": venta_id, "fecha_venta": header["fecha_creacion"]},
     )
-
-    res_items = await db.execute(sql_items, {"venta_id": venta_id})
     rows_items = res_items.mappings().all()
 
     items: List[VentaDetalleResponse] = []
@@ -136,99 +339,411 @@ async def _build_venta_response(
     )
 
 
-@router.get("", response_model=List[VentaListItem])
+def _nit_range(prefix: str) -> Tuple[str, str]:
+    """[desde, hasta) en collation "C" que cubre los NIT que empiezan con `prefix`."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+async def _count_ventas(
+    db: AsyncSession, filters: Tuple[str, ...], params: dict
+) -> Tuple[int, bool]:
+    """
+    (total, exacto). Hasta VENTAS_COUNT_EXACT_LIMIT filas se cuentan; por
+    encima se usa la estimación del planner, así contar nunca cuesta más
+    que leer unas pocas páginas.
+    """
+    limit = get_settings().ventas_count_exact_limit
+    res = await db.execute(count_ventas_sql(filters), {**params, "count_limit": limit + 1})
+    exact = res.scalar()
+    if exact <= limit:
+        return exact, True
+    plan = (await db.execute(estimate_ventas_sql(filters), params)).scalar()
+    return max(int(plan[0]["Plan"]["Plan Rows"]), exact), False
+
+
+@router.get("", response_model=List[VentaListItem], responses=columnar.OPENAPI_RESPONSES)
 async def list_ventas(
+    request: Request,
     limit: int = Query(50, ge=1, le=200),
     offset: int = Query(0, ge=0),
+    desde: Optional[datetime] = Query(None, description="fecha_creacion >= desde"),
+    hasta: Optional[datetime] = Query(None, description="fecha_creacion < hasta"),
+    cliente_id: Optional[int] = Query(None),
+    moneda_id: Optional[int] = Query(None),
+    usuario_id: Optional[int] = Query(None, description="vendedor"),
+    nit: Optional[str] = Query(None, min_length=1, max_length=30, description="prefijo del NIT"),
+    total_min: Optional[int] = Query(None, ge=0, description="total >= total_min"),
+    total_max: Optional[int] = Query(None, ge=0, description="total <= total_max"),
     current_user: CurrentUser = Depends(require_permission("read", "ventas")),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Lista ventas de la empresa del usuario actual, incluyendo
     cliente, moneda y vendedor.
+
+    Con `desde`/`hasta` solo se leen las particiones mensuales del rango.
+    Los filtros se combinan con AND. El header `X-Total-Count` trae el total
+    de ventas que cumplen los filtros; si `X-Total-Count-Exact` es `false`
+    es una estimación.
+
+    Con `Accept: application/vnd.columnar+json` responde en formato columnar.
     """
 
-    sql = text(
-        """
-        SELECT 
-            v.id_venta,
-            v.descuento,
-            v.razon_social,
-            v.nit,
-            v.total,
-            c.id_cliente,
-            c.nombre AS cliente_nombre,
-            m.id_moneda,
-            m.nombre AS moneda_nombre,
-            u.id_usuario,
-            u.nombre AS usuario_nombre,
-            u.apellido AS usuario_apellido,
-            u.email AS usuario_email
-        FROM venta v
-        JOIN clientes c ON c.id_cliente = v.clientes_id_cliente
-        JOIN moneda m ON m.id_moneda = v.moneda_id_moneda
-        JOIN usuarios u ON u.id_usuario = v.usuarios_id_usuario
-        WHERE c.empresas_id_empresa = :empresa_id
-        ORDER BY v.id_venta DESC
-        LIMIT :limit OFFSET :offset
-        """
+    params = {"empresa_id": current_user.empresa.id_empresa}
+    filters: List[str] = []
+    if desde is not None:
+        filters.append("v.fecha_creacion >= :desde")
+        params["desde"] = desde
+    if hasta is not None:
+        filters.append("v.fecha_creacion < :hasta")
+        params["hasta"] = hasta
+    if cliente_id is not None:
+        filters.append("v.clientes_id_cliente = :cliente_id")
+        params["cliente_id"] = cliente_id
+    if moneda_id is not None:
+        filters.append("v.moneda_id_moneda = :moneda_id")
+        params["moneda_id"] = moneda_id
+    if usuario_id is not None:
+        filters.append("v.usuarios_id_usuario = :usuario_id")
+        params["usuario_id"] = usuario_id
+    if nit is not None:
+        filters.append('(v.nit COLLATE "C") >= :nit_desde')
+        filters.append('(v.nit COLLATE "C") < :nit_hasta')
+        params["nit_desde"], params["nit_hasta"] = _nit_range(nit)
+    if total_min is not None:
+        filters.append("v.total >= :total_min")
+        params["total_min"] = total_min
+    if total_max is not None:
+        filters.append("v.total <= :total_max")
+        params["total_max"] = total_max
+    filters_key = tuple(filters)
+
+    async def _query():
+        res = await db.execute(
+            list_ventas_sql(filters_key), {**params, "limit": limit, "offset": offset}
+        )
+        rows = res.mappings().all()
+        total, exact = await _count_ventas(db, filters_key, params)
+        return rows, total, exact
+
+    # Varios tabs del mismo dashboard piden la misma página a la vez
+    key = (tuple(sorted(params.items())), limit, offset)
+    rows, total, exact = await _list_flight.do(key, _query)
+    if columnar.wants_columnar(request):
+        response = etag.json_response(
+            request,
+            columnar.encode(rows, VENTAS_COLUMNAR),
+            media_type=columnar.MEDIA_TYPE,
+            vary="Accept",
+        )
+    else:
+        response = etag.json_response(
+            request, [_venta_list_item(r) for r in rows], vary="Accept"
+        )
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Total-Count-Exact"] = "true" if exact else "false"
+    return response
+
+
+@router.get("/changes", response_model=ChangesResponse)
+async def ventas_changes(
+    since: str = Query("", description="cursor devuelto por la llamada anterior; vacío = todo"),
+    limit: int = Query(500, ge=1, le=2000),
+    current_user: CurrentUser = Depends(require_permission("read", "ventas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Feed de cambios para clientes offline: ventas y clientes creados o
+    modificados, y ventas/clientes eliminados, desde `since`. El costo
+    depende de cuántos cambios hubo, no del tamaño de los datos.
+    """
+    if not current_user.has_permission("read", "clientes"):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Permission denied: read on clientes",
+        )
+
+    positions = sync_feed.decode_cursor(since)
+    horizon = (await db.execute(sync_feed.HORIZON_SQL)).scalar()
+    base = {
+        "empresa_id": current_user.empresa.id_empresa,
+        "horizon": horizon,
+        "limit": limit,
+    }
+
+    def _params(stream: str) -> dict:
+        version, id_ = positions[stream]
+        return {**base, "version": version, "id": id_}
+
+    venta_rows = (
+        await db.execute(sync_feed.VENTAS_CHANGES_SQL, _params("ventas"))
+    ).mappings().all()
+    cliente_rows = (
+        await db.execute(sync_feed.CLIENTES_CHANGES_SQL, _params("clientes"))
+    ).mappings().all()
+    tombstone_rows = (
+        await db.execute(sync_feed.TOMBSTONES_CHANGES_SQL, _params("eliminados"))
+    ).mappings().all()
+
+    if venta_rows:
+        positions["ventas"] = (venta_rows[-1]["sync_version"], venta_rows[-1]["id_venta"])
+    if cliente_rows:
+        positions["clientes"] = (cliente_rows[-1]["sync_version"], cliente_rows[-1]["id_cliente"])
+    if tombstone_rows:
+        positions["eliminados"] = (
+            tombstone_rows[-1]["sync_version"],
+            tombstone_rows[-1]["id_tombstone"],
+        )
+
+    return ChangesResponse(
+        ventas=[_venta_list_item(r) for r in venta_rows],
+        clientes=[ClienteResponse.model_validate(dict(r)) for r in cliente_rows],
+        eliminados=[
+            Tombstone(entidad=r["entidad"], id=r["id_entidad"], eliminado_en=r["eliminado_en"])
+            for r in tombstone_rows
+        ],
+        cursor=sync_feed.encode_cursor(positions),
+        has_more=any(
+            len(rows) == limit for rows in (venta_rows, cliente_rows, tombstone_rows)
+        ),
+    )
+
+
+def _rango_reporte(desde: Optional[date], hasta: Optional[date]) -> Tuple[date, date]:
+    """Por defecto, los últimos 30 días incluyendo hoy. `hasta` es exclusivo."""
+    hasta = hasta or date.today() + timedelta(days=1)
+    desde = desde or hasta - timedelta(days=30)
+    if desde >= hasta:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="desde must be before hasta",
+        )
+    return desde, hasta
+
+
+@router.get("/live")
+async def ventas_live(request: Request):
+    """
+    Stream SSE de ventas nuevas de la empresa (evento `venta` con un
+    VentaListItem). Un evento `resync` indica que se perdieron eventos y
+    hay que volver a leer GET /ventas.
+    """
+    current_user = await authenticate_stream(request, "read", "ventas")
+    keepalive = get_settings().live_keepalive_seconds
+    empresa_id = current_user.empresa.id_empresa
+    # Antes de empezar la respuesta: adentro del stream ya no se puede devolver 429
+    live_feed.check_capacity(empresa_id)
+
+    async def _events():
+        async with live_feed.subscription(empresa_id) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield event
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
+
+@router.get("/reportes/diario", response_model=List[ReporteDiarioItem])
+async def reporte_diario(
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None, description="exclusivo"),
+    current_user: CurrentUser = Depends(require_permission("read", "ventas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Cantidad de ventas, unidades y total por día y moneda.
+    Se lee de venta_rollup, no de las ventas.
+    """
+    desde, hasta = _rango_reporte(desde, hasta)
     res = await db.execute(
-        sql,
+        rollups.REPORTE_DIARIO_SQL,
         {
             "empresa_id": current_user.empresa.id_empresa,
-            "limit": limit,
-            "offset": offset,
+            "desde": desde,
+            "hasta": hasta,
         },
     )
+    return [
+        ReporteDiarioItem(
+            dia=r["dia"],
+            moneda_id=r["moneda_id_moneda"],
+            num_ventas=r["num_ventas"],
+            unidades=r["unidades"],
+            total=r["total"],
+        )
+        for r in res.mappings().all()
+    ]
 
-    rows = res.mappings().all()
-    ventas: List[VentaListItem] = []
 
-    for r in rows:
-        cliente = ClienteSummary(
-            id_cliente=r["id_cliente"],
-            nombre=r["cliente_nombre"],
-        )
-        moneda = MonedaSummary(
-            id_moneda=r["id_moneda"],
-            nombre=r["moneda_nombre"],
-        )
-        usuario = UsuarioSummary(
-            id_usuario=r["id_usuario"],
-            nombre=r["usuario_nombre"],
-            apellido=r["usuario_apellido"],
-            email=r["usuario_email"],
+def _centavos(monto: Decimal) -> Decimal:
+    return monto.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+@router.get("/reportes/ingresos", response_model=ReporteIngresos)
+async def reporte_ingresos(
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None, description="exclusivo"),
+    current_user: CurrentUser = Depends(require_permission("read", "ventas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Ingresos de todas las monedas convertidos a la moneda base, por día.
+    Cada venta se convirtió con la tasa vigente el día en que se hizo; las
+    que no tenían tasa no suman y se cuentan en `ventas_sin_tasa`.
+    """
+    moneda_base_id = get_settings().moneda_base_id
+    if moneda_base_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Base currency is not configured",
         )
-        ventas.append(
-            VentaListItem(
-                id_venta=r["id_venta"],
-                descuento=r["descuento"],
-                razon_social=r["razon_social"],
-                nit=r["nit"],
-                total=r["total"],
-                cliente=cliente,
-                moneda=moneda,
-                usuario=usuario,
+    desde, hasta = _rango_reporte(desde, hasta)
+    res = await db.execute(
+        rollups.REPORTE_INGRESOS_SQL,
+        {
+            "empresa_id": current_user.empresa.id_empresa,
+            "desde": desde,
+            "hasta": hasta,
+        },
+    )
+    rows = res.mappings().all()
+    return ReporteIngresos(
+        moneda_base_id=moneda_base_id,
+        num_ventas=sum(r["num_ventas"] for r in rows),
+        # Se suma exacto y se redondea solo al responder
+        total_base=_centavos(sum((r["total_base"] for r in rows), Decimal(0))),
+        ventas_sin_tasa=sum(r["ventas_sin_tasa"] for r in rows),
+        dias=[
+            ReporteIngresosDia(
+                dia=r["dia"],
+                num_ventas=r["num_ventas"],
+                total_base=_centavos(r["total_base"]),
+                ventas_sin_tasa=r["ventas_sin_tasa"],
             )
+            for r in rows
+        ],
+    )
+
+
+@router.get("/top/{dimension}", response_model=List[TopItem])
+async def top_ventas(
+    dimension: DimensionTop,
+    moneda_id: int,
+    dias: int = Query(7, ge=1, le=366, description="ventana móvil en días, incluyendo hoy"),
+    n: int = Query(20, ge=1, le=rollups.TOP_MAX_N),
+    current_user: CurrentUser = Depends(require_permission("read", "ventas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Top N productos o clientes por total vendido en la ventana, en una moneda.
+
+    Las ventanas de 1, 7 y 30 días se leen del ranking precalculado
+    (venta_top, refrescado en segundo plano); otras se calculan sobre
+    venta_rollup.
+    """
+    params = {
+        "empresa_id": current_user.empresa.id_empresa,
+        "dimension": dimension.value,
+        "moneda_id": moneda_id,
+        "dias": dias,
+        "n": n,
+    }
+    if dias in rollups.TOP_VENTANAS:
+        res = await db.execute(rollups.TOP_SQL, params)
+    else:
+        hoy = rollups.venta_dia(datetime.now(timezone.utc))
+        res = await db.execute(rollups.TOP_AL_VUELO_SQL, {**params, "hoy": hoy})
+    return [
+        TopItem(
+            posicion=r["posicion"],
+            id=r["clave"],
+            nombre=r["nombre"],
+            moneda_id=r["moneda_id_moneda"],
+            num_ventas=r["num_ventas"],
+            unidades=r["unidades"],
+            total=r["total"],
         )
+        for r in res.mappings().all()
+    ]
+
 
-    return ventas
+@router.get("/reportes/{dimension}", response_model=List[ReporteDimensionItem])
+async def reporte_por_dimension(
+    dimension: DimensionReporte,
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None, description="exclusivo"),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: CurrentUser = Depends(require_permission("read", "ventas")),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Totales del rango agrupados por cliente, moneda, vendedor o producto,
+    ordenados por total. Para productos el total es el de sus líneas,
+    antes del descuento global de la venta.
+    """
+    desde, hasta = _rango_reporte(desde, hasta)
+    params = {
+        "empresa_id": current_user.empresa.id_empresa,
+        "desde": desde,
+        "hasta": hasta,
+        "limit": limit,
+    }
+    if dimension == DimensionReporte.moneda:
+        res = await db.execute(rollups.REPORTE_MONEDA_SQL, params)
+    else:
+        res = await db.execute(
+            rollups.REPORTE_DIMENSION_SQL,
+            {**params, "dimension": dimension.value},
+        )
+    return [
+        ReporteDimensionItem(
+            id=r["clave"],
+            moneda_id=r["moneda_id_moneda"],
+            num_ventas=r["num_ventas"],
+            unidades=r["unidades"],
+            total=r["total"],
+        )
+        for r in res.mappings().all()
+    ]
 
 
 @router.get("/{venta_id}", response_model=VentaResponse)
 async def get_venta(
     venta_id: int,
+    request: Request,
     current_user: CurrentUser = Depends(require_permission("read", "ventas")),
     db: AsyncSession = Depends(get_db),
 ):
-    return await _build_venta_response(venta_id, current_user, db)
+    version = await _venta_version(venta_id, current_user, db)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sale not found",
+        )
+
+    # Si el cliente ya tiene esta versión no se arma la respuesta completa
+    venta_etag = etag.weak(version)
+    if etag.matches(request, venta_etag):
+        return etag.not_modified(venta_etag)
+
+    venta = await _build_venta_response(venta_id, current_user, db)
+    return etag.json_response(request, venta, etag=venta_etag)
 
 
 @router.post("", response_model=VentaResponse, status_code=status.HTTP_201_CREATED)
 async def create_venta(
     payload: VentaCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: CurrentUser = Depends(require_permission("create", "ventas")),
     db: AsyncSession = Depends(get_db),
 ):
@@ -237,8 +752,21 @@ async def create_venta(
 
     - descuento: descuento global de la venta
     - items: lista de productos, cantidad, precio_unitario, descuento_item
+
+    Con el header `Idempotency-Key`, un retry devuelve la venta original
+    en vez de crear otra.
     """
 
+    if idempotency_key:
+        req_hash = idempotency.request_hash(payload)
+        stored = await idempotency.begin(
+            db, current_user.empresa.id_empresa, "ventas", idempotency_key, req_hash
+        )
+        if stored:
+            response.status_code = stored.status_code
+            response.headers["Idempotent-Replayed"] = "true"
+            return VentaResponse.model_validate(stored.body)
+
     if not payload.items:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -259,10 +787,14 @@ async def create_venta(
         )
 
     # 2) Validar moneda existe
-    # (tabla global, sin empresa)
-    moneda_sql = text("SELECT id_moneda FROM moneda WHERE id_moneda = :id LIMIT 1")
-    res_moneda = await db.execute(moneda_sql, {"id": payload.moneda_id})
-    if not res_moneda.fetchone():
+    # (tabla global, sin empresa; se consulta la cache y solo se va a la BD
+    # si la moneda no está, por si fue creada en otro worker)
+    moneda_ok = await monedas_cache.get_moneda(db, payload.moneda_id) is not None
+    if not moneda_ok:
+        moneda_sql = text("SELECT id_moneda FROM moneda WHERE id_moneda = :id LIMIT 1")
+        res_moneda = await db.execute(moneda_sql, {"id": payload.moneda_id})
+        moneda_ok = res_moneda.fetchone() is not None
+    if not moneda_ok:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Currency does not exist",
@@ -270,16 +802,8 @@ async def create_venta(
 
     # 3) Validar productos pertenecen a la empresa
     product_ids = {item.producto_id for item in payload.items}
-    prod_sql = text(
-        """
-        SELECT id_producto
-        FROM productos
-        WHERE id_producto = ANY(:ids)
-          AND empresas_id_empresa = :empresa_id
-        """
-    )
     res_prod = await db.execute(
-        prod_sql,
+        PRODUCTOS_EMPRESA_SQL,
         {
             "ids": list(product_ids),
             "empresa_id": current_user.empresa.id_empresa,
@@ -302,7 +826,13 @@ async def create_venta(
     if total < 0:
         total = 0
 
-    # 5) Crear venta
+    # 5) Crear venta, ya con su total en moneda base: la tasa (cacheada)
+    # solo depende de la moneda y del día, así que va en el mismo INSERT.
+    # La fecha se fija aquí para que el día de la tasa sea el de la venta.
+    fecha_creacion = datetime.now(timezone.utc)
+    tasa_base = await tipo_cambio.tasa_base(
+        db, payload.moneda_id, rollups.venta_dia(fecha_creacion)
+    )
     venta = Venta(
         descuento=payload.descuento,
         razon_social=payload.razon_social,
@@ -311,6 +841,10 @@ async def create_venta(
         moneda_id_moneda=payload.moneda_id,
         total=total,
         usuarios_id_usuario=current_user.usuario.id_usuario,
+        empresas_id_empresa=current_user.empresa.id_empresa,
+        fecha_creacion=fecha_creacion,
+        tasa_base=tasa_base,
+        total_base=tipo_cambio.convertir(total, tasa_base),
     )
     db.add(venta)
     await db.flush()  # para tener id_venta
@@ -323,10 +857,59 @@ async def create_venta(
             precio_unitario=item.precio_unitario,
             descuento_item=item.descuento_item,
             productos_id_producto=item.producto_id,
+            fecha_venta=venta.fecha_creacion,
         )
         db.add(detalle)
 
     await db.flush()
 
     # 7) Devolver venta completa
-    return await _build_venta_response(venta.id_venta, current_user, db)
+    venta_response = await _build_venta_response(venta.id_venta, current_user, db)
+
+    # 8) Agregados para reportes (al final: sus locks duran hasta el commit)
+    await rollups.record_venta(
+        db,
+        empresa_id=current_user.empresa.id_empresa,
+        fecha=venta.fecha_creacion,
+        moneda_id=payload.moneda_id,
+        cliente_id=payload.cliente_id,
+        usuario_id=current_user.usuario.id_usuario,
+        total=total,
+        items=[
+            (
+                item.producto_id,
+                item.cantidad,
+                (item.precio_unitario - item.descuento_item) * item.cantidad,
+            )
+            for item in payload.items
+        ],
+        tasa_base=tasa_base,
+    )
+
+    # 9) Aviso al feed en vivo (se entrega al hacer commit)
+    await live_feed.publish(
+        db,
+        current_user.empresa.id_empresa,
+        VentaListItem.model_validate(venta_response.model_dump(exclude={"items"})),
+    )
+
+    # 10) Evento para inventario / reportes (lo publica la tarea del outbox)
+    await outbox.enqueue(
+        db,
+        current_user.empresa.id_empresa,
+        "venta.creada",
+        venta_response.model_dump(mode="json"),
+    )
+
+    if idempotency_key:
+        await idempotency.complete(
+            db,
+            current_user.empresa.id_empresa,
+            "ventas",
+            idempotency_key,
+            req_hash,
+            status.HTTP_201_CREATED,
+            venta_response.model_dump(mode="json"),
+        )
+
+    return venta_response
@@ -1,6 +1,6 @@
 # app/schemas/cliente.py
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from typing import List, Optional
+from pydantic import BaseModel, EmailStr, Field
 
 
 class ClienteBase(BaseModel):
@@ -23,6 +23,16 @@ class ClienteUpdate(BaseModel):
     notas: Optional[str] = None
 
 
+class ClienteBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+    # Los mismos cambios se aplican a todos los ids
+    cambios: ClienteUpdate
+
+
+class ClienteBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=1000)
+
+
 class ClienteResponse(ClienteBase):
     id_cliente: int
 
@@ -30,9 +40,39 @@ class ClienteResponse(ClienteBase):
         from_attributes = True
 
 
+class ClienteBulkUpdateResult(BaseModel):
+    actualizados: List[ClienteResponse]
+    no_encontrados: List[int]
+
+
+class ClienteBulkDeleteResult(BaseModel):
+    eliminados: List[int]
+    no_encontrados: List[int]
+
+
 class ClienteSummary(BaseModel):
     id_cliente: int
     nombre: str
 
     class Config:
         from_attributes = True
+
+
+class ClienteImportError(BaseModel):
+    fila: int
+    errores: List[str]
+
+
+class ClienteImportResult(BaseModel):
+    recibidas: int
+    insertadas: int
+    con_error: int
+    # Solo las primeras CLIENTES_IMPORT_MAX_ERRORS; el resto se cuenta en con_error
+    errores: List[ClienteImportError]
+
+
+class ClienteSuggestion(BaseModel):
+    id_cliente: int
+    nombre: str
+    telefono: str
+    email: str
@@ -1,6 +1,8 @@
 # app/schemas/moneda.py
+from datetime import date, datetime
+from decimal import Decimal
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class MonedaBase(BaseModel):
@@ -28,3 +30,15 @@ class MonedaSummary(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TipoCambioUpsert(BaseModel):
+    # 1 unidad de moneda_origen = tasa unidades de moneda_destino
+    moneda_origen: int
+    moneda_destino: int
+    vigente_desde: date
+    tasa: Decimal = Field(gt=0)
+
+
+class TipoCambioResponse(TipoCambioUpsert):
+    actualizado_en: datetime
@@ -0,0 +1,63 @@
+# app/schemas/reporte.py
+from datetime import date
+from decimal import Decimal
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class DimensionReporte(str, Enum):
+    cliente = "cliente"
+    moneda = "moneda"
+    usuario = "usuario"
+    producto = "producto"
+
+
+class ReporteDiarioItem(BaseModel):
+    dia: date
+    moneda_id: int
+    num_ventas: int
+    unidades: int
+    total: int
+
+
+class ReporteDimensionItem(BaseModel):
+    # id del cliente / moneda / usuario / producto según la dimensión
+    id: int
+    moneda_id: int
+    num_ventas: int
+    unidades: int
+    total: int
+
+
+class ReporteIngresosDia(BaseModel):
+    dia: date
+    num_ventas: int
+    # En la moneda base; no incluye las ventas sin tasa
+    total_base: Decimal
+    ventas_sin_tasa: int
+
+
+class ReporteIngresos(BaseModel):
+    moneda_base_id: int
+    num_ventas: int
+    total_base: Decimal
+    ventas_sin_tasa: int
+    dias: List[ReporteIngresosDia]
+
+
+class DimensionTop(str, Enum):
+    producto = "producto"
+    cliente = "cliente"
+
+
+class TopItem(BaseModel):
+    posicion: int
+    # id del producto o cliente
+    id: int
+    nombre: Optional[str] = None
+    moneda_id: int
+    num_ventas: int
+    unidades: int
+    total: int
@@ -0,0 +1,24 @@
+# app/schemas/sync.py
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel
+
+from .cliente import ClienteResponse
+from .venta import VentaListItem
+
+
+class Tombstone(BaseModel):
+    entidad: str  # "venta" | "cliente"
+    id: int
+    eliminado_en: datetime
+
+
+class ChangesResponse(BaseModel):
+    ventas: List[VentaListItem]
+    clientes: List[ClienteResponse]
+    eliminados: List[Tombstone]
+    # Cursor opaco para la siguiente llamada (?since=)
+    cursor: str
+    # True si algún tipo de cambio llegó al límite: volver a llamar ya
+    has_more: bool
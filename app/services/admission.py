@@ -0,0 +1,143 @@
+# app/services/admission.py
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from fastapi import HTTPException, status
+
+from app.config import get_settings
+from app.services import metrics
+
+
+class _TenantState:
+    """Token bucket + límite de concurrencia de una empresa."""
+
+    def __init__(self, rate: float, burst: int, max_concurrency: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.inflight = 0
+        self.rejected = 0
+
+    def take_token(self) -> float:
+        """Consume un token. Devuelve 0 si lo hubo, o los segundos hasta el próximo."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+_tenants: Dict[int, _TenantState] = {}
+
+# Estado de espera por conexiones del pool (ver database.request_session)
+_pool_waiters = 0
+_pool_wait_ewma = 0.0
+_EWMA_ALPHA = 0.2
+
+
+def _too_many(detail: str, retry_after: float, code: int = status.HTTP_429_TOO_MANY_REQUESTS) -> HTTPException:
+    return HTTPException(
+        status_code=code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def _get_tenant(empresa_id: int) -> _TenantState:
+    state = _tenants.get(empresa_id)
+    if state is None:
+        settings = get_settings()
+        state = _TenantState(
+            rate=settings.tenant_rate_per_second,
+            burst=settings.tenant_burst,
+            max_concurrency=settings.tenant_max_concurrency,
+        )
+        _tenants[empresa_id] = state
+    return state
+
+
+@asynccontextmanager
+async def tenant_slot(empresa_id: int):
+    """
+    Admite un request de la empresa o lo rechaza con 429 + Retry-After.
+    Mientras el bloque está activo el request ocupa uno de sus slots.
+    """
+    state = _get_tenant(empresa_id)
+
+    wait = state.take_token()
+    if wait > 0:
+        state.rejected += 1
+        metrics.incr("admission.rejected.rate")
+        raise _too_many("Too many requests for this company", wait)
+
+    try:
+        await asyncio.wait_for(
+            state.semaphore.acquire(),
+            timeout=get_settings().admission_queue_timeout,
+        )
+    except asyncio.TimeoutError:
+        state.rejected += 1
+        metrics.incr("admission.rejected.concurrency")
+        raise _too_many("Too many concurrent requests for this company", 1)
+
+    state.inflight += 1
+    try:
+        yield
+    finally:
+        state.inflight -= 1
+        state.semaphore.release()
+
+
+def check_pool_pressure() -> None:
+    """
+    Corta temprano (503) cuando ya hay demasiados requests esperando una
+    conexión del pool, en vez de dejarlos encolar hasta el pool_timeout.
+    """
+    settings = get_settings()
+    if _pool_waiters >= settings.pool_max_waiters or (
+        _pool_waiters > 0 and _pool_wait_ewma > settings.pool_wait_shed_threshold
+    ):
+        metrics.incr("admission.rejected.pool")
+        raise _too_many(
+            "Service overloaded, retry later",
+            max(1.0, _pool_wait_ewma),
+            code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+
+@asynccontextmanager
+async def pool_wait():
+    """Mide cuánto espera un request por una conexión del pool."""
+    global _pool_waiters, _pool_wait_ewma
+    _pool_waiters += 1
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _pool_waiters -= 1
+        elapsed = time.monotonic() - start
+        _pool_wait_ewma += _EWMA_ALPHA * (elapsed - _pool_wait_ewma)
+
+
+def snapshot() -> dict:
+    """Totales agregados: /metrics no muestra qué empresas hay ni su tráfico."""
+    tenants = list(_tenants.values())
+    return {
+        "pool_waiters": _pool_waiters,
+        "pool_wait_ewma_seconds": round(_pool_wait_ewma, 4),
+        "tenants": len(tenants),
+        "inflight": sum(s.inflight for s in tenants),
+        "tenants_at_max_concurrency": sum(1 for s in tenants if s.inflight >= s.max_concurrency),
+        "rejected": sum(s.rejected for s in tenants),
+    }
+
+
+metrics.register_collector("admission", snapshot)
@@ -0,0 +1,110 @@
+# app/services/auth_guard.py
+"""
+Validación del access_token contra Supabase con timeout, circuit breaker
+y una ventana de gracia: si Supabase no responde, un token validado hace
+poco (y no vencido) se sigue aceptando por AUTH_GRACE_SECONDS. Sin
+gracia disponible se responde 503 con Retry-After, no 401: una caída de
+auth no debe desloguear a los usuarios ni provocar tormentas de reintentos.
+"""
+import asyncio
+import hashlib
+import math
+import time
+from functools import lru_cache
+from uuid import UUID
+
+from fastapi import HTTPException, status
+from jose import jwt
+
+from app.config import get_settings
+from app.services import metrics
+from app.services.cache import TTLCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.supabase_service import get_supabase_auth_client
+
+
+@lru_cache()
+def _get_breaker() -> CircuitBreaker:
+    settings = get_settings()
+    return CircuitBreaker(
+        "supabase_auth",
+        failure_threshold=settings.auth_breaker_failures,
+        reset_timeout=settings.auth_breaker_reset_seconds,
+    )
+
+
+@lru_cache()
+def _get_grace() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(ttl=settings.auth_grace_seconds, maxsize=settings.auth_grace_max_entries)
+
+
+def _token_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def _is_rejection(exc: Exception) -> bool:
+    """Supabase respondió y rechazó el token (4xx): no es una falla del servicio."""
+    code = getattr(exc, "status", None) or getattr(exc, "status_code", None)
+    return isinstance(code, int) and 400 <= code < 500
+
+
+def _not_expired(access_token: str) -> bool:
+    try:
+        exp = jwt.get_unverified_claims(access_token).get("exp")
+    except Exception:
+        return False
+    return exp is not None and exp > time.time()
+
+
+def _from_grace(access_token: str) -> UUID:
+    auth_uid = _get_grace().get(_token_key(access_token))
+    if auth_uid is not None and _not_expired(access_token):
+        metrics.incr("auth.grace_served")
+        return auth_uid
+    metrics.incr("auth.unavailable")
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service unavailable",
+        headers={"Retry-After": str(max(1, math.ceil(_get_breaker().retry_after())))},
+    )
+
+
+async def validate_token(access_token: str) -> UUID:
+    """Devuelve el auth_uid del token, o 401 si Supabase lo rechaza."""
+    breaker = _get_breaker()
+    if not breaker.allow():
+        return _from_grace(access_token)
+
+    supabase = get_supabase_auth_client()
+    try:
+        # get_user es bloqueante: en un thread, para no frenar el event loop
+        user_response = await asyncio.wait_for(
+            asyncio.to_thread(supabase.auth.get_user, access_token),
+            timeout=get_settings().auth_timeout_seconds,
+        )
+    except Exception as e:
+        if _is_rejection(e):
+            breaker.record_success()
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid authentication credentials",
+            )
+        if isinstance(e, asyncio.TimeoutError):
+            metrics.incr("auth.timeouts")
+        breaker.record_failure()
+        return _from_grace(access_token)
+
+    breaker.record_success()
+    if not user_response or not user_response.user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+        )
+
+    auth_uid = UUID(user_response.user.id)
+    _get_grace().set(_token_key(access_token), auth_uid)
+    return auth_uid
+
+
+metrics.register_collector("supabase_auth", lambda: _get_breaker().snapshot())
@@ -0,0 +1,73 @@
+# app/services/circuit_breaker.py
+import time
+from typing import Dict
+
+from app.services import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker para una dependencia externa. Tras `failure_threshold`
+    fallos seguidos se abre y rechaza llamadas durante `reset_timeout`
+    segundos; después deja pasar una sola de prueba (half-open): si sale
+    bien se cierra, si falla vuelve a abrirse.
+    No es thread-safe: está pensado para usarse desde el event loop.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+
+    def allow(self) -> bool:
+        """True si la llamada puede hacerse ahora."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probing = False
+        # Una prueba que nunca informó resultado (request cancelado) no bloquea para siempre
+        if self.state == HALF_OPEN and (
+            not self._probing or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probing = True
+            self._probe_started = now
+            return True
+        metrics.incr(f"circuit.{self.name}.rejected")
+        return False
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            metrics.incr(f"circuit.{self.name}.closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        metrics.incr(f"circuit.{self.name}.failures")
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                metrics.incr(f"circuit.{self.name}.opened")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def retry_after(self) -> float:
+        """Segundos hasta la próxima llamada de prueba."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def snapshot(self) -> Dict:
+        return {"state": self.state, "failures": self.failures}
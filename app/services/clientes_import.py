@@ -0,0 +1,184 @@
+# app/services/clientes_import.py
+"""
+Importación masiva de clientes (CSV o NDJSON). El body se lee por
+chunks, cada fila se valida con ClienteCreate y las válidas van por
+COPY a una tabla temporal; al final un solo INSERT ... SELECT las pasa a
+clientes con la empresa del usuario. La memoria usada no depende del
+tamaño del archivo.
+"""
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.cliente import Cliente
+from app.schemas.cliente import ClienteCreate, ClienteImportError, ClienteImportResult
+from app.services import invalidation, metrics
+
+FORMATS = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+_FIELDS = ("nombre", "tipo", "telefono", "email", "notas")
+
+# Largo máximo de cada columna: una fila demasiado larga haría fallar el INSERT entero
+_MAX_LENGTHS = {f: Cliente.__table__.c[f].type.length for f in _FIELDS}
+
+STAGING_SQL = text(
+    """
+    CREATE TEMP TABLE clientes_import (
+        fila     integer NOT NULL,
+        nombre   text NOT NULL,
+        tipo     text NOT NULL,
+        telefono text NOT NULL,
+        email    text NOT NULL,
+        notas    text NOT NULL
+    ) ON COMMIT DROP
+    """
+)
+
+_COPY_SQL = "COPY clientes_import (fila, nombre, tipo, telefono, email, notas) FROM STDIN"
+
+INSERT_SQL = text(
+    """
+    INSERT INTO clientes (nombre, tipo, telefono, email, notas, empresas_id_empresa)
+    SELECT nombre, tipo, telefono, email, notas, :empresa_id
+    FROM clientes_import
+    ORDER BY fila
+    """
+)
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Líneas UTF-8 (con su salto de línea) a partir de chunks arbitrarios.
+    Solo se corta en LF: str.splitlines también corta en U+0085, U+2028 y
+    otros caracteres que pueden venir dentro de un nombre o un string JSON.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        # La última parte no tiene LF todavía (un CR final espera al del próximo chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """
+    Registros CSV con encabezado. Un campo entre comillas puede contener
+    saltos de línea: se juntan líneas hasta que las comillas quedan pares.
+    """
+    header: Optional[List[str]] = None
+    record = ""
+    fila = 0
+    async for line in lines:
+        record += line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not values or values == [""]:
+            continue
+        if header is None:
+            header = [h.strip().lower() for h in values]
+            continue
+        fila += 1
+        if len(values) != len(header):
+            yield fila, f"expected {len(header)} columns, got {len(values)}"
+            continue
+        yield fila, dict(zip(header, values))
+    if record.strip():
+        yield fila + 1, "unterminated quoted field"
+
+
+async def _ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    fila = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        fila += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield fila, f"invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield fila, "expected a JSON object"
+            continue
+        yield fila, data
+
+
+def _validate(data: object) -> Tuple[Optional[ClienteCreate], List[str]]:
+    if isinstance(data, str):
+        return None, [data]
+    try:
+        cliente = ClienteCreate.model_validate(data)
+    except ValidationError as e:
+        return None, [
+            f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+        ]
+    errores = [
+        f"{f}: at most {n} characters"
+        for f, n in _MAX_LENGTHS.items()
+        if len(str(getattr(cliente, f))) > n
+    ]
+    return (None, errores) if errores else (cliente, [])
+
+
+async def import_clientes(
+    db: AsyncSession,
+    empresa_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    max_errors: int,
+) -> ClienteImportResult:
+    """Importa las filas válidas en la transacción de `db` y reporta las inválidas."""
+    records = _csv_records(_lines(chunks)) if fmt == "csv" else _ndjson_records(_lines(chunks))
+
+    await db.execute(STAGING_SQL)
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+
+    recibidas = 0
+    validas = 0
+    con_error = 0
+    errores: List[ClienteImportError] = []
+
+    async with raw.driver_connection.cursor() as cur:
+        async with cur.copy(_COPY_SQL) as copy:
+            async for fila, data in records:
+                recibidas += 1
+                cliente, row_errors = _validate(data)
+                if cliente is None:
+                    con_error += 1
+                    if len(errores) < max_errors:
+                        errores.append(ClienteImportError(fila=fila, errores=row_errors))
+                    continue
+                validas += 1
+                await copy.write_row((fila, *(str(getattr(cliente, f)) for f in _FIELDS)))
+
+    insertadas = 0
+    if validas:
+        res = await db.execute(INSERT_SQL, {"empresa_id": empresa_id})
+        insertadas = res.rowcount
+        await invalidation.publish(db, "cliente", empresa_id)
+
+    metrics.incr("clientes_import.rows", insertadas)
+    metrics.incr("clientes_import.errors", con_error)
+    return ClienteImportResult(
+        recibidas=recibidas,
+        insertadas=insertadas,
+        con_error=con_error,
+        errores=errores,
+    )
@@ -0,0 +1,277 @@
+# app/services/clientes_suggest.py
+"""
+Índice de prefijos en memoria para autocompletar clientes en el checkout.
+Por empresa se guarda una lista ordenada de (clave, id_cliente) con las
+palabras del nombre, el teléfono y el email normalizados; una búsqueda
+es un bisect más un recorrido corto, sin ir a la BD.
+
+El índice se carga la primera vez que se consulta una empresa. Los
+cambios llegan por el bus de invalidación ("cliente"): con id se marca
+ese cliente para releerlo en la próxima búsqueda; sin id se descarta el
+índice de la empresa. El total de claves en memoria está acotado: se
+descartan primero las empresas consultadas hace más tiempo. Una empresa
+que sola no entra en el presupuesto no se indexa: sus búsquedas van a
+la BD (sin ignorar acentos).
+"""
+import asyncio
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.schemas.cliente import ClienteSuggestion
+from app.services import invalidation, metrics
+
+# _Index.load cuenta filas además de claves: con más de `limit` filas la
+# empresa ya no entra y no hace falta leer el resto
+LOAD_SQL = text(
+    """
+    SELECT id_cliente, nombre, telefono, email
+    FROM clientes
+    WHERE empresas_id_empresa = :empresa_id
+    LIMIT :limit
+    """
+)
+
+LOAD_IDS_SQL = text(
+    """
+    SELECT id_cliente, nombre, telefono, email
+    FROM clientes
+    WHERE empresas_id_empresa = :empresa_id
+      AND id_cliente = ANY(:ids)
+    """
+)
+
+# Respaldo para empresas demasiado grandes para el índice
+SEARCH_SQL = text(
+    """
+    SELECT id_cliente, nombre, telefono, email
+    FROM clientes
+    WHERE empresas_id_empresa = :empresa_id
+      AND (
+          nombre ILIKE :prefix
+          OR nombre ILIKE :word
+          OR email ILIKE :prefix
+          OR telefono LIKE :prefix
+          OR regexp_replace(telefono, '[^0-9]', '', 'g') LIKE :prefix
+      )
+    ORDER BY nombre, id_cliente
+    LIMIT :k
+    """
+)
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def normalize(value: str) -> str:
+    """Minúsculas y sin acentos: 'José' y 'jose' son la misma clave."""
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def _keys(nombre: str, telefono: str, email: str) -> Set[str]:
+    nombre_norm = normalize(nombre)
+    keys = {nombre_norm, normalize(email)}
+    # Cada palabra del nombre: "perez" encuentra a "Juan Pérez"
+    keys.update(nombre_norm.split())
+    keys.add(normalize(telefono))
+    digits = _NON_DIGITS.sub("", telefono)
+    if digits:
+        keys.add(digits)
+    keys.discard("")
+    return keys
+
+
+class _Index:
+    def __init__(self):
+        self.entries: List[Tuple[str, int]] = []
+        self.docs: Dict[int, ClienteSuggestion] = {}
+        self.dirty: Set[int] = set()
+        self.ready = False
+        self.lock = asyncio.Lock()
+
+    def load(self, rows, max_entries: int) -> bool:
+        """False (y el índice vacío) si pasa de `max_entries` claves o filas."""
+        entries = []
+        for r in rows:
+            self.docs[r.id_cliente] = ClienteSuggestion(
+                id_cliente=r.id_cliente, nombre=r.nombre, telefono=r.telefono, email=r.email
+            )
+            entries.extend((k, r.id_cliente) for k in _keys(r.nombre, r.telefono, r.email))
+            if len(entries) > max_entries or len(self.docs) > max_entries:
+                self.docs = {}
+                return False
+        entries.sort()
+        self.entries = entries
+        return True
+
+    def remove(self, id_cliente: int) -> None:
+        doc = self.docs.pop(id_cliente, None)
+        if doc is None:
+            return
+        for key in _keys(doc.nombre, doc.telefono, doc.email):
+            i = bisect_left(self.entries, (key, id_cliente))
+            if i < len(self.entries) and self.entries[i] == (key, id_cliente):
+                del self.entries[i]
+
+    def add(self, row) -> None:
+        self.docs[row.id_cliente] = ClienteSuggestion(
+            id_cliente=row.id_cliente, nombre=row.nombre, telefono=row.telefono, email=row.email
+        )
+        for key in _keys(row.nombre, row.telefono, row.email):
+            entry = (key, row.id_cliente)
+            self.entries.insert(bisect_left(self.entries, entry), entry)
+
+    def search(self, prefix: str, k: int) -> List[ClienteSuggestion]:
+        found: List[ClienteSuggestion] = []
+        seen: Set[int] = set()
+        i = bisect_left(self.entries, (prefix,))
+        while i < len(self.entries) and len(found) < k:
+            key, id_cliente = self.entries[i]
+            if not key.startswith(prefix):
+                break
+            if id_cliente not in seen:
+                seen.add(id_cliente)
+                found.append(self.docs[id_cliente])
+            i += 1
+        return found
+
+
+_indexes: "OrderedDict[int, _Index]" = OrderedDict()
+
+# Empresas que no entran en el presupuesto: se buscan en la BD hasta que
+# una invalidación sin id (cambios masivos) permita reintentar la carga
+_oversized: Set[int] = set()
+
+
+def _evict(keep: int) -> None:
+    """
+    Descarta índices (el menos usado primero) hasta entrar en el
+    presupuesto. `keep` nunca pasa del presupuesto por sí solo (ver
+    _fits), así que al terminar el total está dentro.
+    """
+    budget = get_settings().clientes_suggest_max_entries
+    total = sum(len(idx.entries) for idx in _indexes.values())
+    for empresa_id in list(_indexes):
+        if total <= budget:
+            break
+        if empresa_id == keep:
+            continue
+        total -= len(_indexes.pop(empresa_id).entries)
+        metrics.incr("clientes_suggest.evicted")
+
+
+def _fits(empresa_id: int, idx: _Index, loaded: bool = True) -> bool:
+    """Si el índice por sí solo excede el presupuesto se descarta y la empresa pasa a la BD."""
+    if loaded and len(idx.entries) <= get_settings().clientes_suggest_max_entries:
+        _evict(keep=empresa_id)
+        return True
+    if _indexes.get(empresa_id) is idx:
+        del _indexes[empresa_id]
+    _oversized.add(empresa_id)
+    metrics.incr("clientes_suggest.oversized")
+    return False
+
+
+async def _ready_index(db: AsyncSession, empresa_id: int) -> Optional[_Index]:
+    """Índice listo de la empresa, o None si no entra en memoria."""
+    if empresa_id in _oversized:
+        return None
+    idx = _indexes.get(empresa_id)
+    if idx is None:
+        idx = _indexes[empresa_id] = _Index()
+    _indexes.move_to_end(empresa_id)
+
+    if idx.ready and not idx.dirty:
+        return idx
+
+    async with idx.lock:
+        # Otro request pudo descubrirlo mientras se esperaba el lock
+        if empresa_id in _oversized:
+            return None
+        if not idx.ready:
+            # Los cambios que lleguen mientras se carga quedan en dirty
+            idx.dirty.clear()
+            budget = get_settings().clientes_suggest_max_entries
+            res = await db.execute(LOAD_SQL, {"empresa_id": empresa_id, "limit": budget + 1})
+            loaded = idx.load(res.fetchall(), budget)
+            metrics.incr("clientes_suggest.loads")
+            if not _fits(empresa_id, idx, loaded):
+                return None
+            idx.ready = True
+        if idx.dirty:
+            ids, idx.dirty = sorted(idx.dirty), set()
+            res = await db.execute(LOAD_IDS_SQL, {"empresa_id": empresa_id, "ids": ids})
+            rows = res.fetchall()
+            for id_cliente in ids:
+                idx.remove(id_cliente)
+            for row in rows:
+                idx.add(row)
+            # Las altas también cuentan para el presupuesto
+            if not _fits(empresa_id, idx):
+                return None
+    return idx
+
+
+def _like_prefix(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def _search_db(db: AsyncSession, empresa_id: int, prefix: str, k: int) -> List[ClienteSuggestion]:
+    metrics.incr("clientes_suggest.db_searches")
+    like = _like_prefix(prefix)
+    res = await db.execute(
+        SEARCH_SQL,
+        {"empresa_id": empresa_id, "prefix": f"{like}%", "word": f"% {like}%", "k": k},
+    )
+    return [
+        ClienteSuggestion(id_cliente=r.id_cliente, nombre=r.nombre, telefono=r.telefono, email=r.email)
+        for r in res.fetchall()
+    ]
+
+
+async def suggest(db: AsyncSession, empresa_id: int, q: str, k: int) -> List[ClienteSuggestion]:
+    prefix = normalize(q)
+    if not prefix:
+        return []
+    idx = await _ready_index(db, empresa_id)
+    if idx is None:
+        return await _search_db(db, empresa_id, prefix, k)
+    return idx.search(prefix, k)
+
+
+def _clear() -> None:
+    _indexes.clear()
+    _oversized.clear()
+
+
+def _on_invalidate(empresa_id: Optional[int], id_cliente: Optional[int]) -> None:
+    if empresa_id is None:
+        _clear()
+        return
+    if id_cliente is None:
+        _indexes.pop(empresa_id, None)
+        _oversized.discard(empresa_id)
+        return
+    idx = _indexes.get(empresa_id)
+    if idx is not None:
+        idx.dirty.add(id_cliente)
+
+
+invalidation.register("cliente", _on_invalidate, _clear)
+
+
+def snapshot() -> Dict:
+    return {
+        "empresas": len(_indexes),
+        "entries": sum(len(idx.entries) for idx in _indexes.values()),
+        "oversized": len(_oversized),
+    }
+
+
+metrics.register_collector("clientes_suggest", snapshot)
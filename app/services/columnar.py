@@ -0,0 +1,66 @@
+# app/services/columnar.py
+"""
+Formato columnar para listados grandes, negociado con
+`Accept: application/vnd.columnar+json`. En vez de una lista de objetos
+con cliente/moneda/usuario anidados en cada fila, devuelve un array por
+columna y tablas de lookup deduplicadas por id:
+
+    {
+      "count": 2,
+      "columns": {"id_venta": [11, 10], "id_cliente": [3, 3], ...},
+      "lookups": {"clientes": {"3": {"nombre": "Ana"}}, ...}
+    }
+
+Se arma directo desde las filas de la consulta, sin instanciar un
+modelo Pydantic por fila.
+"""
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Mapping, Sequence, Tuple
+
+from fastapi import Request
+
+MEDIA_TYPE = "application/vnd.columnar+json"
+
+# Para documentar la variante en OpenAPI (responses= del decorador)
+OPENAPI_RESPONSES = {200: {"content": {MEDIA_TYPE: {}}}}
+
+
+@dataclass(frozen=True)
+class ColumnarSpec:
+    # Columnas de la fila que van como arrays
+    columns: Tuple[str, ...]
+    # nombre de la tabla -> (columna id, {campo: columna de la fila})
+    lookups: Dict[str, Tuple[str, Dict[str, str]]] = field(default_factory=dict)
+
+
+def wants_columnar(request: Request) -> bool:
+    return MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _plain(value: Any) -> Any:
+    # NUMERIC llega como Decimal: se manda como número, no como string
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
+
+def encode(rows: Iterable[Mapping[str, Any]], spec: ColumnarSpec) -> Dict[str, Any]:
+    columns: Dict[str, list] = {c: [] for c in spec.columns}
+    lookups: Dict[str, Dict[str, Dict[str, Any]]] = {name: {} for name in spec.lookups}
+    count = 0
+    for row in rows:
+        count += 1
+        for c in spec.columns:
+            columns[c].append(_plain(row[c]))
+        for name, (id_column, fields) in spec.lookups.items():
+            key = str(row[id_column])
+            table = lookups[name]
+            if key not in table:
+                table[key] = {f: _plain(row[src]) for f, src in fields.items()}
+    return {"count": count, "columns": columns, "lookups": lookups}
+
+
+def columns_of(names: Sequence[str]) -> ColumnarSpec:
+    """Spec sin lookups: todas las columnas planas."""
+    return ColumnarSpec(columns=tuple(names))
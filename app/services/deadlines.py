@@ -0,0 +1,153 @@
+# app/services/deadlines.py
+"""
+Deadline por request. DeadlineMiddleware corta una lectura (GET/HEAD)
+cuando vence su plazo (504) o cuando el cliente se desconecta; al
+cancelarse la tarea, psycopg cancela la consulta en curso y la conexión
+vuelve al pool. Las escrituras nunca se cancelan desde afuera: podrían
+estar haciendo commit, o ya haberlo hecho, y un 504 invitaría a
+reintentar y duplicar; a ellas solo las limita `statement_timeout`.
+La sesión del request (database.request_session) fija
+`statement_timeout` con el mismo plazo, del lado del servidor, en
+lecturas y escrituras.
+"""
+import asyncio
+import json
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from app.config import get_settings
+from app.services import metrics
+
+STATEMENT_TIMEOUT_SQL = text("SELECT set_config('statement_timeout', :ms, true)")
+
+# Solo estos se cancelan (por plazo o desconexión); las escrituras terminan
+_SAFE_METHODS = {"GET", "HEAD"}
+
+
+def deadline_for(path: str) -> float:
+    """Segundos de plazo para `path` (0 = sin límite)."""
+    settings = get_settings()
+    best = None
+    for prefix, seconds in settings.route_deadlines.items():
+        if path.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+            best = (prefix, seconds)
+    return best[1] if best else settings.request_deadline_seconds
+
+
+def statement_timeout_ms(request: Request) -> Optional[int]:
+    seconds = request.scope.get("state", {}).get("deadline_seconds")
+    return int(seconds * 1000) if seconds else None
+
+
+def _is_query_canceled(exc: BaseException) -> bool:
+    # SQLSTATE 57014: statement_timeout o cancelación
+    return isinstance(exc, DBAPIError) and getattr(exc.orig, "sqlstate", None) == "57014"
+
+
+async def _statement_timeout_or_raise(exc: Exception, started: bool, send) -> None:
+    """Una consulta cortada por statement_timeout (ya con rollback) es un 504."""
+    if not _is_query_canceled(exc) or started:
+        raise exc
+    metrics.incr("deadline.statement_timeouts")
+    await _send_timeout(send)
+
+
+async def _send_timeout(send) -> None:
+    body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class DeadlineMiddleware:
+    """Middleware ASGI: aplica el deadline de la ruta y cancela lecturas vencidas o abandonadas."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        seconds = deadline_for(scope["path"])
+        if not seconds:
+            return await self.app(scope, receive, send)
+        scope.setdefault("state", {})["deadline_seconds"] = seconds
+        if scope["method"] not in _SAFE_METHODS:
+            return await self._run_write(scope, receive, send)
+
+        # Se lee `receive` en una tarea aparte para enterarse de la
+        # desconexión; la cola de 1 mantiene el backpressure del body.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        disconnected = asyncio.Event()
+        started = False
+
+        async def pump():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                await queue.put(message)
+                if message["type"] == "http.disconnect":
+                    return
+
+        async def wrapped_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        app_task = asyncio.create_task(self.app(scope, queue.get, wrapped_send))
+        pump_task = asyncio.create_task(pump())
+        disconnect_task = asyncio.create_task(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {app_task, disconnect_task}, timeout=seconds, return_when=asyncio.FIRST_COMPLETED
+            )
+            if app_task not in done:
+                # Con la respuesta ya empezada no se corta: termina sola
+                if started:
+                    await app_task
+                    return
+                app_task.cancel()
+                await asyncio.gather(app_task, return_exceptions=True)
+                if disconnect_task in done:
+                    metrics.incr("deadline.client_disconnects")
+                    return
+                metrics.incr("deadline.timeouts")
+                await _send_timeout(send)
+                return
+            try:
+                app_task.result()
+            except Exception as e:
+                await _statement_timeout_or_raise(e, started, send)
+        finally:
+            if not app_task.done():
+                app_task.cancel()
+            pump_task.cancel()
+            disconnect_task.cancel()
+
+    async def _run_write(self, scope, receive, send):
+        """Sin cancelación: la escritura termina o la corta statement_timeout."""
+        started = False
+
+        async def wrapped_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        except Exception as e:
+            await _statement_timeout_or_raise(e, started, send)
@@ -0,0 +1,74 @@
+# app/services/etag.py
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+from pydantic_core import to_json
+
+# Los datos dependen de la sesión (empresa del usuario): solo cache privada
+# y siempre revalidando con If-None-Match.
+_CACHE_CONTROL = "private, no-cache"
+
+
+def weak(opaque: str) -> str:
+    """
+    ETag débil. GZipMiddleware comprime según Accept-Encoding sin tocar el
+    ETag: la versión gzip y la sin comprimir no son los mismos bytes, así
+    que no pueden compartir un ETag fuerte (RFC 9110, 8.8.3).
+    """
+    return f'W/"{opaque}"'
+
+
+def compute_etag(data: bytes) -> str:
+    return weak(hashlib.sha256(data).hexdigest()[:32])
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def matches(request: Request, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110, 13.1.2)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    expected = _opaque(etag)
+    return any(_opaque(tag.strip()) == expected for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": _CACHE_CONTROL},
+    )
+
+
+def json_response(
+    request: Request,
+    content: Any,
+    etag: Optional[str] = None,
+    status_code: int = status.HTTP_200_OK,
+    media_type: str = "application/json",
+    vary: Optional[str] = None,
+) -> Response:
+    """
+    Serializa `content` una sola vez y responde 304 si el cliente ya tiene
+    esa versión. Sin `etag` explícito se usa el hash del body. `vary` se
+    usa en endpoints con más de una representación (p. ej. "Accept").
+    """
+    body = to_json(content)
+    if etag is None:
+        etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": _CACHE_CONTROL}
+    if vary:
+        headers["Vary"] = vary
+    if matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
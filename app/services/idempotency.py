@@ -0,0 +1,206 @@
+# app/services/idempotency.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import get_settings
+from app.services import metrics
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+PURGE_BATCH = 1000
+
+# Usa ix_idempotency_keys_created_at (0001)
+PURGE_SQL = text(
+    """
+    DELETE FROM idempotency_keys
+    WHERE (empresas_id_empresa, scope, key) IN (
+        SELECT empresas_id_empresa, scope, key
+        FROM idempotency_keys
+        WHERE created_at < now() - make_interval(hours => :ttl_hours)
+        LIMIT :limit
+    )
+    """
+)
+
+
+class StoredResponse(NamedTuple):
+    request_hash: str
+    status_code: int
+    body: dict
+    # created_at de la fila (epoch): la clave vence igual en memoria que en la BD
+    created_at: float
+
+
+@lru_cache()
+def _get_cache() -> LRUCache:
+    return LRUCache(maxsize=get_settings().idempotency_cache_size)
+
+
+def request_hash(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def _expired(stored: StoredResponse) -> bool:
+    return time.time() - stored.created_at >= get_settings().idempotency_ttl_hours * 3600
+
+
+def _check_hash(stored: StoredResponse, req_hash: str) -> StoredResponse:
+    if stored.request_hash != req_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different payload",
+        )
+    metrics.incr("idempotency.replayed")
+    return stored
+
+
+async def begin(
+    db: AsyncSession,
+    empresa_id: int,
+    scope: str,
+    key: str,
+    req_hash: str,
+) -> Optional[StoredResponse]:
+    """
+    Reserva la clave dentro de la transacción del request.
+
+    Devuelve la respuesta original si la clave ya fue usada, o None si este
+    request es el primero y debe ejecutarse. Un retry concurrente se bloquea
+    en el INSERT hasta que el original hace commit o rollback.
+    """
+    cache = _get_cache()
+    cached = cache.get((empresa_id, scope, key))
+    if cached is not None:
+        if not _expired(cached):
+            return _check_hash(cached, req_hash)
+        # Vencida: la fila también se puede reutilizar (ver INSERT)
+        cache.invalidate((empresa_id, scope, key))
+
+    # Las claves vencidas se reutilizan en el mismo INSERT
+    reserve_sql = text(
+        """
+        INSERT INTO idempotency_keys (empresas_id_empresa, scope, key, request_hash)
+        VALUES (:empresa_id, :scope, :key, :request_hash)
+        ON CONFLICT (empresas_id_empresa, scope, key) DO UPDATE
+            SET request_hash = EXCLUDED.request_hash,
+                status_code = NULL,
+                response_body = NULL,
+                created_at = now()
+            WHERE idempotency_keys.created_at < now() - make_interval(hours => :ttl_hours)
+        RETURNING key
+        """
+    )
+    params = {"empresa_id": empresa_id, "scope": scope, "key": key}
+    res = await db.execute(
+        reserve_sql,
+        {
+            **params,
+            "request_hash": req_hash,
+            "ttl_hours": get_settings().idempotency_ttl_hours,
+        },
+    )
+    if res.fetchone():
+        return None
+
+    existing_sql = text(
+        """
+        SELECT request_hash, status_code, response_body, created_at
+        FROM idempotency_keys
+        WHERE empresas_id_empresa = :empresa_id
+          AND scope = :scope
+          AND key = :key
+        """
+    )
+    row = (await db.execute(existing_sql, params)).fetchone()
+    if row is None or row.status_code is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+        )
+
+    stored = StoredResponse(
+        row.request_hash, row.status_code, row.response_body, row.created_at.timestamp()
+    )
+    cache.set((empresa_id, scope, key), stored)
+    return _check_hash(stored, req_hash)
+
+
+async def complete(
+    db: AsyncSession,
+    empresa_id: int,
+    scope: str,
+    key: str,
+    req_hash: str,
+    status_code: int,
+    body: dict,
+) -> None:
+    """Guarda la respuesta junto con la reserva, en la misma transacción."""
+    update_sql = text(
+        """
+        UPDATE idempotency_keys
+        SET status_code = :status_code,
+            response_body = CAST(:body AS jsonb)
+        WHERE empresas_id_empresa = :empresa_id
+          AND scope = :scope
+          AND key = :key
+        RETURNING created_at
+        """
+    )
+    res = await db.execute(
+        update_sql,
+        {
+            "empresa_id": empresa_id,
+            "scope": scope,
+            "key": key,
+            "status_code": status_code,
+            "body": json.dumps(body),
+        },
+    )
+
+    # La cache en memoria solo se llena si la venta/cliente realmente se guardó
+    created_at = res.scalar_one().timestamp()
+    stored = StoredResponse(req_hash, status_code, body, created_at)
+
+    def _remember(_session) -> None:
+        _get_cache().set((empresa_id, scope, key), stored)
+
+    event.listen(db.sync_session, "after_commit", _remember, once=True)
+
+
+async def purge(engine: AsyncEngine) -> int:
+    """
+    Borra las claves vencidas (IDEMPOTENCY_TTL_HOURS) en lotes cortos hasta
+    no dejar ninguna. Devuelve cuántas borró.
+    """
+    ttl_hours = get_settings().idempotency_ttl_hours
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            res = await conn.execute(PURGE_SQL, {"ttl_hours": ttl_hours, "limit": PURGE_BATCH})
+        total += res.rowcount
+        if res.rowcount < PURGE_BATCH:
+            break
+    metrics.incr("idempotency.purged", total)
+    return total
+
+
+async def run_purger(engine: AsyncEngine, interval: float) -> None:
+    """Tarea de fondo del lifespan: purga las claves vencidas cada `interval` segundos."""
+    while True:
+        try:
+            await purge(engine)
+        except Exception as e:
+            metrics.incr("idempotency.purge_errors")
+            logger.warning(f"Idempotency keys purge failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,85 @@
+# app/services/invalidation.py
+"""
+Invalidación de caches en memoria entre workers y réplicas. Quien cambia
+un dato publica la clave (entidad, empresa_id, id) con NOTIFY en su
+transacción; cada proceso la recibe por su conexión LISTEN (pg_listener)
+y descarta las entradas que correspondan.
+
+Otros servicios sobre la misma BD (p. ej. auth al cambiar roles o
+permisos) pueden publicar con:
+
+    SELECT pg_notify('cache_invalidation',
+                     '{"entity": "permisos", "empresa_id": 1, "id": null}');
+"""
+import json
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import metrics, pg_listener
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+
+# handler(empresa_id, id); id None = todas las entradas de la entidad
+Handler = Callable[[Optional[int], Optional[int]], None]
+
+_handlers: Dict[str, List[Handler]] = defaultdict(list)
+_clear_all: List[Callable[[], None]] = []
+
+
+def register(entity: str, handler: Handler, clear: Callable[[], None]) -> None:
+    """
+    Registra una cache para `entity`. `clear` vacía la cache entera: se usa
+    al (re)conectar el LISTEN, porque lo publicado mientras tanto se perdió.
+    """
+    _handlers[entity].append(handler)
+    _clear_all.append(clear)
+
+
+def _apply(entity: str, empresa_id: Optional[int], id_: Optional[int]) -> None:
+    for handler in _handlers.get(entity, []):
+        handler(empresa_id, id_)
+
+
+def _on_notification(payload: str) -> None:
+    data = json.loads(payload)
+    metrics.incr("invalidation.received")
+    _apply(data["entity"], data.get("empresa_id"), data.get("id"))
+
+
+def _on_connect() -> None:
+    for clear in _clear_all:
+        clear()
+
+
+pg_listener.subscribe(CHANNEL, _on_notification)
+pg_listener.on_connect(_on_connect)
+
+
+async def publish(
+    db: AsyncSession,
+    entity: str,
+    empresa_id: Optional[int] = None,
+    id: Optional[int] = None,
+) -> None:
+    """
+    Publica la invalidación en la transacción de `db`: los demás procesos
+    la reciben solo si hace commit. En este proceso se aplica en el
+    after_commit, sin esperar la vuelta por LISTEN.
+    """
+    payload = json.dumps(
+        {"entity": entity, "empresa_id": empresa_id, "id": id},
+        separators=(",", ":"),
+    )
+    await pg_listener.notify(db, CHANNEL, payload)
+    metrics.incr("invalidation.published")
+
+    def _evict_local(_session) -> None:
+        _apply(entity, empresa_id, id)
+
+    event.listen(db.sync_session, "after_commit", _evict_local, once=True)
@@ -0,0 +1,112 @@
+# app/services/live_feed.py
+"""
+Feed en vivo de ventas por empresa. create_venta hace NOTIFY en su
+transacción; la conexión LISTEN del worker (pg_listener) recibe una
+notificación por venta y la reparte a las colas de los suscriptores SSE.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Dict, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.schemas.venta import VentaListItem
+from app.services import metrics, pg_listener
+
+CHANNEL = "ventas_live"
+
+# Evento que pide al cliente volver a leer GET /ventas: se perdieron eventos
+RESYNC_EVENT = "event: resync\ndata: {}\n\n"
+
+_subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _push(queue: asyncio.Queue, event: str) -> None:
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Suscriptor lento: se descarta lo pendiente y se le pide resincronizar,
+        # así la memoria por suscriptor queda acotada.
+        metrics.incr("live_feed.resync_slow")
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC_EVENT)
+
+
+def _on_notification(payload: str) -> None:
+    data = json.loads(payload)
+    queues = _subscribers.get(data["empresa_id"])
+    if not queues:
+        return
+    # Se serializa una vez por venta, no una vez por suscriptor
+    event = _sse("venta", json.dumps(data["venta"], separators=(",", ":")))
+    for queue in queues:
+        _push(queue, event)
+
+
+def _on_connect() -> None:
+    for queues in _subscribers.values():
+        for queue in queues:
+            _push(queue, RESYNC_EVENT)
+
+
+pg_listener.subscribe(CHANNEL, _on_notification)
+pg_listener.on_connect(_on_connect)
+
+
+async def publish(db: AsyncSession, empresa_id: int, venta: VentaListItem) -> None:
+    """Anuncia una venta nueva; se entrega a los suscriptores cuando `db` hace commit."""
+    payload = json.dumps(
+        {"empresa_id": empresa_id, "venta": venta.model_dump(mode="json")},
+        separators=(",", ":"),
+    )
+    if len(payload.encode()) > pg_listener.MAX_PAYLOAD_BYTES:
+        # No cabe en un NOTIFY: solo el id, el cliente pide el resto
+        payload = json.dumps(
+            {"empresa_id": empresa_id, "venta": {"id_venta": venta.id_venta}},
+            separators=(",", ":"),
+        )
+    await pg_listener.notify(db, CHANNEL, payload)
+
+
+def check_capacity(empresa_id: int) -> None:
+    """429 si la empresa ya tiene el máximo de suscripciones en este worker."""
+    queues = _subscribers.get(empresa_id, ())
+    if len(queues) >= get_settings().live_max_subscribers_per_empresa:
+        metrics.incr("live_feed.rejected")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many live subscriptions for this company",
+        )
+
+
+@asynccontextmanager
+async def subscription(empresa_id: int):
+    """Cola de eventos SSE de la empresa mientras dure el bloque."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=get_settings().live_queue_size)
+    queues = _subscribers[empresa_id]
+    queues.add(queue)
+    try:
+        yield queue
+    finally:
+        queues.discard(queue)
+        if not queues:
+            _subscribers.pop(empresa_id, None)
+
+
+def snapshot() -> Dict:
+    return {
+        "empresas": len(_subscribers),
+        "subscribers": sum(len(q) for q in _subscribers.values()),
+    }
+
+
+metrics.register_collector("live_feed", snapshot)
@@ -0,0 +1,23 @@
+# app/services/metrics.py
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+# Contadores simples en memoria del proceso (cada worker expone los suyos)
+_counters: Dict[str, int] = defaultdict(int)
+_collectors: Dict[str, Callable[[], Any]] = {}
+
+
+def incr(name: str, value: int = 1) -> None:
+    _counters[name] += value
+
+
+def register_collector(name: str, fn: Callable[[], Any]) -> None:
+    """Registra una función que devuelve el estado de un subsistema para /metrics."""
+    _collectors[name] = fn
+
+
+def snapshot() -> Dict[str, Any]:
+    data: Dict[str, Any] = {"counters": dict(_counters)}
+    for name, fn in _collectors.items():
+        data[name] = fn()
+    return data
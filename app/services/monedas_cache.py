@@ -0,0 +1,78 @@
+# app/services/monedas_cache.py
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models.moneda import Moneda
+from app.schemas.moneda import MonedaResponse
+from app.services import invalidation
+from app.services.cache import TTLCache
+from app.services.singleflight import SingleFlight
+
+_KEY = "monedas"
+
+# Al expirar la cache, los requests concurrentes comparten una sola recarga
+_flight = SingleFlight("monedas")
+
+
+@lru_cache()
+def _get_cache() -> TTLCache:
+    return TTLCache(ttl=get_settings().monedas_cache_ttl)
+
+
+async def _load(db: AsyncSession) -> Dict[int, MonedaResponse]:
+    q = select(Moneda).order_by(Moneda.id_moneda)
+    result = await db.execute(q)
+    return {
+        r.id_moneda: MonedaResponse.model_validate(r)
+        for r in result.scalars().all()
+    }
+
+
+async def get_monedas_map(db: AsyncSession) -> Dict[int, MonedaResponse]:
+    """
+    Devuelve {id_moneda: MonedaResponse}. La tabla moneda es global y
+    casi nunca cambia, así que se sirve desde memoria.
+    """
+    cache = _get_cache()
+    monedas = cache.get(_KEY)
+    if monedas is None:
+        monedas = await _flight.do(_KEY, lambda: _reload(db))
+    return monedas
+
+
+async def _reload(db: AsyncSession) -> Dict[int, MonedaResponse]:
+    cache = _get_cache()
+    # Si llega una invalidación mientras se carga, lo leído no se guarda
+    generation = cache.generation
+    monedas = await _load(db)
+    cache.set(_KEY, monedas, generation=generation)
+    return monedas
+
+
+async def list_monedas(db: AsyncSession) -> List[MonedaResponse]:
+    return list((await get_monedas_map(db)).values())
+
+
+async def get_moneda(db: AsyncSession, moneda_id: int) -> Optional[MonedaResponse]:
+    return (await get_monedas_map(db)).get(moneda_id)
+
+
+async def prime(db: AsyncSession) -> int:
+    """Carga la cache en el arranque. Devuelve cuántas monedas cargó."""
+    cache = _get_cache()
+    generation = cache.generation
+    monedas = await _load(db)
+    cache.set(_KEY, monedas, generation=generation)
+    return len(monedas)
+
+
+def invalidate() -> None:
+    _get_cache().invalidate(_KEY)
+
+
+# moneda es global: cualquier cambio (empresa_id / id) invalida el mapa entero
+invalidation.register("moneda", lambda empresa_id, id_: invalidate(), invalidate)
@@ -0,0 +1,289 @@
+# app/services/outbox.py
+"""
+Outbox transaccional: los eventos para otros servicios se insertan en la
+tabla outbox dentro de la misma transacción que los datos (migración
+0008), y una tarea de fondo los publica por lotes. El checkout no espera
+a inventario ni a reportes, y un evento no se pierde ni se envía sin que
+su venta haya hecho commit.
+
+Con varios workers cada lote se reserva con FOR UPDATE SKIP LOCKED y un
+lease: si el worker muere a mitad de un envío, el lote vuelve a quedar
+pendiente cuando vence el lease. La entrega es "al menos una vez".
+"""
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Protocol
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from app.config import get_settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+ENQUEUE_SQL = text(
+    """
+    INSERT INTO outbox (empresas_id_empresa, tipo, payload)
+    VALUES (:empresa_id, :tipo, CAST(:payload AS jsonb))
+    """
+)
+
+CLAIM_SQL = text(
+    """
+    WITH lote AS (
+        SELECT id_evento
+        FROM outbox
+        WHERE enviado_en IS NULL
+          AND proximo_intento <= now()
+        ORDER BY proximo_intento, id_evento
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE outbox o
+    SET proximo_intento = now() + make_interval(secs => :lease),
+        intentos = o.intentos + 1
+    FROM lote
+    WHERE o.id_evento = lote.id_evento
+    RETURNING o.id_evento, o.empresas_id_empresa, o.tipo, o.payload, o.creado_en, o.intentos
+    """
+)
+
+MARK_SENT_SQL = text(
+    """
+    UPDATE outbox
+    SET enviado_en = now(), ultimo_error = NULL
+    WHERE id_evento = ANY(:ids)
+    """
+)
+
+# Backoff exponencial según los intentos ya hechos, con tope
+MARK_FAILED_SQL = text(
+    """
+    UPDATE outbox
+    SET ultimo_error = :error,
+        proximo_intento = now() + make_interval(
+            secs => least(:max_backoff, :base_backoff * power(2, intentos - 1))
+        )
+    WHERE id_evento = ANY(:ids)
+    """
+)
+
+PURGE_BATCH = 1000
+
+PURGE_SQL = text(
+    """
+    DELETE FROM outbox
+    WHERE id_evento IN (
+        SELECT id_evento
+        FROM outbox
+        WHERE enviado_en < now() - make_interval(days => :days)
+        LIMIT :limit
+    )
+    """
+)
+
+# Cada conteo usa su índice parcial (0008)
+BACKLOG_SQL = text(
+    """
+    SELECT
+        (SELECT count(*) FROM outbox WHERE enviado_en IS NULL) AS pendientes,
+        (SELECT count(*) FROM outbox WHERE enviado_en IS NOT NULL) AS enviados
+    """
+)
+
+
+@dataclass
+class OutboxEvent:
+    id_evento: int
+    empresa_id: int
+    tipo: str
+    payload: Dict[str, Any]
+    creado_en: datetime
+    intentos: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id_evento": self.id_evento,
+            "empresa_id": self.empresa_id,
+            "tipo": self.tipo,
+            "creado_en": self.creado_en.isoformat(),
+            "payload": self.payload,
+        }
+
+
+class Sink(Protocol):
+    """Destino de los eventos. `send` lanza una excepción si el lote no se entregó."""
+
+    async def send(self, events: List[OutboxEvent]) -> None: ...
+
+
+class HttpSink:
+    """POST {"events": [...]} a una URL; cualquier respuesta que no sea 2xx es un fallo."""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url
+        self.timeout = timeout
+
+    async def send(self, events: List[OutboxEvent]) -> None:
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            res = await client.post(self.url, json={"events": [e.to_dict() for e in events]})
+            res.raise_for_status()
+
+
+class LogSink:
+    """Sin OUTBOX_SINK_URL (desarrollo): solo registra los eventos en el log."""
+
+    async def send(self, events: List[OutboxEvent]) -> None:
+        for e in events:
+            logger.info(f"outbox event {e.id_evento} {e.tipo} empresa={e.empresa_id}")
+
+
+class MemorySink:
+    """Guarda los eventos en memoria, para pruebas locales."""
+
+    def __init__(self):
+        self.events: List[OutboxEvent] = []
+
+    async def send(self, events: List[OutboxEvent]) -> None:
+        self.events.extend(events)
+
+
+def build_sink() -> Sink:
+    settings = get_settings()
+    if settings.outbox_sink_url:
+        return HttpSink(settings.outbox_sink_url, settings.outbox_sink_timeout)
+    return LogSink()
+
+
+async def enqueue(db: AsyncSession, empresa_id: int, tipo: str, payload: Dict[str, Any]) -> None:
+    """Agrega un evento en la transacción de `db`: se publica solo si hace commit."""
+    await db.execute(
+        ENQUEUE_SQL,
+        {"empresa_id": empresa_id, "tipo": tipo, "payload": json.dumps(payload)},
+    )
+
+
+_stats = {
+    "delivered": 0,
+    "failed_batches": 0,
+    "last_lag_seconds": 0.0,
+    "max_lag_seconds": 0.0,
+    "purged": 0,
+    # Filas en la tabla al último purge: sin enviar / enviadas aún retenidas
+    "pending": None,
+    "sent_retained": None,
+}
+
+
+def _record_lag(events: List[OutboxEvent]) -> None:
+    now = datetime.now(timezone.utc)
+    lags = [(now - e.creado_en).total_seconds() for e in events]
+    _stats["delivered"] += len(events)
+    _stats["last_lag_seconds"] = round(max(lags), 3)
+    _stats["max_lag_seconds"] = round(max(_stats["max_lag_seconds"], max(lags)), 3)
+    metrics.incr("outbox.delivered", len(events))
+
+
+async def publish_batch(engine: AsyncEngine, sink: Sink) -> int:
+    """Reserva y envía un lote. Devuelve cuántos eventos reservó (0 = no había)."""
+    settings = get_settings()
+    async with engine.begin() as conn:
+        res = await conn.execute(
+            CLAIM_SQL,
+            {"batch_size": settings.outbox_batch_size, "lease": settings.outbox_lease_seconds},
+        )
+        events = [
+            OutboxEvent(
+                id_evento=r.id_evento,
+                empresa_id=r.empresas_id_empresa,
+                tipo=r.tipo,
+                payload=r.payload,
+                creado_en=r.creado_en,
+                intentos=r.intentos,
+            )
+            for r in res.fetchall()
+        ]
+    if not events:
+        return 0
+
+    ids = [e.id_evento for e in events]
+    error: Optional[str] = None
+    try:
+        await sink.send(events)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"[:1000]
+
+    async with engine.begin() as conn:
+        if error is None:
+            await conn.execute(MARK_SENT_SQL, {"ids": ids})
+        else:
+            await conn.execute(
+                MARK_FAILED_SQL,
+                {
+                    "ids": ids,
+                    "error": error,
+                    "base_backoff": settings.outbox_base_backoff,
+                    "max_backoff": settings.outbox_max_backoff,
+                },
+            )
+
+    if error is None:
+        _record_lag(events)
+    else:
+        _stats["failed_batches"] += 1
+        metrics.incr("outbox.failed_batches")
+        logger.warning(f"Outbox batch of {len(events)} events failed: {error}")
+    return len(events)
+
+
+async def purge(engine: AsyncEngine) -> int:
+    """
+    Borra los eventos enviados hace más de OUTBOX_RETENTION_DAYS, en lotes
+    cortos hasta no dejar ninguno, y actualiza el backlog en las métricas.
+    Devuelve cuántos borró.
+    """
+    days = get_settings().outbox_retention_days
+    total = 0
+    while True:
+        async with engine.begin() as conn:
+            res = await conn.execute(PURGE_SQL, {"days": days, "limit": PURGE_BATCH})
+        total += res.rowcount
+        if res.rowcount < PURGE_BATCH:
+            break
+    async with engine.connect() as conn:
+        backlog = (await conn.execute(BACKLOG_SQL)).one()
+    _stats["purged"] += total
+    _stats["pending"] = backlog.pendientes
+    _stats["sent_retained"] = backlog.enviados
+    metrics.incr("outbox.purged", total)
+    return total
+
+
+async def run_publisher(engine: AsyncEngine, sink: Sink, interval: float) -> None:
+    """Tarea de fondo del lifespan: publica lotes mientras haya pendientes."""
+    last_purge = 0.0
+    while True:
+        try:
+            # Lotes seguidos mientras se llenen; si no, se espera `interval`
+            while await publish_batch(engine, sink) >= get_settings().outbox_batch_size:
+                pass
+            if time.monotonic() - last_purge > get_settings().outbox_purge_interval:
+                await purge(engine)
+                last_purge = time.monotonic()
+        except Exception as e:
+            metrics.incr("outbox.publisher_errors")
+            logger.warning(f"Outbox publisher failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def snapshot() -> Dict:
+    return dict(_stats)
+
+
+metrics.register_collector("outbox", snapshot)
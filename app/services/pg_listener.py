@@ -0,0 +1,93 @@
+# app/services/pg_listener.py
+"""
+Una única conexión LISTEN por worker, compartida por todos los que
+necesiten notificaciones de Postgres. Los handlers se registran al
+importar el módulo que los usa y se invocan en el loop del worker.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+import psycopg
+from psycopg import sql
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+# Límite de Postgres para el payload de NOTIFY (8000 bytes, con margen)
+MAX_PAYLOAD_BYTES = 7900
+
+_handlers: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+_on_connect: List[Callable[[], None]] = []
+_state = {"connected": False, "reconnects": 0}
+
+
+def subscribe(channel: str, handler: Callable[[str], None]) -> None:
+    """Registra `handler(payload)` para un canal. Debe ser rápido y no bloquear."""
+    _handlers[channel].append(handler)
+
+
+def on_connect(handler: Callable[[], None]) -> None:
+    """
+    Registra un callback para cada (re)conexión: lo notificado mientras no
+    había conexión se perdió, así que quien dependa del canal debe resincronizar.
+    """
+    _on_connect.append(handler)
+
+
+async def notify(db: AsyncSession, channel: str, payload: str) -> None:
+    """NOTIFY dentro de la transacción de `db`: se entrega solo si hace commit."""
+    await db.execute(NOTIFY_SQL, {"channel": channel, "payload": payload})
+
+
+def _dispatch(channel: str, payload: str) -> None:
+    for handler in _handlers.get(channel, []):
+        try:
+            handler(payload)
+        except Exception as e:
+            metrics.incr("pg_listener.handler_errors")
+            logger.warning(f"Handler for {channel} failed: {e}")
+
+
+async def _listen_once(url: str) -> None:
+    async with await psycopg.AsyncConnection.connect(url, autocommit=True) as conn:
+        for channel in _handlers:
+            await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        _state["connected"] = True
+        logger.info(f"Listening on {', '.join(_handlers)}")
+        for handler in _on_connect:
+            handler()
+        async for notification in conn.notifies():
+            metrics.incr("pg_listener.notifications")
+            _dispatch(notification.channel, notification.payload)
+
+
+async def run_listener(url: str, retry_seconds: float = 2.0) -> None:
+    """Tarea de fondo del lifespan: mantiene la conexión LISTEN, reconectando si cae."""
+    while True:
+        try:
+            await _listen_once(url)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"LISTEN connection lost: {e}")
+        _state["connected"] = False
+        _state["reconnects"] += 1
+        await asyncio.sleep(retry_seconds)
+
+
+def snapshot() -> Dict:
+    return {
+        "connected": _state["connected"],
+        "reconnects": _state["reconnects"],
+        "channels": sorted(_handlers),
+    }
+
+
+metrics.register_collector("pg_listener", snapshot)
@@ -0,0 +1,350 @@
+# app/services/rollups.py
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+
+from app.config import get_settings
+from app.services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Clase de advisory lock: create_venta lo toma compartido por empresa y
+# el rebuild exclusivo, para que no se pisen.
+_ROLLUP_LOCK_CLASS = 7301
+_TOP_REFRESH_LOCK_CLASS = 7302
+
+ROLLUP_LOCK_SHARED_SQL = text(
+    "SELECT pg_advisory_xact_lock_shared(:lock_class, :empresa_id)"
+)
+
+ROLLUP_UPSERT_SQL = text(
+    """
+    INSERT INTO venta_rollup (
+        empresas_id_empresa, dimension, dia, moneda_id_moneda, clave,
+        num_ventas, unidades, total, total_base, ventas_sin_tasa
+    )
+    VALUES (
+        :empresa_id, :dimension, :dia, :moneda_id, :clave,
+        :num_ventas, :unidades, :total, :total_base, :ventas_sin_tasa
+    )
+    ON CONFLICT (empresas_id_empresa, dimension, dia, moneda_id_moneda, clave)
+    DO UPDATE SET
+        num_ventas = venta_rollup.num_ventas + EXCLUDED.num_ventas,
+        unidades = venta_rollup.unidades + EXCLUDED.unidades,
+        total = venta_rollup.total + EXCLUDED.total,
+        total_base = venta_rollup.total_base + EXCLUDED.total_base,
+        ventas_sin_tasa = venta_rollup.ventas_sin_tasa + EXCLUDED.ventas_sin_tasa
+    """
+)
+
+REPORTE_DIARIO_SQL = text(
+    """
+    SELECT dia, moneda_id_moneda, num_ventas, unidades, total
+    FROM venta_rollup
+    WHERE empresas_id_empresa = :empresa_id
+      AND dimension = 'total'
+      AND dia >= :desde
+      AND dia < :hasta
+    ORDER BY dia, moneda_id_moneda
+    """
+)
+
+REPORTE_DIMENSION_SQL = text(
+    """
+    SELECT
+        clave,
+        moneda_id_moneda,
+        sum(num_ventas) AS num_ventas,
+        sum(unidades) AS unidades,
+        sum(total) AS total
+    FROM venta_rollup
+    WHERE empresas_id_empresa = :empresa_id
+      AND dimension = :dimension
+      AND dia >= :desde
+      AND dia < :hasta
+    GROUP BY clave, moneda_id_moneda
+    ORDER BY sum(total) DESC, clave
+    LIMIT :limit
+    """
+)
+
+REPORTE_MONEDA_SQL = text(
+    """
+    SELECT
+        moneda_id_moneda AS clave,
+        moneda_id_moneda,
+        sum(num_ventas) AS num_ventas,
+        sum(unidades) AS unidades,
+        sum(total) AS total
+    FROM venta_rollup
+    WHERE empresas_id_empresa = :empresa_id
+      AND dimension = 'total'
+      AND dia >= :desde
+      AND dia < :hasta
+    GROUP BY moneda_id_moneda
+    ORDER BY sum(total) DESC, moneda_id_moneda
+    LIMIT :limit
+    """
+)
+
+# Ingresos de todas las monedas en moneda base, por día: un rango sobre
+# la clave primaria de venta_rollup
+REPORTE_INGRESOS_SQL = text(
+    """
+    SELECT
+        dia,
+        sum(num_ventas) AS num_ventas,
+        sum(total_base) AS total_base,
+        sum(ventas_sin_tasa) AS ventas_sin_tasa
+    FROM venta_rollup
+    WHERE empresas_id_empresa = :empresa_id
+      AND dimension = 'total'
+      AND dia >= :desde
+      AND dia < :hasta
+    GROUP BY dia
+    ORDER BY dia
+    """
+)
+
+# Ventanas (días) y profundidad precalculadas en la vista venta_top (0006)
+TOP_VENTANAS = (1, 7, 30)
+TOP_MAX_N = 100
+
+TOP_SQL = text(
+    """
+    SELECT posicion, clave, nombre, moneda_id_moneda, num_ventas, unidades, total
+    FROM venta_top
+    WHERE empresas_id_empresa = :empresa_id
+      AND dimension = :dimension
+      AND ventana_dias = :dias
+      AND moneda_id_moneda = :moneda_id
+      AND posicion <= :n
+    ORDER BY posicion
+    """
+)
+
+# Ventanas no precalculadas: mismo cálculo que la vista, al vuelo sobre los agregados
+TOP_AL_VUELO_SQL = text(
+    """
+    WITH ranked AS (
+        SELECT
+            r.clave,
+            r.moneda_id_moneda,
+            sum(r.num_ventas) AS num_ventas,
+            sum(r.unidades) AS unidades,
+            sum(r.total) AS total,
+            row_number() OVER (ORDER BY sum(r.total) DESC, r.clave) AS posicion
+        FROM venta_rollup r
+        WHERE r.empresas_id_empresa = :empresa_id
+          AND r.dimension = :dimension
+          AND r.moneda_id_moneda = :moneda_id
+          AND r.dia > CAST(:hoy AS date) - CAST(:dias AS integer)
+        GROUP BY r.clave, r.moneda_id_moneda
+    )
+    SELECT
+        ranked.posicion,
+        ranked.clave,
+        COALESCE(p.nombre, c.nombre) AS nombre,
+        ranked.moneda_id_moneda,
+        ranked.num_ventas,
+        ranked.unidades,
+        ranked.total
+    FROM ranked
+    LEFT JOIN productos p
+        ON :dimension = 'producto' AND p.id_producto = ranked.clave
+    LEFT JOIN clientes c
+        ON :dimension = 'cliente' AND c.id_cliente = ranked.clave
+    WHERE ranked.posicion <= :n
+    ORDER BY ranked.posicion
+    """
+)
+
+# Recalcula desde venta / venta_detalle los agregados de una empresa.
+# Debe coincidir con lo que suma record_venta.
+_REBUILD_SQL = [
+    text("DELETE FROM venta_rollup WHERE empresas_id_empresa = :empresa_id"),
+    text(
+        """
+        INSERT INTO venta_rollup (
+            empresas_id_empresa, dimension, dia, moneda_id_moneda, clave,
+            num_ventas, unidades, total, total_base, ventas_sin_tasa
+        )
+        SELECT
+            v.empresas_id_empresa, g.dimension, (v.fecha_creacion AT TIME ZONE :tz)::date,
+            v.moneda_id_moneda, g.clave, count(*), sum(u.unidades), sum(v.total),
+            COALESCE(sum(v.total_base), 0),
+            count(*) FILTER (WHERE v.tasa_base IS NULL)
+        FROM venta v
+        -- Unidades por venta solo para las ventas de la empresa (índice
+        -- ix_venta_detalle_venta), no un agregado de toda venta_detalle
+        CROSS JOIN LATERAL (
+            SELECT sum(d.cantidad) AS unidades
+            FROM venta_detalle d
+            WHERE d.venta_id_venta = v.id_venta
+        ) u
+        CROSS JOIN LATERAL (
+            VALUES ('total', 0), ('cliente', v.clientes_id_cliente), ('usuario', v.usuarios_id_usuario)
+        ) AS g(dimension, clave)
+        WHERE v.empresas_id_empresa = :empresa_id
+          -- Como record_venta: una venta sin detalles no cuenta
+          AND u.unidades IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5
+        """
+    ),
+    text(
+        """
+        INSERT INTO venta_rollup (
+            empresas_id_empresa, dimension, dia, moneda_id_moneda, clave,
+            num_ventas, unidades, total, total_base, ventas_sin_tasa
+        )
+        SELECT
+            v.empresas_id_empresa, 'producto', (v.fecha_creacion AT TIME ZONE :tz)::date,
+            v.moneda_id_moneda, d.productos_id_producto,
+            count(DISTINCT v.id_venta),
+            sum(d.cantidad),
+            sum((d.precio_unitario - d.descuento_item) * d.cantidad),
+            COALESCE(sum((d.precio_unitario - d.descuento_item) * d.cantidad * v.tasa_base), 0),
+            count(DISTINCT v.id_venta) FILTER (WHERE v.tasa_base IS NULL)
+        FROM venta v
+        JOIN venta_detalle d ON d.venta_id_venta = v.id_venta
+        WHERE v.empresas_id_empresa = :empresa_id
+        GROUP BY 1, 2, 3, 4, 5
+        """
+    ),
+]
+
+
+def venta_dia(fecha: datetime) -> date:
+    """Día contable de una venta en la zona horaria de los reportes."""
+    return fecha.astimezone(ZoneInfo(get_settings().reportes_timezone)).date()
+
+
+def _rollup_rows(
+    empresa_id: int,
+    dia: date,
+    moneda_id: int,
+    cliente_id: int,
+    usuario_id: int,
+    total: int,
+    items: Iterable[Tuple[int, int, int]],
+    tasa_base: Optional[Decimal] = None,
+) -> List[Dict]:
+    """items: (producto_id, cantidad, total_linea). Sin tasa_base la venta cuenta en ventas_sin_tasa."""
+    unidades = 0
+    productos: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for producto_id, cantidad, total_linea in items:
+        unidades += cantidad
+        productos[producto_id][0] += cantidad
+        productos[producto_id][1] += total_linea
+
+    def _base(monto: int) -> Decimal:
+        # Mismo cálculo que el rebuild (monto * tasa, sin redondear)
+        return Decimal(monto) * tasa_base if tasa_base is not None else Decimal(0)
+
+    base = {
+        "empresa_id": empresa_id,
+        "dia": dia,
+        "moneda_id": moneda_id,
+        "num_ventas": 1,
+        "ventas_sin_tasa": 0 if tasa_base is not None else 1,
+    }
+    venta = {"unidades": unidades, "total": total, "total_base": _base(total)}
+    rows = [
+        {**base, **venta, "dimension": "total", "clave": 0},
+        {**base, **venta, "dimension": "cliente", "clave": cliente_id},
+        {**base, **venta, "dimension": "usuario", "clave": usuario_id},
+    ]
+    for producto_id, (cantidad, total_producto) in productos.items():
+        rows.append(
+            {
+                **base,
+                "dimension": "producto",
+                "clave": producto_id,
+                "unidades": cantidad,
+                "total": total_producto,
+                "total_base": _base(total_producto),
+            }
+        )
+    # Orden fijo de claves: dos ventas concurrentes bloquean filas en el
+    # mismo orden y no hay deadlocks.
+    rows.sort(key=lambda r: (r["dimension"], r["clave"]))
+    return rows
+
+
+async def record_venta(
+    db: AsyncSession,
+    empresa_id: int,
+    fecha: datetime,
+    moneda_id: int,
+    cliente_id: int,
+    usuario_id: int,
+    total: int,
+    items: Iterable[Tuple[int, int, int]],
+    tasa_base: Optional[Decimal] = None,
+) -> None:
+    """
+    Suma una venta recién creada a los agregados, en la misma transacción.
+    El total por producto es el de la línea, antes del descuento global.
+    `tasa_base` es la misma que quedó en venta.tasa_base.
+    """
+    await db.execute(
+        ROLLUP_LOCK_SHARED_SQL,
+        {"lock_class": _ROLLUP_LOCK_CLASS, "empresa_id": empresa_id},
+    )
+    rows = _rollup_rows(
+        empresa_id, venta_dia(fecha), moneda_id, cliente_id, usuario_id, total, items, tasa_base
+    )
+    await db.execute(ROLLUP_UPSERT_SQL, rows)
+
+
+async def rebuild(conn: AsyncConnection, empresa_id: int) -> None:
+    """Reconstruye los agregados de una empresa (dentro de la transacción de `conn`)."""
+    await conn.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_class, :empresa_id)"),
+        {"lock_class": _ROLLUP_LOCK_CLASS, "empresa_id": empresa_id},
+    )
+    params = {"empresa_id": empresa_id, "tz": get_settings().reportes_timezone}
+    for stmt in _REBUILD_SQL:
+        await conn.execute(stmt, params)
+
+
+async def refresh_top(engine: AsyncEngine) -> bool:
+    """
+    Refresca venta_top sin bloquear lecturas. Con varios workers solo
+    refresca el que obtiene el advisory lock; devuelve si lo hizo.
+    """
+    async with engine.begin() as conn:
+        got = (
+            await conn.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_class, 0)"),
+                {"lock_class": _TOP_REFRESH_LOCK_CLASS},
+            )
+        ).scalar()
+        if not got:
+            return False
+        # current_date de la vista en la zona de los reportes
+        await conn.execute(
+            text("SELECT set_config('timezone', :tz, true)"),
+            {"tz": get_settings().reportes_timezone},
+        )
+        await conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY venta_top"))
+    return True
+
+
+async def run_top_refresher(engine: AsyncEngine, interval: float) -> None:
+    """Tarea de fondo del lifespan: refresca venta_top cada `interval` segundos."""
+    while True:
+        try:
+            if await refresh_top(engine):
+                metrics.incr("rollups.top_refreshed")
+        except Exception as e:
+            metrics.incr("rollups.top_refresh_errors")
+            logger.warning(f"venta_top refresh failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,58 @@
+# app/services/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.services import metrics
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave: la primera ejecuta
+    `fn` y las que llegan mientras tanto esperan y reciben el mismo
+    resultado (o la misma excepción). No es una cache: al terminar la
+    llamada la clave se libera.
+
+    `fn` corre en la tarea del primero. Si ese request se cancela (p. ej.
+    el cliente se desconectó), los que esperaban no fallan: uno de ellos
+    vuelve a intentarlo.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None:
+                return await self._lead(key, fn)
+            metrics.incr(f"singleflight.{self.name}.shared")
+            try:
+                return await asyncio.shield(fut)
+            except asyncio.CancelledError:
+                if fut.cancelled():
+                    continue
+                raise
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        # Evita el warning de "exception was never retrieved" si nadie esperaba
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = fut
+        metrics.incr(f"singleflight.{self.name}.calls")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,94 @@
+# app/services/sync_feed.py
+import base64
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import text
+
+# Streams del feed, cada uno paginado por (sync_version, id)
+STREAMS = ("ventas", "clientes", "eliminados")
+
+Position = Tuple[int, int]
+
+# Todas las transacciones con xid menor a este valor ya terminaron: lo que
+# esté por debajo es definitivo y no puede aparecer "hacia atrás" después.
+HORIZON_SQL = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+VENTAS_CHANGES_SQL = text(
+    """
+    SELECT
+        v.sync_version,
+        v.id_venta,
+        v.descuento,
+        v.razon_social,
+        v.nit,
+        v.total,
+        c.id_cliente,
+        c.nombre AS cliente_nombre,
+        m.id_moneda,
+        m.nombre AS moneda_nombre,
+        u.id_usuario,
+        u.nombre AS usuario_nombre,
+        u.apellido AS usuario_apellido,
+        u.email AS usuario_email
+    FROM venta v
+    JOIN clientes c ON c.id_cliente = v.clientes_id_cliente
+    JOIN moneda m ON m.id_moneda = v.moneda_id_moneda
+    JOIN usuarios u ON u.id_usuario = v.usuarios_id_usuario
+    WHERE v.empresas_id_empresa = :empresa_id
+      AND (v.sync_version, v.id_venta) > (:version, :id)
+      AND v.sync_version < :horizon
+    ORDER BY v.sync_version, v.id_venta
+    LIMIT :limit
+    """
+)
+
+CLIENTES_CHANGES_SQL = text(
+    """
+    SELECT sync_version, id_cliente, nombre, tipo, telefono, email, notas
+    FROM clientes
+    WHERE empresas_id_empresa = :empresa_id
+      AND (sync_version, id_cliente) > (:version, :id)
+      AND sync_version < :horizon
+    ORDER BY sync_version, id_cliente
+    LIMIT :limit
+    """
+)
+
+TOMBSTONES_CHANGES_SQL = text(
+    """
+    SELECT sync_version, id_tombstone, entidad, id_entidad, eliminado_en
+    FROM sync_tombstones
+    WHERE empresas_id_empresa = :empresa_id
+      AND (sync_version, id_tombstone) > (:version, :id)
+      AND sync_version < :horizon
+    ORDER BY sync_version, id_tombstone
+    LIMIT :limit
+    """
+)
+
+
+def encode_cursor(positions: Dict[str, Position]) -> str:
+    raw = ".".join(f"{positions[s][0]}-{positions[s][1]}" for s in STREAMS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Position]:
+    """Cursor vacío = desde el principio (sincronización completa)."""
+    if not cursor:
+        return {s: (0, 0) for s in STREAMS}
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        parts = raw.split(".")
+        if len(parts) != len(STREAMS):
+            raise ValueError("wrong number of streams")
+        positions = {}
+        for stream, part in zip(STREAMS, parts):
+            version, id_ = part.split("-")
+            positions[stream] = (int(version), int(id_))
+        return positions
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor",
+        )
@@ -0,0 +1,99 @@
+# app/services/tipo_cambio.py
+"""
+Tipos de cambio a la moneda base (MONEDA_BASE_ID). create_venta fija la
+tasa del día de la venta en venta.tasa_base / total_base y los agregados
+suman total_base, así los ingresos de varias monedas se leen de
+venta_rollup sin convertir fila por fila.
+
+La tasa por (moneda, día) se cachea en memoria; un cambio en tipo_cambio
+se publica en el bus de invalidación y vacía la cache en todos los workers.
+"""
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.services import invalidation, metrics
+from app.services.cache import TTLCache
+from app.services.singleflight import SingleFlight
+
+# Función de la migración 0010: par directo o inverso, la más reciente <= día
+TASA_SQL = text("SELECT tasa_cambio(:origen, :destino, :dia)")
+
+UPSERT_SQL = text(
+    """
+    INSERT INTO tipo_cambio (moneda_origen, moneda_destino, vigente_desde, tasa)
+    VALUES (:origen, :destino, :vigente_desde, :tasa)
+    ON CONFLICT (moneda_origen, moneda_destino, vigente_desde)
+    DO UPDATE SET tasa = EXCLUDED.tasa, actualizado_en = now()
+    RETURNING moneda_origen, moneda_destino, vigente_desde, tasa, actualizado_en
+    """
+)
+
+LIST_SQL = text(
+    """
+    SELECT moneda_origen, moneda_destino, vigente_desde, tasa, actualizado_en
+    FROM tipo_cambio
+    WHERE moneda_origen = :origen
+      AND moneda_destino = :destino
+    ORDER BY vigente_desde DESC
+    LIMIT :limit
+    """
+)
+
+# En la cache, "no hay tasa" también se guarda (None es "no está en cache")
+_SIN_TASA = "sin_tasa"
+
+_flight = SingleFlight("tipo_cambio")
+
+
+@lru_cache()
+def _get_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(ttl=settings.tipo_cambio_cache_ttl, maxsize=settings.tipo_cambio_cache_size)
+
+
+async def _reload(db: AsyncSession, moneda_id: int, base: int, dia: date):
+    metrics.incr("tipo_cambio.lookups")
+    cache = _get_cache()
+    # Si una tasa cambia mientras se consulta, lo leído no se guarda
+    generation = cache.generation
+    res = await db.execute(TASA_SQL, {"origen": moneda_id, "destino": base, "dia": dia})
+    tasa = res.scalar()
+    value = _SIN_TASA if tasa is None else tasa
+    cache.set((moneda_id, dia), value, generation=generation)
+    return value
+
+
+async def tasa_base(db: AsyncSession, moneda_id: int, dia: date) -> Optional[Decimal]:
+    """
+    Tasa para convertir `moneda_id` a la moneda base el día `dia`.
+    None si no hay moneda base configurada o ninguna tasa vigente.
+    """
+    base = get_settings().moneda_base_id
+    if base is None:
+        return None
+    if moneda_id == base:
+        return Decimal(1)
+    key = (moneda_id, dia)
+    value = _get_cache().get(key)
+    if value is None:
+        value = await _flight.do(key, lambda: _reload(db, moneda_id, base, dia))
+    return None if value is _SIN_TASA else value
+
+
+def convertir(monto: int, tasa: Optional[Decimal]) -> Optional[Decimal]:
+    """Monto en moneda base, sin redondear: los agregados lo suman."""
+    return None if tasa is None else Decimal(monto) * tasa
+
+
+def invalidate() -> None:
+    _get_cache().clear()
+
+
+# Una tasa nueva puede cambiar la vigente de cualquier día posterior: se vacía todo
+invalidation.register("tipo_cambio", lambda empresa_id, id_: invalidate(), invalidate)
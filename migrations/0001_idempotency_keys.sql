@@ -0,0 +1,14 @@
+-- 0001: claves de idempotencia para POST /ventas y POST /clientes
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    empresas_id_empresa INTEGER      NOT NULL,
+    scope               VARCHAR(30)  NOT NULL,
+    key                 VARCHAR(255) NOT NULL,
+    request_hash        VARCHAR(64)  NOT NULL,
+    status_code         INTEGER,
+    response_body       JSONB,
+    created_at          TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    PRIMARY KEY (empresas_id_empresa, scope, key)
+);
+
+CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at
+    ON idempotency_keys (created_at);
@@ -0,0 +1,32 @@
+-- 0002: índices para las consultas calientes de ventas.py, clientes.py y deps.py
+-- CONCURRENTLY: no bloquea escrituras mientras se construyen en producción.
+
+-- list_ventas: filtro por empresa + orden por id_venta DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_id_venta
+    ON venta (empresas_id_empresa, id_venta DESC);
+
+-- join venta -> clientes (filtro de tenant mientras venta.empresas_id_empresa no esté poblado)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_cliente
+    ON venta (clientes_id_cliente);
+
+-- _build_venta_response / _venta_version: detalles de una venta en orden
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_detalle_venta
+    ON venta_detalle (venta_id_venta, id_venta_detalle);
+
+-- list_clientes: filtro por empresa + orden por id_cliente
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_clientes_empresa_id_cliente
+    ON clientes (empresas_id_empresa, id_cliente);
+
+-- create_venta: validación de productos de la empresa
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_productos_empresa_id_producto
+    ON productos (empresas_id_empresa, id_producto);
+
+-- deps.py: tablas del auth-service usadas en cada request
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_usuarios_auth_uid
+    ON usuarios (auth_uid);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_usuarios_roles_usuario
+    ON usuarios_roles (usuarios_id_usuario, roles_id_rol);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_roles_permisos_rol
+    ON roles_permisos (roles_id_rol, permisos_id_permiso);
@@ -0,0 +1,10 @@
+-- 0003: índice para completar venta.empresas_id_empresa en las filas antiguas
+-- Orden: migrar, desplegar el código que escribe la columna y después
+-- python -m app.backfills venta-empresa, que al terminar agrega y valida
+-- la restricción NOT NULL. Agregarla aquí haría fallar los INSERT del
+-- código anterior mientras no se despliega el nuevo.
+
+-- Índice parcial para recorrer solo las filas pendientes del backfill
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_pendiente
+    ON venta (id_venta)
+    WHERE empresas_id_empresa IS NULL;
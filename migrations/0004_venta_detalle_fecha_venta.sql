@@ -0,0 +1,9 @@
+-- 0004: clave de partición de venta_detalle (copia de venta.fecha_creacion)
+-- Permite particionar venta y venta_detalle por el mismo rango mensual.
+-- Las filas antiguas se completan con: python -m app.backfills venta-detalle-fecha
+ALTER TABLE venta_detalle ADD COLUMN IF NOT EXISTS fecha_venta TIMESTAMPTZ;
+
+-- Índice parcial para recorrer solo los detalles pendientes del backfill
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_detalle_fecha_pendiente
+    ON venta_detalle (id_venta_detalle)
+    WHERE fecha_venta IS NULL;
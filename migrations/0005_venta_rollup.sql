@@ -0,0 +1,13 @@
+-- 0005: agregados de ventas por día, mantenidos por create_venta
+-- dimension: 'total' (clave 0), 'cliente', 'usuario' o 'producto'
+CREATE TABLE IF NOT EXISTS venta_rollup (
+    empresas_id_empresa INTEGER     NOT NULL,
+    dimension           VARCHAR(20) NOT NULL,
+    dia                 DATE        NOT NULL,
+    moneda_id_moneda    INTEGER     NOT NULL,
+    clave               INTEGER     NOT NULL,
+    num_ventas          INTEGER     NOT NULL DEFAULT 0,
+    unidades            INTEGER     NOT NULL DEFAULT 0,
+    total               NUMERIC     NOT NULL DEFAULT 0,
+    PRIMARY KEY (empresas_id_empresa, dimension, dia, moneda_id_moneda, clave)
+);
@@ -0,0 +1,37 @@
+-- 0006: rankings precalculados (top productos / clientes) por empresa y moneda
+-- Ventanas móviles de 1, 7 y 30 días sobre venta_rollup; se guardan los 100 primeros.
+-- Se refresca con REFRESH MATERIALIZED VIEW CONCURRENTLY (ver app/services/rollups.py).
+CREATE MATERIALIZED VIEW IF NOT EXISTS venta_top AS
+WITH ranked AS (
+    SELECT
+        r.empresas_id_empresa,
+        w.dias AS ventana_dias,
+        r.dimension,
+        r.moneda_id_moneda,
+        r.clave,
+        sum(r.num_ventas) AS num_ventas,
+        sum(r.unidades) AS unidades,
+        sum(r.total) AS total,
+        row_number() OVER (
+            PARTITION BY r.empresas_id_empresa, w.dias, r.dimension, r.moneda_id_moneda
+            ORDER BY sum(r.total) DESC, r.clave
+        ) AS posicion
+    FROM venta_rollup r
+    JOIN (VALUES (1), (7), (30)) AS w(dias)
+        ON r.dia > current_date - w.dias
+    WHERE r.dimension IN ('producto', 'cliente')
+    GROUP BY r.empresas_id_empresa, w.dias, r.dimension, r.moneda_id_moneda, r.clave
+)
+SELECT
+    ranked.*,
+    COALESCE(p.nombre, c.nombre) AS nombre
+FROM ranked
+LEFT JOIN productos p
+    ON ranked.dimension = 'producto' AND p.id_producto = ranked.clave
+LEFT JOIN clientes c
+    ON ranked.dimension = 'cliente' AND c.id_cliente = ranked.clave
+WHERE ranked.posicion <= 100;
+
+-- Requerido por REFRESH ... CONCURRENTLY y usado por GET /ventas/top
+CREATE UNIQUE INDEX IF NOT EXISTS ux_venta_top
+    ON venta_top (empresas_id_empresa, dimension, ventana_dias, moneda_id_moneda, posicion);
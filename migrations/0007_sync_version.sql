@@ -0,0 +1,66 @@
+-- 0007: feed de cambios para clientes POS (GET /ventas/changes)
+-- sync_version = id de la transacción que escribió la fila (xid8 como bigint).
+-- El feed solo entrega versiones por debajo del xmin del snapshot actual,
+-- así nunca se salta una transacción que haga commit más tarde.
+
+ALTER TABLE venta ADD COLUMN IF NOT EXISTS sync_version BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE clientes ADD COLUMN IF NOT EXISTS sync_version BIGINT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id_tombstone        BIGSERIAL    PRIMARY KEY,
+    empresas_id_empresa INTEGER      NOT NULL,
+    entidad             VARCHAR(20)  NOT NULL,
+    id_entidad          INTEGER      NOT NULL,
+    sync_version        BIGINT       NOT NULL,
+    eliminado_en        TIMESTAMPTZ  NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION sync_set_version() RETURNS trigger AS $$
+BEGIN
+    NEW.sync_version := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+-- TG_ARGV[0]: entidad, TG_ARGV[1]: columna id
+CREATE OR REPLACE FUNCTION sync_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO sync_tombstones (empresas_id_empresa, entidad, id_entidad, sync_version)
+    VALUES (
+        OLD.empresas_id_empresa,
+        TG_ARGV[0],
+        (to_jsonb(OLD) ->> TG_ARGV[1])::integer,
+        pg_current_xact_id()::text::bigint
+    );
+    RETURN OLD;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS venta_sync_version ON venta;
+CREATE TRIGGER venta_sync_version
+    BEFORE INSERT OR UPDATE ON venta
+    FOR EACH ROW EXECUTE FUNCTION sync_set_version();
+
+DROP TRIGGER IF EXISTS clientes_sync_version ON clientes;
+CREATE TRIGGER clientes_sync_version
+    BEFORE INSERT OR UPDATE ON clientes
+    FOR EACH ROW EXECUTE FUNCTION sync_set_version();
+
+DROP TRIGGER IF EXISTS venta_sync_tombstone ON venta;
+CREATE TRIGGER venta_sync_tombstone
+    AFTER DELETE ON venta
+    FOR EACH ROW EXECUTE FUNCTION sync_tombstone('venta', 'id_venta');
+
+DROP TRIGGER IF EXISTS clientes_sync_tombstone ON clientes;
+CREATE TRIGGER clientes_sync_tombstone
+    AFTER DELETE ON clientes
+    FOR EACH ROW EXECUTE FUNCTION sync_tombstone('cliente', 'id_cliente');
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_sync
+    ON venta (empresas_id_empresa, sync_version, id_venta);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_clientes_empresa_sync
+    ON clientes (empresas_id_empresa, sync_version, id_cliente);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_sync_tombstones_empresa_sync
+    ON sync_tombstones (empresas_id_empresa, sync_version, id_tombstone);
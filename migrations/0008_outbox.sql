@@ -0,0 +1,23 @@
+-- 0008: outbox transaccional de eventos para otros servicios (inventario, reportes).
+-- create_venta inserta el evento en su transacción; app/services/outbox.py
+-- los publica por lotes con reintentos. Entrega "al menos una vez": los
+-- consumidores deben deduplicar por id_evento.
+CREATE TABLE IF NOT EXISTS outbox (
+    id_evento           BIGSERIAL    PRIMARY KEY,
+    empresas_id_empresa INTEGER      NOT NULL,
+    tipo                VARCHAR(50)  NOT NULL,
+    payload             JSONB        NOT NULL,
+    creado_en           TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    intentos            INTEGER      NOT NULL DEFAULT 0,
+    proximo_intento     TIMESTAMPTZ  NOT NULL DEFAULT now(),
+    ultimo_error        TEXT,
+    enviado_en          TIMESTAMPTZ
+);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_outbox_pendientes
+    ON outbox (proximo_intento, id_evento)
+    WHERE enviado_en IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_outbox_enviados
+    ON outbox (enviado_en)
+    WHERE enviado_en IS NOT NULL;
@@ -0,0 +1,22 @@
+-- 0009: índices para los filtros de GET /ventas. Todos empiezan por la
+-- empresa; los de igualdad terminan en id_venta DESC para servir también
+-- el orden de la página sin sort.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_fecha
+    ON venta (empresas_id_empresa, fecha_creacion);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_cliente
+    ON venta (empresas_id_empresa, clientes_id_cliente, id_venta DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_moneda
+    ON venta (empresas_id_empresa, moneda_id_moneda, id_venta DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_usuario
+    ON venta (empresas_id_empresa, usuarios_id_usuario, id_venta DESC);
+
+-- Prefijo de NIT como rango en collation "C" (comparación por bytes)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_nit
+    ON venta (empresas_id_empresa, (nit COLLATE "C"));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_total
+    ON venta (empresas_id_empresa, total);
@@ -0,0 +1,55 @@
+-- 0010: tipos de cambio por par de monedas y totales en moneda base
+-- Una fila = desde `vigente_desde` (inclusive), 1 unidad de origen vale
+-- `tasa` unidades de destino. Rige hasta la siguiente fecha del mismo par.
+CREATE TABLE IF NOT EXISTS tipo_cambio (
+    moneda_origen   INTEGER     NOT NULL,
+    moneda_destino  INTEGER     NOT NULL,
+    vigente_desde   DATE        NOT NULL,
+    tasa            NUMERIC     NOT NULL CHECK (tasa > 0),
+    actualizado_en  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (moneda_origen, moneda_destino, vigente_desde),
+    CHECK (moneda_origen <> moneda_destino)
+);
+
+-- Tasa usada y total convertido a MONEDA_BASE_ID al crear la venta.
+-- NULL = no había tasa (o ventas anteriores: backfill venta-total-base).
+ALTER TABLE venta ADD COLUMN IF NOT EXISTS tasa_base NUMERIC;
+ALTER TABLE venta ADD COLUMN IF NOT EXISTS total_base NUMERIC;
+
+-- Los agregados suman también el total en moneda base; ventas_sin_tasa
+-- cuenta las ventas que quedaron fuera de total_base.
+ALTER TABLE venta_rollup ADD COLUMN IF NOT EXISTS total_base NUMERIC NOT NULL DEFAULT 0;
+ALTER TABLE venta_rollup ADD COLUMN IF NOT EXISTS ventas_sin_tasa INTEGER NOT NULL DEFAULT 0;
+
+-- Tasa vigente el día `dia` para convertir de `origen` a `destino`: la más
+-- reciente del par directo o la inversa del par contrario. NULL si no hay.
+-- Cada rama es un solo salto por la clave primaria.
+CREATE OR REPLACE FUNCTION tasa_cambio(origen INTEGER, destino INTEGER, dia DATE)
+RETURNS NUMERIC AS $$
+    SELECT CASE WHEN origen = destino THEN 1 ELSE (
+        SELECT t.tasa
+        FROM (
+            (
+                SELECT tasa, vigente_desde
+                FROM tipo_cambio
+                WHERE moneda_origen = origen
+                  AND moneda_destino = destino
+                  AND vigente_desde <= dia
+                ORDER BY vigente_desde DESC
+                LIMIT 1
+            )
+            UNION ALL
+            (
+                SELECT 1 / tasa, vigente_desde
+                FROM tipo_cambio
+                WHERE moneda_origen = destino
+                  AND moneda_destino = origen
+                  AND vigente_desde <= dia
+                ORDER BY vigente_desde DESC
+                LIMIT 1
+            )
+        ) t
+        ORDER BY t.vigente_desde DESC
+        LIMIT 1
+    ) END
+$$ LANGUAGE sql STABLE;
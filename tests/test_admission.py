@@ -0,0 +1,87 @@
+# tests/test_admission.py
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+from fastapi import Depends, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import deps  # noqa: E402
+from app.services import admission  # noqa: E402
+
+
+def _user(empresa_id: int):
+    return SimpleNamespace(
+        empresa=SimpleNamespace(id_empresa=empresa_id),
+        has_permission=lambda action, resource: True,
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    opened = []
+
+    async def fake_user(request):
+        return _user(int(request.headers["x-empresa"]))
+
+    @asynccontextmanager
+    async def fake_session(request):
+        # Estado de admisión de la empresa en el momento de tomar la conexión
+        state = admission._tenants.get(int(request.headers["x-empresa"]))
+        opened.append(state.inflight if state else None)
+        yield object()
+
+    monkeypatch.setattr(deps, "_user_from_cookie", fake_user)
+    monkeypatch.setattr(deps, "request_session", fake_session)
+    monkeypatch.setattr(admission, "_tenants", {})
+
+    app = FastAPI()
+
+    # get_db declarado antes que el permiso: el orden no debe importar
+    @app.get("/x")
+    async def endpoint(
+        db=Depends(deps.get_db),
+        current_user=Depends(deps.require_permission("read", "ventas")),
+    ):
+        return {"ok": True}
+
+    return TestClient(app), opened
+
+
+def test_connection_is_taken_after_tenant_is_admitted(client):
+    http, opened = client
+    res = http.get("/x", headers={"x-empresa": "1"})
+    assert res.status_code == 200
+    # Una sola sesión, abierta con el slot de la empresa ya ocupado
+    assert opened == [1]
+    assert admission._tenants[1].inflight == 0
+
+
+def test_rejected_tenant_never_opens_a_session(client):
+    http, opened = client
+    admission._tenants[2] = admission._TenantState(rate=0.1, burst=0, max_concurrency=1)
+    res = http.get("/x", headers={"x-empresa": "2"})
+    assert res.status_code == 429
+    assert "Retry-After" in res.headers
+    assert opened == []
+
+
+def test_snapshot_only_exposes_totals(monkeypatch):
+    monkeypatch.setattr(admission, "_tenants", {})
+    busy = admission._tenants[7] = admission._TenantState(rate=1, burst=1, max_concurrency=2)
+    busy.inflight, busy.rejected = 2, 3
+    idle = admission._tenants[8] = admission._TenantState(rate=1, burst=1, max_concurrency=2)
+    idle.rejected = 1
+    snap = admission.snapshot()
+    assert snap["tenants"] == 2
+    assert snap["inflight"] == 2
+    assert snap["tenants_at_max_concurrency"] == 1
+    assert snap["rejected"] == 4
+    # Nada por empresa: solo totales
+    assert all(not isinstance(v, dict) for v in snap.values())
@@ -0,0 +1,66 @@
+# tests/test_cache.py
+from app.services import cache as cache_module
+from app.services.cache import LRUCache, TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    cache = TTLCache(ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=100)
+    clock.now += 11
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_ttl_cache_drops_oldest_when_full():
+    cache = TTLCache(ttl=60, maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert (cache.get("b"), cache.get("c")) == (2, 3)
+
+
+def test_ttl_cache_set_skips_values_loaded_before_an_invalidation():
+    cache = TTLCache(ttl=60)
+    generation = cache.generation
+    # Una invalidación llega mientras la recarga consulta la BD
+    cache.invalidate("monedas")
+    assert cache.set("monedas", "viejo", generation=generation) is False
+    assert cache.get("monedas") is None
+    # Una recarga iniciada después sí se guarda
+    assert cache.set("monedas", "nuevo", generation=cache.generation) is True
+    assert cache.get("monedas") == "nuevo"
+
+
+def test_ttl_cache_clear_also_bumps_generation():
+    cache = TTLCache(ttl=60)
+    generation = cache.generation
+    cache.clear()
+    assert not cache.set("k", 1, generation=generation)
+    assert cache.set("k", 1)
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
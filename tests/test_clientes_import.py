@@ -0,0 +1,92 @@
+# tests/test_clientes_import.py
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic")
+pytest.importorskip("email_validator")
+
+from app.services import clientes_import  # noqa: E402
+
+
+async def _chunks(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+async def _collect(records):
+    return [r async for r in records]
+
+
+def _csv(data: bytes, size: int = 3):
+    return asyncio.run(_collect(clientes_import._csv_records(clientes_import._lines(_chunks(data, size)))))
+
+
+def _ndjson(data: bytes, size: int = 3):
+    return asyncio.run(_collect(clientes_import._ndjson_records(clientes_import._lines(_chunks(data, size)))))
+
+
+def test_lines_split_across_chunks_and_multibyte():
+    data = "\ufeffuno\r\ndós\nres".encode("utf-8")
+    lines = asyncio.run(_collect(clientes_import._lines(_chunks(data, 1))))
+    assert lines == ["uno\r\n", "dós\n", "res"]
+
+
+def test_csv_header_is_normalized_and_rows_numbered():
+    data = b"Nombre, Email\nAna,ana@x.com\n\nLuis,luis@x.com\n"
+    assert _csv(data) == [
+        (1, {"nombre": "Ana", "email": "ana@x.com"}),
+        (2, {"nombre": "Luis", "email": "luis@x.com"}),
+    ]
+
+
+def test_csv_quoted_field_with_newline():
+    data = b'nombre,notas\nAna,"linea 1\nlinea 2"\n'
+    assert _csv(data) == [(1, {"nombre": "Ana", "notas": "linea 1\nlinea 2"})]
+
+
+def test_csv_column_count_mismatch_and_unterminated_quote():
+    data = b'nombre,email\nAna\nLuis,"sin cerrar\n'
+    assert _csv(data) == [
+        (1, "expected 2 columns, got 1"),
+        (2, "unterminated quoted field"),
+    ]
+
+
+def test_csv_only_splits_on_lf():
+    # U+0085 (NEL) dentro de un nombre no parte la fila
+    data = "nombre,tipo,telefono,email,notas\r\nAna\x85B,t,1,a@b.co,n\r\n".encode("utf-8")
+    assert _csv(data, size=1) == [
+        (1, {"nombre": "Ana\x85B", "tipo": "t", "telefono": "1", "email": "a@b.co", "notas": "n"}),
+    ]
+
+
+def test_ndjson_line_separator_inside_string():
+    line = json.dumps({"nombre": "Ana\u2028B"}, ensure_ascii=False) + "\n"
+    assert "\u2028" in line
+    assert _ndjson(line.encode("utf-8")) == [(1, {"nombre": "Ana\u2028B"})]
+
+
+def test_ndjson_records_and_errors():
+    data = b'{"nombre": "Ana"}\n\n[1]\n{mal\n'
+    records = _ndjson(data)
+    assert records[0] == (1, {"nombre": "Ana"})
+    assert records[1] == (2, "expected a JSON object")
+    assert records[2][0] == 3 and records[2][1].startswith("invalid JSON")
+
+
+def test_validate_reports_field_errors():
+    cliente, errores = clientes_import._validate({"nombre": "Ana"})
+    assert cliente is None
+    assert any(e.startswith("email") for e in errores)
+
+    cliente, errores = clientes_import._validate(
+        {"nombre": "Ana", "tipo": "A", "telefono": "1", "email": "ana@x.com", "notas": ""}
+    )
+    assert errores == [] and cliente.nombre == "Ana"
+
+
+def test_validate_passes_parse_errors_through():
+    assert clientes_import._validate("invalid JSON: x") == (None, ["invalid JSON: x"])
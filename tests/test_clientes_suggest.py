@@ -0,0 +1,162 @@
+# tests/test_clientes_suggest.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.config import get_settings  # noqa: E402
+from app.services import clientes_suggest  # noqa: E402
+from app.services.clientes_suggest import _Index, normalize  # noqa: E402
+
+
+_BUDGET = 1000
+
+
+def _row(id_cliente, nombre, telefono="", email=""):
+    return SimpleNamespace(id_cliente=id_cliente, nombre=nombre, telefono=telefono, email=email)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_indexes():
+    clientes_suggest._clear()
+    yield
+    clientes_suggest._clear()
+
+
+def _ids(idx, prefix, k=10):
+    return [s.id_cliente for s in idx.search(normalize(prefix), k)]
+
+
+def test_normalize_strips_accents_and_case():
+    assert normalize("  José PÉREZ ") == "jose perez"
+
+
+def test_search_by_word_phone_and_email():
+    idx = _Index()
+    idx.load([
+        _row(1, "Juan Pérez", "+591 700-12345", "juan@x.com"),
+        _row(2, "Ana Peralta", "71234567", "ana@x.com"),
+    ], _BUDGET)
+    assert _ids(idx, "per") == [2, 1]
+    assert _ids(idx, "PÉREZ") == [1]
+    assert _ids(idx, "59170012") == [1]
+    assert _ids(idx, "ana@") == [2]
+    assert _ids(idx, "zzz") == []
+
+
+def test_search_deduplicates_and_respects_k():
+    idx = _Index()
+    idx.load([_row(1, "Pedro Pedraza"), _row(2, "Pedro Paz"), _row(3, "Pedro Lima")], _BUDGET)
+    assert sorted(_ids(idx, "ped")) == [1, 2, 3]
+    assert len(_ids(idx, "ped", k=2)) == 2
+
+
+def test_remove_and_add_update_the_entries():
+    idx = _Index()
+    idx.load([_row(1, "Juan Pérez")], _BUDGET)
+    idx.remove(1)
+    assert idx.entries == [] and _ids(idx, "juan") == []
+    idx.add(_row(1, "Juan Rojas"))
+    assert _ids(idx, "rojas") == [1]
+    assert idx.entries == sorted(idx.entries)
+    idx.remove(99)
+
+
+def test_invalidation_marks_dirty_or_drops_the_empresa():
+    idx = clientes_suggest._indexes[1] = _Index()
+    clientes_suggest._on_invalidate(1, 5)
+    assert idx.dirty == {5}
+    clientes_suggest._on_invalidate(1, None)
+    assert 1 not in clientes_suggest._indexes
+
+
+def test_evict_drops_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(get_settings(), "clientes_suggest_max_entries", 6)
+    for empresa_id in (1, 2, 3):
+        idx = clientes_suggest._indexes[empresa_id] = _Index()
+        idx.load([_row(empresa_id, "uno dos")], _BUDGET)
+    # 3 claves por empresa: hay que descartar una (la 2, no la que se consulta)
+    clientes_suggest._evict(keep=1)
+    assert list(clientes_suggest._indexes) == [1, 3]
+
+
+class _DB:
+    """Devuelve los clientes de la empresa según la consulta (carga, ids o búsqueda)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    async def execute(self, stmt, params):
+        self.queries.append((stmt, params))
+        if stmt is clientes_suggest.LOAD_SQL:
+            rows = self.rows[: params["limit"]]
+        elif stmt is clientes_suggest.LOAD_IDS_SQL:
+            rows = [r for r in self.rows if r.id_cliente in params["ids"]]
+        else:
+            rows = self.rows[: params["k"]]
+        return SimpleNamespace(fetchall=lambda: rows)
+
+
+def test_load_refuses_more_than_max_entries():
+    idx = _Index()
+    assert not idx.load([_row(1, "uno dos"), _row(2, "tres")], 3)
+    assert idx.entries == [] and idx.docs == {}
+    assert idx.load([_row(1, "uno dos")], 3)
+
+
+def test_oversized_empresa_falls_back_to_the_db(monkeypatch):
+    monkeypatch.setattr(get_settings(), "clientes_suggest_max_entries", 4)
+    db = _DB([_row(i, f"Cliente{i} Pérez") for i in range(1, 4)])
+
+    found = asyncio.run(clientes_suggest.suggest(db, 1, "cli", 2))
+
+    assert [s.id_cliente for s in found] == [1, 2]
+    assert 1 not in clientes_suggest._indexes
+    assert 1 in clientes_suggest._oversized
+    assert db.queries[0][1]["limit"] == 5
+    assert db.queries[-1][0] is clientes_suggest.SEARCH_SQL
+    assert db.queries[-1][1]["prefix"] == "cli%"
+    assert db.queries[-1][1]["word"] == "% cli%"
+
+    # Ya marcada: no se vuelve a cargar
+    db.queries.clear()
+    asyncio.run(clientes_suggest.suggest(db, 1, "cli", 2))
+    assert [q[0] for q in db.queries] == [clientes_suggest.SEARCH_SQL]
+
+    # Una invalidación sin id permite reintentar la carga
+    clientes_suggest._on_invalidate(1, None)
+    assert 1 not in clientes_suggest._oversized
+
+
+def test_like_prefix_escapes_wildcards():
+    assert clientes_suggest._like_prefix("a%b_c\\") == "a\\%b\\_c\\\\"
+
+
+def test_dirty_updates_respect_the_budget(monkeypatch):
+    monkeypatch.setattr(get_settings(), "clientes_suggest_max_entries", 5)
+    other = clientes_suggest._indexes[2] = _Index()
+    other.load([_row(20, "uno dos")], _BUDGET)
+    other.ready = True
+    db = _DB([_row(1, "Ana")])
+    asyncio.run(clientes_suggest.suggest(db, 1, "ana", 5))
+    assert list(clientes_suggest._indexes) == [2, 1]
+
+    # 3 + 1 claves; dos altas lo llevan a 6: se descarta la empresa 2
+    db.rows += [_row(2, "Beto"), _row(3, "Carla")]
+    clientes_suggest._on_invalidate(1, 2)
+    clientes_suggest._on_invalidate(1, 3)
+    found = asyncio.run(clientes_suggest.suggest(db, 1, "carla", 5))
+    assert [s.id_cliente for s in found] == [3]
+    assert list(clientes_suggest._indexes) == [1]
+
+    # Y si la empresa sola ya no entra, pasa a la BD
+    db.rows += [_row(i, f"Extra{i}") for i in range(4, 10)]
+    for i in range(4, 10):
+        clientes_suggest._on_invalidate(1, i)
+    asyncio.run(clientes_suggest.suggest(db, 1, "extra", 5))
+    assert clientes_suggest._indexes == {}
+    assert 1 in clientes_suggest._oversized
@@ -0,0 +1,43 @@
+# tests/test_columnar.py
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services.columnar import ColumnarSpec, columns_of, encode  # noqa: E402
+
+
+def test_encode_builds_columns_and_deduplicated_lookups():
+    spec = ColumnarSpec(
+        columns=("id_venta", "id_cliente", "total"),
+        lookups={"clientes": ("id_cliente", {"nombre": "cliente_nombre"})},
+    )
+    rows = [
+        {"id_venta": 11, "id_cliente": 3, "total": Decimal("150"), "cliente_nombre": "Ana"},
+        {"id_venta": 10, "id_cliente": 3, "total": Decimal("12.5"), "cliente_nombre": "Ana"},
+        {"id_venta": 9, "id_cliente": 4, "total": None, "cliente_nombre": "Luis"},
+    ]
+    assert encode(rows, spec) == {
+        "count": 3,
+        "columns": {
+            "id_venta": [11, 10, 9],
+            "id_cliente": [3, 3, 4],
+            "total": [150, 12.5, None],
+        },
+        "lookups": {"clientes": {"3": {"nombre": "Ana"}, "4": {"nombre": "Luis"}}},
+    }
+
+
+def test_decimals_become_numbers():
+    out = encode([{"a": Decimal("2.000")}, {"a": Decimal("0.25")}], columns_of(["a"]))
+    assert out["columns"]["a"] == [2, 0.25]
+    assert isinstance(out["columns"]["a"][0], int)
+
+
+def test_encode_empty():
+    assert encode([], columns_of(["a", "b"])) == {
+        "count": 0,
+        "columns": {"a": [], "b": []},
+        "lookups": {},
+    }
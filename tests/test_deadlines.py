@@ -0,0 +1,103 @@
+# tests/test_deadlines.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.services import deadlines  # noqa: E402
+
+_DEADLINE = 0.05
+
+
+class _QueryCanceled(Exception):
+    sqlstate = "57014"
+
+
+def _scope(method: str, path: str = "/ventas"):
+    return {"type": "http", "method": method, "path": path}
+
+
+async def _call(app, method: str):
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await deadlines.DeadlineMiddleware(app)(_scope(method), receive, send)
+    return sent
+
+
+def _status(sent):
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+async def _ok(send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture(autouse=True)
+def _short_deadline(monkeypatch):
+    monkeypatch.setattr(deadlines, "deadline_for", lambda path: _DEADLINE)
+
+
+def test_slow_read_is_cancelled_with_504():
+    cancelled = []
+
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        await _ok(send)
+
+    sent = asyncio.run(_call(app, "GET"))
+    assert _status(sent) == 504
+    assert cancelled == [True]
+
+
+def test_slow_write_is_not_cancelled():
+    async def app(scope, receive, send):
+        # Sigue pasado el plazo: p. ej. haciendo commit
+        await asyncio.sleep(_DEADLINE * 3)
+        await _ok(send)
+
+    sent = asyncio.run(_call(app, "POST"))
+    assert _status(sent) == 200
+
+
+def test_write_cut_by_statement_timeout_is_504():
+    async def app(scope, receive, send):
+        assert scope["state"]["deadline_seconds"] == _DEADLINE
+        raise OperationalError("UPDATE venta ...", {}, _QueryCanceled())
+
+    sent = asyncio.run(_call(app, "PATCH"))
+    assert _status(sent) == 504
+
+
+def test_other_errors_propagate():
+    async def app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(_call(app, "POST"))
+
+
+def test_deadline_for_uses_longest_prefix(monkeypatch):
+    monkeypatch.undo()
+    settings = deadlines.get_settings()
+    monkeypatch.setattr(settings, "request_deadline_seconds", 15.0)
+    monkeypatch.setattr(settings, "route_deadlines", {"/ventas": 20, "/ventas/live": 0})
+    assert deadlines.deadline_for("/clientes") == 15.0
+    assert deadlines.deadline_for("/ventas/123") == 20
+    assert deadlines.deadline_for("/ventas/live") == 0
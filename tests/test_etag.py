@@ -0,0 +1,39 @@
+# tests/test_etag.py
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.services import etag  # noqa: E402
+
+
+def _request(if_none_match=None):
+    headers = {} if if_none_match is None else {"if-none-match": if_none_match}
+    return SimpleNamespace(headers=headers)
+
+
+def test_computed_etag_is_weak():
+    tag = etag.compute_etag(b'{"a":1}')
+    assert tag.startswith('W/"') and tag.endswith('"')
+    assert tag == etag.compute_etag(b'{"a":1}')
+    assert tag != etag.compute_etag(b'{"a":2}')
+
+
+def test_matches_compares_weakly():
+    tag = etag.weak("abc")
+    assert etag.matches(_request('W/"abc"'), tag)
+    assert etag.matches(_request('"abc"'), tag)
+    assert etag.matches(_request('"x", W/"abc"'), tag)
+    assert etag.matches(_request("*"), tag)
+    assert not etag.matches(_request('W/"abd"'), tag)
+    assert not etag.matches(_request(), tag)
+
+
+def test_json_response_304_keeps_the_weak_etag():
+    first = etag.json_response(_request(), {"a": 1})
+    tag = first.headers["etag"]
+    assert tag.startswith('W/"')
+    second = etag.json_response(_request(tag), {"a": 1})
+    assert second.status_code == 304
+    assert second.headers["etag"] == tag
@@ -0,0 +1,24 @@
+# tests/test_explain_plans.py
+"""
+Planes de las consultas calientes (app/explain_check.py). Necesita una BD
+con el esquema y las migraciones aplicadas en EXPLAIN_CHECK_DATABASE_URL;
+sin ella se salta.
+"""
+import asyncio
+import os
+
+import pytest
+
+DATABASE_URL = os.environ.get("EXPLAIN_CHECK_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="EXPLAIN_CHECK_DATABASE_URL not set")
+
+
+def test_hot_queries_do_not_seq_scan(monkeypatch):
+    pytest.importorskip("sqlalchemy")
+    from app import explain_check
+    from app.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "database_url", DATABASE_URL)
+    failures = asyncio.run(explain_check.check(set()))
+    assert failures == [], failures
@@ -0,0 +1,75 @@
+# tests/test_idempotency.py
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.services import idempotency  # noqa: E402
+
+_KEY = (1, "ventas", "k1")
+_HOUR = 3600
+
+
+class _FakeDB:
+    """Simula que la reserva en la BD siempre gana (clave libre o vencida)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def execute(self, stmt, params=None):
+        self.calls += 1
+        return SimpleNamespace(fetchone=lambda: ("k1",))
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    idempotency._get_cache.cache_clear()
+    yield
+    idempotency._get_cache.cache_clear()
+
+
+def _remember(created_at: float) -> None:
+    stored = idempotency.StoredResponse("hash", 201, {"id_venta": 7}, created_at)
+    idempotency._get_cache().set(_KEY, stored)
+
+
+def test_cached_key_within_ttl_replays_without_db():
+    _remember(time.time() - _HOUR)
+    db = _FakeDB()
+    stored = asyncio.run(idempotency.begin(db, *_KEY, "hash"))
+    assert stored.body == {"id_venta": 7}
+    assert db.calls == 0
+
+
+def test_cached_key_past_ttl_is_not_replayed():
+    ttl = idempotency.get_settings().idempotency_ttl_hours
+    _remember(time.time() - ttl * _HOUR - 1)
+    db = _FakeDB()
+    # Vencida: se reserva de nuevo en la BD y el request se ejecuta
+    assert asyncio.run(idempotency.begin(db, *_KEY, "hash")) is None
+    assert db.calls == 1
+    assert idempotency._get_cache().get(_KEY) is None
+
+
+def test_purge_repeats_batches_until_short():
+    deleted = [idempotency.PURGE_BATCH, idempotency.PURGE_BATCH, 3]
+
+    class _Conn:
+        async def execute(self, stmt, params=None):
+            assert stmt is idempotency.PURGE_SQL
+            return SimpleNamespace(rowcount=deleted.pop(0))
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    engine = SimpleNamespace(begin=_Conn)
+    assert asyncio.run(idempotency.purge(engine)) == 2 * idempotency.PURGE_BATCH + 3
+    assert deleted == []
@@ -0,0 +1,125 @@
+# tests/test_migrations.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app import migrations  # noqa: E402
+
+
+def test_split_statements_handles_comments_strings_and_dollar_bodies():
+    sql = """
+    -- comentario; con punto y coma
+    CREATE TABLE t (a TEXT DEFAULT 'x;y');
+    CREATE FUNCTION f() RETURNS trigger AS $$
+    BEGIN
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    SELECT 'it''s';
+    """
+    stmts = migrations.split_statements(sql)
+    assert len(stmts) == 3
+    assert stmts[0] == "CREATE TABLE t (a TEXT DEFAULT 'x;y')"
+    assert stmts[1].startswith("CREATE FUNCTION f()") and stmts[1].endswith("LANGUAGE plpgsql")
+    assert stmts[2] == "SELECT 'it''s'"
+
+
+def test_every_migration_splits_into_statements():
+    for _version, path in migrations.list_migrations():
+        assert migrations.split_statements(path.read_text(encoding="utf-8")), path.name
+
+
+def test_concurrent_index_target():
+    stmt = "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_a ON venta (empresas_id_empresa)"
+    assert migrations.concurrent_index_target(stmt) == ("ix_a", "venta")
+    assert migrations.concurrent_index_target("CREATE INDEX ix_a ON venta (a)") is None
+    assert migrations.concurrent_index_target("ALTER TABLE venta ADD COLUMN x INT") is None
+
+
+def test_partitioned_index_statements():
+    stmt = (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_venta_empresa_nit\n"
+        '    ON venta (empresas_id_empresa, (nit COLLATE "C"))'
+    )
+    stmts = migrations.partitioned_index_statements(stmt, ["venta_p2025_01", "venta_default"])
+    assert stmts == [
+        'CREATE INDEX IF NOT EXISTS ix_venta_empresa_nit ON ONLY venta (empresas_id_empresa, (nit COLLATE "C"))',
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS venta_p2025_01_ix_venta_empresa_nit "
+        'ON venta_p2025_01 (empresas_id_empresa, (nit COLLATE "C"))',
+        "ALTER INDEX ix_venta_empresa_nit ATTACH PARTITION venta_p2025_01_ix_venta_empresa_nit",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS venta_default_ix_venta_empresa_nit "
+        'ON venta_default (empresas_id_empresa, (nit COLLATE "C"))',
+        "ALTER INDEX ix_venta_empresa_nit ATTACH PARTITION venta_default_ix_venta_empresa_nit",
+    ]
+
+
+def test_partition_index_names_fit_postgres_limit():
+    name = migrations._partition_index_name("ix_" + "x" * 60, "venta_detalle_p2025_01")
+    assert len(name) <= 63
+
+
+class _Conn:
+    """Catálogo simulado: relkind de las tablas e indisvalid de los índices existentes."""
+
+    def __init__(self, partitions=None, valid=None):
+        self.partitions = partitions or {}
+        self.valid = valid or {}
+        self.ran = []
+
+    async def execute(self, stmt, params):
+        sql = str(stmt)
+        if "relkind" in sql:
+            return _Result(value=params["table"] in self.partitions)
+        if "JOIN pg_class" in sql:
+            return _Result(rows=[(p,) for p in self.partitions[params["table"]]])
+        if "JOIN pg_index" in sql:
+            return _Result(rows=[])
+        assert "indisvalid" in sql
+        return _Result(value=self.valid.get(params["index"]))
+
+    async def exec_driver_sql(self, stmt):
+        self.ran.append(stmt)
+
+
+class _Result:
+    def __init__(self, value=None, rows=()):
+        self.value = value
+        self.rows = list(rows)
+
+    def scalar(self):
+        return self.value
+
+    def fetchall(self):
+        return self.rows
+
+
+def _run(conn, stmt):
+    asyncio.run(migrations._execute(conn, stmt))
+    return conn.ran
+
+
+def test_invalid_index_is_dropped_and_rebuilt():
+    stmt = "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_a ON clientes (a)"
+    assert _run(_Conn(valid={"ix_a": False}), stmt) == [
+        "DROP INDEX CONCURRENTLY IF EXISTS ix_a",
+        stmt,
+    ]
+    # Válido o inexistente: solo la sentencia (IF NOT EXISTS decide)
+    assert _run(_Conn(valid={"ix_a": True}), stmt) == [stmt]
+    assert _run(_Conn(), stmt) == [stmt]
+
+
+def test_invalid_partition_index_is_dropped_before_rebuilding():
+    stmt = "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_a ON venta (a)"
+    conn = _Conn(
+        partitions={"venta": ["venta_p1", "venta_p2"]},
+        valid={"ix_a": False, "venta_p1_ix_a": False},
+    )
+    ran = _run(conn, stmt)
+    assert ran[0] == "DROP INDEX CONCURRENTLY IF EXISTS venta_p1_ix_a"
+    assert ran[1].startswith("CREATE INDEX IF NOT EXISTS ix_a ON ONLY venta")
+    assert "DROP INDEX CONCURRENTLY IF EXISTS ix_a" not in ran
+    assert sum(s.startswith("CREATE INDEX CONCURRENTLY") for s in ran) == 2
@@ -0,0 +1,48 @@
+# tests/test_monedas_cache.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.services import monedas_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    monedas_cache._get_cache.cache_clear()
+    yield
+    monedas_cache._get_cache.cache_clear()
+
+
+def test_invalidation_during_reload_is_not_overwritten(monkeypatch):
+    async def scenario():
+        loading = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_load(db):
+            loading.set()
+            await release.wait()
+            return {1: "BOB (antes del cambio)"}
+
+        monkeypatch.setattr(monedas_cache, "_load", slow_load)
+        reload = asyncio.create_task(monedas_cache.get_monedas_map(None))
+        await loading.wait()
+        monedas_cache.invalidate()
+        release.set()
+        # El request que disparó la recarga recibe lo que leyó...
+        assert await reload == {1: "BOB (antes del cambio)"}
+        # ...pero no queda en cache: el próximo request vuelve a la BD
+        assert monedas_cache._get_cache().get(monedas_cache._KEY) is None
+
+    asyncio.run(scenario())
+
+
+def test_reload_without_invalidation_is_cached(monkeypatch):
+    async def load(db):
+        return {1: "BOB"}
+
+    monkeypatch.setattr(monedas_cache, "_load", load)
+    assert asyncio.run(monedas_cache.get_monedas_map(None)) == {1: "BOB"}
+    assert monedas_cache._get_cache().get(monedas_cache._KEY) == {1: "BOB"}
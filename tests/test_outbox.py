@@ -0,0 +1,151 @@
+# tests/test_outbox.py
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+pytest.importorskip("pydantic_settings")
+
+from app.config import get_settings  # noqa: E402
+from app.services import outbox  # noqa: E402
+
+
+class _Conn:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def execute(self, stmt, params=None):
+        self.engine.executed.append((stmt, params))
+        if stmt is outbox.CLAIM_SQL:
+            rows, self.engine.claimable = self.engine.claimable, []
+            return SimpleNamespace(fetchall=lambda: rows)
+        if stmt is outbox.PURGE_SQL:
+            deleted = min(self.engine.sent, params["limit"])
+            self.engine.sent -= deleted
+            self.engine.purge_calls += 1
+            return SimpleNamespace(rowcount=deleted)
+        if stmt is outbox.BACKLOG_SQL:
+            backlog = SimpleNamespace(pendientes=self.engine.pending, enviados=self.engine.sent)
+            return SimpleNamespace(one=lambda: backlog)
+        return SimpleNamespace(rowcount=len(params["ids"]))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Engine:
+    def __init__(self, sent=0, pending=0, claimable=None):
+        self.sent = sent
+        self.pending = pending
+        self.claimable = claimable or []
+        self.purge_calls = 0
+        self.executed = []
+
+    def begin(self):
+        return _Conn(self)
+
+    def connect(self):
+        return _Conn(self)
+
+    def statements(self):
+        return [stmt for stmt, _ in self.executed]
+
+
+class _FailingSink:
+    async def send(self, events):
+        raise ConnectionError("inventory down")
+
+
+def _row(id_evento, age_seconds, intentos=1):
+    return SimpleNamespace(
+        id_evento=id_evento,
+        empresas_id_empresa=1,
+        tipo="venta.creada",
+        payload={"id_venta": id_evento},
+        creado_en=datetime.now(timezone.utc) - timedelta(seconds=age_seconds),
+        intentos=intentos,
+    )
+
+
+@pytest.fixture(autouse=True)
+def _fresh_stats(monkeypatch):
+    stats = dict(outbox._stats, delivered=0, failed_batches=0, last_lag_seconds=0.0, max_lag_seconds=0.0)
+    monkeypatch.setattr(outbox, "_stats", stats)
+
+
+def test_publish_batch_claims_with_lease_and_marks_sent(monkeypatch):
+    monkeypatch.setattr(get_settings(), "outbox_batch_size", 50)
+    monkeypatch.setattr(get_settings(), "outbox_lease_seconds", 30)
+    engine = _Engine(claimable=[_row(1, 4), _row(2, 2)])
+    sink = outbox.MemorySink()
+
+    assert asyncio.run(outbox.publish_batch(engine, sink)) == 2
+
+    assert [e.id_evento for e in sink.events] == [1, 2]
+    assert sink.events[0].to_dict()["payload"] == {"id_venta": 1}
+    assert engine.statements() == [outbox.CLAIM_SQL, outbox.MARK_SENT_SQL]
+    assert engine.executed[0][1] == {"batch_size": 50, "lease": 30}
+    assert engine.executed[1][1] == {"ids": [1, 2]}
+    stats = outbox.snapshot()
+    assert stats["delivered"] == 2
+    assert stats["failed_batches"] == 0
+    assert 4 <= stats["last_lag_seconds"] < 10
+    assert stats["max_lag_seconds"] == stats["last_lag_seconds"]
+
+
+def test_publish_batch_failure_schedules_backoff(monkeypatch):
+    monkeypatch.setattr(get_settings(), "outbox_base_backoff", 2.0)
+    monkeypatch.setattr(get_settings(), "outbox_max_backoff", 300.0)
+    engine = _Engine(claimable=[_row(7, 1, intentos=3)])
+
+    assert asyncio.run(outbox.publish_batch(engine, _FailingSink())) == 1
+
+    assert engine.statements() == [outbox.CLAIM_SQL, outbox.MARK_FAILED_SQL]
+    assert engine.executed[1][1] == {
+        "ids": [7],
+        "error": "ConnectionError: inventory down",
+        "base_backoff": 2.0,
+        "max_backoff": 300.0,
+    }
+    stats = outbox.snapshot()
+    assert stats["failed_batches"] == 1
+    assert stats["delivered"] == 0
+    # El backoff usa los intentos de la fila y queda acotado por max_backoff
+    sql = str(outbox.MARK_FAILED_SQL)
+    assert "least(:max_backoff, :base_backoff * power(2, intentos - 1))" in sql
+
+
+def test_publish_batch_with_nothing_pending():
+    engine = _Engine()
+    sink = outbox.MemorySink()
+    assert asyncio.run(outbox.publish_batch(engine, sink)) == 0
+    assert engine.statements() == [outbox.CLAIM_SQL]
+    assert sink.events == []
+
+
+def test_claim_skips_locked_rows_and_takes_a_lease():
+    sql = str(outbox.CLAIM_SQL)
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "proximo_intento = now() + make_interval(secs => :lease)" in sql
+
+
+def test_purge_repeats_batches_until_nothing_left():
+    engine = _Engine(sent=2 * outbox.PURGE_BATCH + 10, pending=3)
+    deleted = asyncio.run(outbox.purge(engine))
+    assert deleted == 2 * outbox.PURGE_BATCH + 10
+    assert engine.purge_calls == 3
+    stats = outbox.snapshot()
+    assert stats["pending"] == 3
+    assert stats["sent_retained"] == 0
+
+
+def test_purge_with_nothing_to_delete_runs_one_batch():
+    engine = _Engine(sent=0, pending=0)
+    assert asyncio.run(outbox.purge(engine)) == 0
+    assert engine.purge_calls == 1
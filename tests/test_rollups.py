@@ -0,0 +1,44 @@
+# tests/test_rollups.py
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.services import rollups  # noqa: E402
+
+_DIA = date(2025, 1, 15)
+# (producto_id, cantidad, total_linea)
+_ITEMS = [(10, 2, 200), (11, 1, 50), (10, 1, 100)]
+
+
+def _by_key(rows):
+    return {(r["dimension"], r["clave"]): r for r in rows}
+
+
+def test_rows_cover_every_dimension_and_group_products():
+    rows = _by_key(rollups._rollup_rows(1, _DIA, 2, 5, 9, 330, _ITEMS))
+    assert set(rows) == {("total", 0), ("cliente", 5), ("usuario", 9), ("producto", 10), ("producto", 11)}
+    assert rows[("total", 0)]["unidades"] == 4
+    assert rows[("producto", 10)]["unidades"] == 3
+    assert rows[("producto", 10)]["total"] == 300
+
+
+def test_rows_convert_to_base_currency_with_the_sale_rate():
+    rows = _by_key(rollups._rollup_rows(1, _DIA, 2, 5, 9, 330, _ITEMS, Decimal("6.96")))
+    assert rows[("total", 0)]["total_base"] == Decimal("2296.80")
+    assert rows[("producto", 11)]["total_base"] == Decimal("348.00")
+    assert all(r["ventas_sin_tasa"] == 0 for r in rows.values())
+
+
+def test_rows_without_rate_count_as_sin_tasa():
+    rows = rollups._rollup_rows(1, _DIA, 2, 5, 9, 330, _ITEMS)
+    assert all(r["total_base"] == 0 and r["ventas_sin_tasa"] == 1 for r in rows)
+
+
+def test_rows_are_sorted_to_lock_in_a_fixed_order():
+    rows = rollups._rollup_rows(1, _DIA, 2, 5, 9, 330, _ITEMS)
+    keys = [(r["dimension"], r["clave"]) for r in rows]
+    assert keys == sorted(keys)
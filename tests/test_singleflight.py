@@ -0,0 +1,85 @@
+# tests/test_singleflight.py
+import asyncio
+
+import pytest
+
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["ok"] * 5
+    assert calls == 1
+    assert len(flight) == 0
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    seen = []
+
+    def make(key):
+        async def fn():
+            seen.append(key)
+            await asyncio.sleep(0)
+            return key
+        return fn
+
+    async def main():
+        return await asyncio.gather(flight.do("a", make("a")), flight.do("b", make("b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert sorted(seen) == ["a", "b"]
+
+
+def test_exception_is_shared_and_key_released():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(flight) == 0
+
+
+def test_cancelled_leader_lets_a_waiter_retry():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def fn():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    async def main():
+        leader = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+    assert calls == 2
@@ -0,0 +1,39 @@
+# tests/test_sync_feed.py
+import base64
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.services.sync_feed import STREAMS, decode_cursor, encode_cursor  # noqa: E402
+
+
+def test_cursor_round_trip():
+    positions = {s: (i * 100 + 7, i + 1) for i, s in enumerate(STREAMS)}
+    cursor = encode_cursor(positions)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == positions
+
+
+def test_empty_cursor_starts_from_the_beginning():
+    assert decode_cursor("") == {s: (0, 0) for s in STREAMS}
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [b"1-2", b"1-2.3-4.x-5", b"1-2.3-4.5", b"1-2-3.3-4.5-6"],
+)
+def test_bad_cursor_is_400(raw):
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
+
+
+def test_garbage_cursor_is_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("no es base64!")
+    assert exc.value.status_code == 400
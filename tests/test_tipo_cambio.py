@@ -0,0 +1,78 @@
+# tests/test_tipo_cambio.py
+import asyncio
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from app.services import tipo_cambio  # noqa: E402
+
+_DIA = date(2025, 1, 15)
+
+
+class _FakeDB:
+    def __init__(self, tasa, gate=None):
+        self.tasa = tasa
+        self.gate = gate
+        self.calls = 0
+
+    async def execute(self, stmt, params=None):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate()
+        return SimpleNamespace(scalar=lambda: self.tasa)
+
+
+@pytest.fixture(autouse=True)
+def _setup(monkeypatch):
+    monkeypatch.setattr(tipo_cambio.get_settings(), "moneda_base_id", 1)
+    tipo_cambio._get_cache.cache_clear()
+    yield
+    tipo_cambio._get_cache.cache_clear()
+
+
+def test_base_currency_needs_no_lookup():
+    db = _FakeDB(None)
+    assert asyncio.run(tipo_cambio.tasa_base(db, 1, _DIA)) == Decimal(1)
+    assert db.calls == 0
+
+
+def test_rate_and_missing_rate_are_cached():
+    db = _FakeDB(Decimal("6.96"))
+    for _ in range(3):
+        assert asyncio.run(tipo_cambio.tasa_base(db, 2, _DIA)) == Decimal("6.96")
+    assert db.calls == 1
+
+    missing = _FakeDB(None)
+    for _ in range(3):
+        assert asyncio.run(tipo_cambio.tasa_base(missing, 3, _DIA)) is None
+    assert missing.calls == 1
+
+
+def test_rate_change_during_lookup_is_not_cached():
+    async def scenario():
+        querying = asyncio.Event()
+        release = asyncio.Event()
+
+        async def gate():
+            querying.set()
+            await release.wait()
+
+        db = _FakeDB(Decimal("6.96"), gate)
+        lookup = asyncio.create_task(tipo_cambio.tasa_base(db, 2, _DIA))
+        await querying.wait()
+        tipo_cambio.invalidate()
+        release.set()
+        assert await lookup == Decimal("6.96")
+        assert tipo_cambio._get_cache().get((2, _DIA)) is None
+
+    asyncio.run(scenario())
+
+
+def test_convertir():
+    assert tipo_cambio.convertir(100, Decimal("6.96")) == Decimal("696.00")
+    assert tipo_cambio.convertir(100, None) is None